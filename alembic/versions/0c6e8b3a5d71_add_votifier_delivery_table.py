@@ -0,0 +1,57 @@
+"""add votifier delivery table
+
+Revision ID: 0c6e8b3a5d71
+Revises: f2b7d4a91c06
+Create Date: 2026-10-17 21:48:30.264187
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0c6e8b3a5d71"
+down_revision: Union[str, None] = "f2b7d4a91c06"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "votifier_delivery",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("vote_id", sa.UUID(), nullable=False),
+        sa.Column("server_id", sa.UUID(), nullable=False),
+        sa.Column("minecraft_username", sa.Text(), nullable=False),
+        sa.Column("client_ip_address", sa.Text(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("PENDING", "DELIVERED", "FAILED", name="votifierdeliverystatus"),
+            nullable=False,
+        ),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("delivered_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["server_id"], ["server.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "idx_votifier_delivery_next_attempt_at",
+        "votifier_delivery",
+        ["next_attempt_at"],
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "idx_votifier_delivery_next_attempt_at",
+        table_name="votifier_delivery",
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+    op.drop_table("votifier_delivery")
+    sa.Enum(name="votifierdeliverystatus").drop(op.get_bind())
@@ -0,0 +1,47 @@
+"""add poll schedule to server
+
+Revision ID: 3d5a1c9e7b24
+Revises: 05b8ed7117af
+Create Date: 2026-10-17 09:12:31.482910
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3d5a1c9e7b24"
+down_revision: Union[str, None] = "05b8ed7117af"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("server", sa.Column("next_poll_at", sa.DateTime(), nullable=True))
+    op.add_column(
+        "server",
+        sa.Column(
+            "consecutive_poll_failures",
+            sa.Integer(),
+            nullable=False,
+            server_default="0",
+        ),
+    )
+    op.create_index(
+        "idx_server_next_poll_at",
+        "server",
+        ["next_poll_at"],
+        postgresql_where=sa.text("flagged_for_deletion IS false"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "idx_server_next_poll_at",
+        table_name="server",
+        postgresql_where=sa.text("flagged_for_deletion IS false"),
+    )
+    op.drop_column("server", "consecutive_poll_failures")
+    op.drop_column("server", "next_poll_at")
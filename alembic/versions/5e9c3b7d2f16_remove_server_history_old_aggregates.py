@@ -0,0 +1,58 @@
+"""remove server history old aggregates
+
+Revision ID: 5e9c3b7d2f16
+Revises: f2b6d8a4c1e9
+Create Date: 2026-10-18 11:03:27.640192
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5e9c3b7d2f16"
+down_revision: Union[str, None] = "f2b6d8a4c1e9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# the aggregates compaction wrote, their days were copied into the daily rollups
+# by 8e4a1f7c2d93
+COLUMNS = [
+    ("data_points", sa.Integer()),
+    ("online_ratio", sa.Float()),
+    ("min_players", sa.Integer()),
+    ("avg_players", sa.Float()),
+    ("max_players", sa.Integer()),
+    ("best_rank", sa.Integer()),
+    ("uptime", sa.Float()),
+    ("new_votes", sa.Integer()),
+    ("votes_this_month", sa.Integer()),
+    ("total_votes", sa.Integer()),
+]
+
+
+def upgrade() -> None:
+    op.drop_constraint(
+        "unique_server_history_old_server_id_created_at",
+        "server_history_old",
+        type_="unique",
+    )
+
+    for name, _ in reversed(COLUMNS):
+        op.drop_column("server_history_old", name)
+
+
+def downgrade() -> None:
+    for name, type_ in COLUMNS:
+        op.add_column(
+            "server_history_old",
+            sa.Column(name, type_, nullable=True),
+        )
+
+    op.create_unique_constraint(
+        "unique_server_history_old_server_id_created_at",
+        "server_history_old",
+        ["server_id", "created_at"],
+    )
@@ -0,0 +1,26 @@
+"""add latency to server
+
+Revision ID: 5f2d8e61a7c3
+Revises: c4e7a2b9d150
+Create Date: 2026-10-17 14:26:53.804117
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5f2d8e61a7c3"
+down_revision: Union[str, None] = "c4e7a2b9d150"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("server", sa.Column("latency", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("server", "latency")
@@ -0,0 +1,122 @@
+"""partition server history and vote by month
+
+Revision ID: 6b3c9d1f7a20
+Revises: d27f6a8c1e35
+Create Date: 2026-10-17 18:02:47.390215
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6b3c9d1f7a20"
+down_revision: Union[str, None] = "d27f6a8c1e35"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# the months after the current one partitions are created for, the partition
+# maintenance job keeps this many months ahead from then on
+PREMAKE_MONTHS = 3
+
+TABLES = {
+    "server_history": [
+        ("id", sa.UUID()),
+        ("server_id", sa.UUID()),
+        ("is_online", sa.Boolean()),
+        ("players", sa.Integer()),
+        ("created_at", sa.DateTime()),
+        ("rank", sa.Integer()),
+        ("new_votes", sa.Integer()),
+        ("votes_this_month", sa.Integer()),
+        ("total_votes", sa.Integer()),
+        ("uptime", sa.Integer()),
+    ],
+    "vote": [
+        ("id", sa.UUID()),
+        ("server_id", sa.UUID()),
+        ("created_at", sa.DateTime()),
+        ("client_ip_address", sa.Text()),
+        ("minecraft_username", sa.Text()),
+    ],
+}
+
+
+def _get_month_start(value: datetime, months: int = 0) -> datetime:
+    month = value.year * 12 + value.month - 1 + months
+
+    return datetime(month // 12, month % 12 + 1, 1)
+
+
+def _copy_rows(table: str, source: str):
+    columns = ", ".join(name for name, _ in TABLES[table])
+
+    op.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {source}")
+
+
+def upgrade() -> None:
+    now = datetime.utcnow()
+
+    for table, columns in TABLES.items():
+        unpartitioned = f"{table}_unpartitioned"
+
+        op.rename_table(table, unpartitioned)
+        # the index names are needed for the partitioned table
+        op.drop_constraint(f"unique_{table}_id", unpartitioned, type_="unique")
+        op.drop_constraint(f"{table}_pkey", unpartitioned, type_="primary")
+
+        op.create_table(
+            table,
+            *[sa.Column(name, type_, nullable=False) for name, type_ in columns],
+            sa.ForeignKeyConstraint(["server_id"], ["server.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id", "created_at"),
+            postgresql_partition_by="RANGE (created_at)",
+        )
+
+        oldest = (
+            op.get_bind()
+            .execute(sa.text(f"SELECT MIN(created_at) FROM {unpartitioned}"))
+            .scalar()
+        )
+
+        month = _get_month_start(min(oldest or now, now))
+        last_month = _get_month_start(now, months=PREMAKE_MONTHS)
+
+        while month <= last_month:
+            end = _get_month_start(month, months=1)
+
+            op.execute(
+                f"CREATE TABLE {table}_{month:%Y_%m} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+            )
+
+            month = end
+
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+        _copy_rows(table, unpartitioned)
+        op.drop_table(unpartitioned)
+
+
+def downgrade() -> None:
+    for table, columns in TABLES.items():
+        partitioned = f"{table}_partitioned"
+
+        op.rename_table(table, partitioned)
+        op.drop_constraint(f"{table}_pkey", partitioned, type_="primary")
+
+        op.create_table(
+            table,
+            *[sa.Column(name, type_, nullable=False) for name, type_ in columns],
+            sa.ForeignKeyConstraint(["server_id"], ["server.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("id", name=f"unique_{table}_id"),
+        )
+
+        _copy_rows(table, partitioned)
+
+        # the partitions are dropped along with the table
+        op.drop_table(partitioned)
@@ -0,0 +1,60 @@
+"""add server vote stats table
+
+Revision ID: 6d1f9b4e2a87
+Revises: 0c6e8b3a5d71
+Create Date: 2026-10-17 22:24:51.817340
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6d1f9b4e2a87"
+down_revision: Union[str, None] = "0c6e8b3a5d71"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "server_vote_stats",
+        sa.Column("server_id", sa.UUID(), nullable=False),
+        sa.Column("total_votes", sa.Integer(), nullable=False),
+        sa.Column("votes_this_month", sa.Integer(), nullable=False),
+        sa.Column("month_start", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["server_id"], ["server.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("server_id"),
+    )
+
+    # count the votes made so far, the votes made while this runs are corrected
+    # by the reconciliation job
+    op.execute(
+        """
+        INSERT INTO server_vote_stats (
+            server_id,
+            total_votes,
+            votes_this_month,
+            month_start,
+            updated_at
+        )
+        SELECT
+            server.id,
+            COUNT(vote.id),
+            COUNT(vote.id) FILTER (
+                WHERE vote.created_at >= date_trunc('month', now() at time zone 'utc')
+            ),
+            date_trunc('month', now() at time zone 'utc'),
+            now() at time zone 'utc'
+        FROM server
+        LEFT JOIN vote ON vote.server_id = server.id
+        GROUP BY server.id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("server_vote_stats")
@@ -0,0 +1,37 @@
+"""add poll worker table
+
+Revision ID: 8b1f4c2d6a93
+Revises: 3d5a1c9e7b24
+Create Date: 2026-10-17 10:41:05.219384
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8b1f4c2d6a93"
+down_revision: Union[str, None] = "3d5a1c9e7b24"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "poll_worker",
+        sa.Column("worker_id", sa.String(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("heartbeat_at", sa.DateTime(), nullable=False),
+        sa.Column("shard_size", sa.Integer(), nullable=False),
+        sa.Column("servers_polled", sa.Integer(), nullable=False),
+        sa.Column("probes_timed_out", sa.Integer(), nullable=False),
+        sa.Column("last_cycle_at", sa.DateTime(), nullable=True),
+        sa.Column("last_cycle_duration", sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint("worker_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("poll_worker")
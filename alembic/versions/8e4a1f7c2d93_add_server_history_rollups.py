@@ -0,0 +1,140 @@
+"""add server history rollups
+
+Revision ID: 8e4a1f7c2d93
+Revises: 6b3c9d1f7a20
+Create Date: 2026-10-17 19:11:36.802416
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8e4a1f7c2d93"
+down_revision: Union[str, None] = "6b3c9d1f7a20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ROLLUPS = {
+    "hourly": "hour",
+    "daily": "day",
+}
+
+COLUMNS = """
+    server_id,
+    bucket,
+    data_points,
+    online_count,
+    players_sum,
+    min_players,
+    max_players,
+    p50_players,
+    p95_players,
+    best_rank,
+    uptime_sum,
+    new_votes,
+    votes_this_month,
+    total_votes
+"""
+
+
+def upgrade() -> None:
+    for rollup, time_interval in ROLLUPS.items():
+        table = f"server_history_{rollup}"
+
+        op.create_table(
+            table,
+            sa.Column("server_id", sa.UUID(), nullable=False),
+            sa.Column("bucket", sa.DateTime(), nullable=False),
+            sa.Column("data_points", sa.Integer(), nullable=False),
+            sa.Column("online_count", sa.Integer(), nullable=False),
+            sa.Column("players_sum", sa.Integer(), nullable=False),
+            sa.Column("min_players", sa.Integer(), nullable=False),
+            sa.Column("max_players", sa.Integer(), nullable=False),
+            sa.Column("p50_players", sa.Float(), nullable=True),
+            sa.Column("p95_players", sa.Float(), nullable=True),
+            sa.Column("best_rank", sa.Integer(), nullable=True),
+            sa.Column("uptime_sum", sa.Integer(), nullable=True),
+            sa.Column("new_votes", sa.Integer(), nullable=True),
+            sa.Column("votes_this_month", sa.Integer(), nullable=True),
+            sa.Column("total_votes", sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(["server_id"], ["server.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("server_id", "bucket"),
+        )
+        op.create_index(
+            f"idx_{table}_unsealed",
+            table,
+            ["bucket"],
+            postgresql_where=sa.text("p50_players IS NULL"),
+        )
+
+        # backfill from the raw history, the current bucket is left unsealed
+        op.execute(
+            f"""
+            INSERT INTO {table} ({COLUMNS})
+            SELECT
+                server_id,
+                date_trunc('{time_interval}', created_at),
+                COUNT(*),
+                COUNT(*) FILTER (WHERE is_online),
+                SUM(players),
+                MIN(players),
+                MAX(players),
+                CASE
+                    WHEN date_trunc('{time_interval}', created_at)
+                        < date_trunc('{time_interval}', now() at time zone 'utc')
+                    THEN percentile_cont(0.5) WITHIN GROUP (ORDER BY players)
+                END,
+                CASE
+                    WHEN date_trunc('{time_interval}', created_at)
+                        < date_trunc('{time_interval}', now() at time zone 'utc')
+                    THEN percentile_cont(0.95) WITHIN GROUP (ORDER BY players)
+                END,
+                MIN(rank),
+                SUM(uptime),
+                SUM(new_votes),
+                MAX(votes_this_month),
+                MAX(total_votes)
+            FROM server_history
+            GROUP BY server_id, date_trunc('{time_interval}', created_at)
+            """
+        )
+
+    # days already compacted have no percentiles, and only the players of the day
+    # if they were compacted before the aggregates were kept
+    op.execute(
+        f"""
+        INSERT INTO server_history_daily ({COLUMNS})
+        SELECT
+            server_id,
+            created_at,
+            COALESCE(data_points, 1),
+            ROUND(
+                COALESCE(online_ratio, is_online::int) * COALESCE(data_points, 1)
+            ),
+            ROUND(COALESCE(avg_players, players) * COALESCE(data_points, 1)),
+            COALESCE(min_players, players),
+            COALESCE(max_players, players),
+            NULL,
+            NULL,
+            best_rank,
+            ROUND(uptime * COALESCE(data_points, 1)),
+            new_votes,
+            votes_this_month,
+            total_votes
+        FROM server_history_old
+        ON CONFLICT (server_id, bucket) DO NOTHING
+        """
+    )
+
+
+def downgrade() -> None:
+    for rollup in reversed(ROLLUPS):
+        op.drop_index(
+            f"idx_server_history_{rollup}_unsealed",
+            table_name=f"server_history_{rollup}",
+            postgresql_where=sa.text("p50_players IS NULL"),
+        )
+        op.drop_table(f"server_history_{rollup}")
@@ -0,0 +1,46 @@
+"""add vote and server history indexes
+
+Revision ID: a3f9c2e5b817
+Revises: 8e4a1f7c2d93
+Create Date: 2026-10-17 20:24:53.118902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a3f9c2e5b817"
+down_revision: Union[str, None] = "8e4a1f7c2d93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# indexes on the partitioned tables are created on every partition
+INDEXES = [
+    ("idx_vote_server_id_created_at", "vote", ["server_id", "created_at"]),
+    (
+        "idx_vote_server_id_client_ip_address_created_at",
+        "vote",
+        ["server_id", "client_ip_address", "created_at"],
+    ),
+    (
+        "idx_vote_server_id_minecraft_username_created_at",
+        "vote",
+        ["server_id", "minecraft_username", "created_at"],
+    ),
+    (
+        "idx_server_history_server_id_created_at",
+        "server_history",
+        ["server_id", "created_at"],
+    ),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
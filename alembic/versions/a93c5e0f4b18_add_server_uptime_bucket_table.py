@@ -0,0 +1,53 @@
+"""add server uptime bucket table
+
+Revision ID: a93c5e0f4b18
+Revises: e81b3f6d2a47
+Create Date: 2026-10-17 16:41:29.118024
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a93c5e0f4b18"
+down_revision: Union[str, None] = "e81b3f6d2a47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "server_uptime_bucket",
+        sa.Column("server_id", sa.UUID(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("online_count", sa.Integer(), nullable=False),
+        sa.Column("total_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["server_id"], ["server.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("server_id", "day"),
+    )
+    op.add_column("server", sa.Column("uptime_24h", sa.Float(), nullable=True))
+    op.add_column("server", sa.Column("uptime_7d", sa.Float(), nullable=True))
+
+    # backfill the buckets the uptime window covers from the existing history
+    op.execute(
+        """
+        INSERT INTO server_uptime_bucket (server_id, day, online_count, total_count)
+        SELECT
+            server_id,
+            created_at::date,
+            COUNT(*) FILTER (WHERE is_online),
+            COUNT(*)
+        FROM server_history
+        WHERE created_at >= (now() at time zone 'utc')::date - 31
+        GROUP BY server_id, created_at::date
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("server", "uptime_7d")
+    op.drop_column("server", "uptime_24h")
+    op.drop_table("server_uptime_bucket")
@@ -0,0 +1,34 @@
+"""add covering server history index
+
+Revision ID: b8e2c5f3a914
+Revises: 6d1f9b4e2a87
+Create Date: 2026-10-17 22:58:06.402715
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b8e2c5f3a914"
+down_revision: Union[str, None] = "6d1f9b4e2a87"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = "idx_server_history_server_id_created_at"
+
+
+def upgrade() -> None:
+    # indexes on the partitioned table are recreated on every partition
+    op.drop_index(INDEX_NAME, table_name="server_history")
+    op.create_index(
+        INDEX_NAME,
+        "server_history",
+        ["server_id", "created_at"],
+        postgresql_include=["total_votes", "is_online"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(INDEX_NAME, table_name="server_history")
+    op.create_index(INDEX_NAME, "server_history", ["server_id", "created_at"])
@@ -0,0 +1,49 @@
+"""add poll breaker table
+
+Revision ID: c4e7a2b9d150
+Revises: 8b1f4c2d6a93
+Create Date: 2026-10-17 13:02:47.617203
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4e7a2b9d150"
+down_revision: Union[str, None] = "8b1f4c2d6a93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "poll_breaker",
+        sa.Column("endpoint", sa.String(), nullable=False),
+        sa.Column(
+            "state", sa.Enum("CLOSED", "OPEN", name="breakerstate"), nullable=False
+        ),
+        sa.Column("consecutive_failures", sa.Integer(), nullable=False),
+        sa.Column("opened_at", sa.DateTime(), nullable=True),
+        sa.Column("next_check_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("endpoint"),
+    )
+    op.create_index(
+        "idx_poll_breaker_next_check_at",
+        "poll_breaker",
+        ["next_check_at"],
+        postgresql_where=sa.text("state = 'OPEN'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "idx_poll_breaker_next_check_at",
+        table_name="poll_breaker",
+        postgresql_where=sa.text("state = 'OPEN'"),
+    )
+    op.drop_table("poll_breaker")
+    sa.Enum(name="breakerstate").drop(op.get_bind())
@@ -0,0 +1,56 @@
+"""add aggregates to server history old
+
+Revision ID: d27f6a8c1e35
+Revises: a93c5e0f4b18
+Create Date: 2026-10-17 17:20:04.552871
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d27f6a8c1e35"
+down_revision: Union[str, None] = "a93c5e0f4b18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = [
+    ("data_points", sa.Integer()),
+    ("online_ratio", sa.Float()),
+    ("min_players", sa.Integer()),
+    ("avg_players", sa.Float()),
+    ("max_players", sa.Integer()),
+    ("best_rank", sa.Integer()),
+    ("uptime", sa.Float()),
+    ("new_votes", sa.Integer()),
+    ("votes_this_month", sa.Integer()),
+    ("total_votes", sa.Integer()),
+]
+
+
+def upgrade() -> None:
+    for name, type_ in COLUMNS:
+        op.add_column(
+            "server_history_old",
+            sa.Column(name, type_, nullable=True),
+        )
+
+    op.create_unique_constraint(
+        "unique_server_history_old_server_id_created_at",
+        "server_history_old",
+        ["server_id", "created_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        "unique_server_history_old_server_id_created_at",
+        "server_history_old",
+        type_="unique",
+    )
+
+    for name, _ in reversed(COLUMNS):
+        op.drop_column("server_history_old", name)
@@ -0,0 +1,66 @@
+"""add server leaderboard table
+
+Revision ID: d4a7e1c9b362
+Revises: b8e2c5f3a914
+Create Date: 2026-10-17 23:41:37.905128
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d4a7e1c9b362"
+down_revision: Union[str, None] = "b8e2c5f3a914"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "server_leaderboard",
+        sa.Column("server_id", sa.UUID(), nullable=False),
+        sa.Column("month_start", sa.DateTime(), nullable=False),
+        sa.Column("votes_this_month", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["server_id"], ["server.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("server_id"),
+    )
+    op.create_index(
+        "idx_server_leaderboard_month_start_votes_this_month",
+        "server_leaderboard",
+        ["month_start", "votes_this_month"],
+    )
+
+    # the listed servers with votes this month, from their vote counters
+    op.execute(
+        """
+        INSERT INTO server_leaderboard (
+            server_id,
+            month_start,
+            votes_this_month,
+            updated_at
+        )
+        SELECT
+            server_vote_stats.server_id,
+            server_vote_stats.month_start,
+            server_vote_stats.votes_this_month,
+            now() at time zone 'utc'
+        FROM server_vote_stats
+        JOIN server ON server.id = server_vote_stats.server_id
+        WHERE server.flagged_for_deletion = false
+            AND server_vote_stats.month_start
+                = date_trunc('month', now() at time zone 'utc')
+            AND server_vote_stats.votes_this_month > 0
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "idx_server_leaderboard_month_start_votes_this_month",
+        table_name="server_leaderboard",
+    )
+    op.drop_table("server_leaderboard")
@@ -0,0 +1,51 @@
+"""add poll cycle table
+
+Revision ID: e81b3f6d2a47
+Revises: 5f2d8e61a7c3
+Create Date: 2026-10-17 15:08:12.339541
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e81b3f6d2a47"
+down_revision: Union[str, None] = "5f2d8e61a7c3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "poll_cycle",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column(
+            "kind", sa.Enum("POLL", "UPTIME", name="pollcyclekind"), nullable=False
+        ),
+        sa.Column("worker_id", sa.String(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=False),
+        sa.Column("servers_attempted", sa.Integer(), nullable=False),
+        sa.Column("servers_online", sa.Integer(), nullable=True),
+        sa.Column("servers_failed", sa.Integer(), nullable=False),
+        sa.Column("probe_p50_ms", sa.Float(), nullable=True),
+        sa.Column("probe_p95_ms", sa.Float(), nullable=True),
+        sa.Column("probe_p99_ms", sa.Float(), nullable=True),
+        sa.Column("write_ms", sa.Float(), nullable=True),
+        sa.Column("skipped_overlaps", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "idx_poll_cycle_kind_started_at",
+        "poll_cycle",
+        ["kind", "started_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_poll_cycle_kind_started_at", table_name="poll_cycle")
+    op.drop_table("poll_cycle")
+    sa.Enum(name="pollcyclekind").drop(op.get_bind())
@@ -0,0 +1,103 @@
+"""weight server uptime buckets by seconds
+
+Revision ID: f2b6d8a4c1e9
+Revises: d4a7e1c9b362
+Create Date: 2026-10-18 09:12:44.305817
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f2b6d8a4c1e9"
+down_revision: Union[str, None] = "d4a7e1c9b362"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("DELETE FROM server_uptime_bucket")
+    op.drop_column("server_uptime_bucket", "online_count")
+    op.drop_column("server_uptime_bucket", "total_count")
+    op.add_column(
+        "server_uptime_bucket",
+        sa.Column("online_seconds", sa.Integer(), nullable=False),
+    )
+    op.add_column(
+        "server_uptime_bucket",
+        sa.Column("total_seconds", sa.Integer(), nullable=False),
+    )
+
+    # backfill the buckets the uptime window covers, each data point standing for
+    # the time since the server's previous one, between the default minimum and
+    # maximum poll intervals
+    op.execute(
+        """
+        INSERT INTO server_uptime_bucket (
+            server_id,
+            day,
+            online_seconds,
+            total_seconds
+        )
+        SELECT
+            server_id,
+            created_at::date,
+            COALESCE(SUM(seconds) FILTER (WHERE is_online), 0),
+            SUM(seconds)
+        FROM (
+            SELECT
+                server_id,
+                is_online,
+                created_at,
+                ROUND(
+                    COALESCE(
+                        LEAST(
+                            EXTRACT(
+                                EPOCH FROM created_at - LAG(created_at) OVER (
+                                    PARTITION BY server_id ORDER BY created_at
+                                )
+                            ),
+                            21600
+                        ),
+                        900
+                    )
+                )::integer AS seconds
+            FROM server_history
+            WHERE created_at >= (now() at time zone 'utc')::date - 31
+                - interval '21600 seconds'
+        ) AS data_points
+        WHERE created_at >= (now() at time zone 'utc')::date - 31
+        GROUP BY server_id, created_at::date
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM server_uptime_bucket")
+    op.drop_column("server_uptime_bucket", "total_seconds")
+    op.drop_column("server_uptime_bucket", "online_seconds")
+    op.add_column(
+        "server_uptime_bucket",
+        sa.Column("online_count", sa.Integer(), nullable=False),
+    )
+    op.add_column(
+        "server_uptime_bucket",
+        sa.Column("total_count", sa.Integer(), nullable=False),
+    )
+
+    op.execute(
+        """
+        INSERT INTO server_uptime_bucket (server_id, day, online_count, total_count)
+        SELECT
+            server_id,
+            created_at::date,
+            COUNT(*) FILTER (WHERE is_online),
+            COUNT(*)
+        FROM server_history
+        WHERE created_at >= (now() at time zone 'utc')::date - 31
+        GROUP BY server_id, created_at::date
+        """
+    )
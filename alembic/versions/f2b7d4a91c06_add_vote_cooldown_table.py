@@ -0,0 +1,60 @@
+"""add vote cooldown table
+
+Revision ID: f2b7d4a91c06
+Revises: a3f9c2e5b817
+Create Date: 2026-10-17 21:06:12.530471
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f2b7d4a91c06"
+down_revision: Union[str, None] = "a3f9c2e5b817"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+KINDS = {
+    "IP_ADDRESS": "client_ip_address",
+    "MINECRAFT_USERNAME": "minecraft_username",
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "vote_cooldown",
+        sa.Column("server_id", sa.UUID(), nullable=False),
+        sa.Column(
+            "kind",
+            sa.Enum(*KINDS, name="votecooldownkind"),
+            nullable=False,
+        ),
+        sa.Column("value", sa.Text(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["server_id"], ["server.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("server_id", "kind", "value"),
+    )
+
+    # the votes of the last 24 hours still hold their voters back
+    for kind, column in KINDS.items():
+        op.execute(
+            f"""
+            INSERT INTO vote_cooldown (server_id, kind, value, expires_at)
+            SELECT
+                server_id,
+                '{kind}',
+                {column},
+                MAX(created_at) + interval '24 hours'
+            FROM vote
+            WHERE created_at > (now() at time zone 'utc') - interval '24 hours'
+            GROUP BY server_id, {column}
+            """
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("vote_cooldown")
+    sa.Enum(name="votecooldownkind").drop(op.get_bind())
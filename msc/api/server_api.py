@@ -240,6 +240,7 @@ def get_server_historical_data(
         db=db,
         server_id=UUID(server_id),
         time_interval=query_params.time_interval,
+        days=query_params.days,
     )
 
     return [ServerHistoryDto.from_service(s) for s in server_history]
@@ -1,15 +1,30 @@
 from datetime import datetime, timedelta
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from fastapi.requests import Request
+from sqlalchemy.orm import Session
 
+from msc.constants import POLL_WORKER_TTL
+from msc.database import get_db
+from msc.dto.poll_dto import (
+    GetPollBreakersOutputDto,
+    GetPollCyclesInputDto,
+    GetPollCyclesOutputDto,
+    GetPollWorkersOutputDto,
+    ResetPollBreakerInputDto,
+)
+from msc.dto.vote_dto import GetVotifierOutboxOutputDto
 from msc.jobs import tasks
 from msc.jobs.jobs import persisted_scheduler
 from msc.services.auction_service import (
     populate_sponsored_servers_task,
     start_payment_phase_task,
 )
+from msc.services.circuit_breaker_service import get_poll_breakers, reset_poll_breaker
 from msc.services.email_service import send_email as send_email_
+from msc.services.poll_cycle_service import get_poll_cycles
+from msc.services.poll_shard_service import get_poll_workers
+from msc.services.votifier_service import get_votifier_outbox_stats
 from msc.utils.api_utils import admin_required
 
 router = APIRouter()
@@ -57,3 +72,84 @@ def send_email(request: Request, body: dict) -> str:
 def set_all_minecraft_versions(request: Request) -> str:
     tasks.set_all_minecraft_versions()
     return "success"
+
+
+@router.get("/util/poll/workers")
+@admin_required
+def get_poll_workers_(
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    """Endpoint for getting the sharded poll workers and their progress"""
+
+    workers = get_poll_workers(db=db)
+
+    return GetPollWorkersOutputDto.from_service(
+        workers=workers,
+        live_since=datetime.utcnow() - timedelta(seconds=POLL_WORKER_TTL),
+    )
+
+
+@router.get("/util/poll/cycles")
+@admin_required
+def get_poll_cycles_(
+    request: Request,
+    query_params: GetPollCyclesInputDto = Depends(),
+    db: Session = Depends(get_db),
+):
+    """Endpoint for getting the ledger of poll cycles, newest first"""
+
+    cycles = get_poll_cycles(
+        db=db,
+        kind=query_params.kind,
+        since=query_params.since,
+        limit=query_params.limit,
+    )
+
+    return GetPollCyclesOutputDto.from_service(cycles=cycles)
+
+
+@router.get("/util/poll/breakers")
+@admin_required
+def get_poll_breakers_(
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    """Endpoint for getting the circuit breakers of failing server endpoints"""
+
+    breakers = get_poll_breakers(db=db)
+
+    return GetPollBreakersOutputDto.from_service(
+        breakers=breakers,
+        now=datetime.utcnow(),
+    )
+
+
+@router.post("/util/poll/breakers/reset")
+@admin_required
+def reset_poll_breaker_(
+    request: Request,
+    body: ResetPollBreakerInputDto,
+    db: Session = Depends(get_db),
+) -> str:
+    """Endpoint for closing a server endpoint's circuit breaker"""
+
+    reset_poll_breaker(db=db, endpoint=body.endpoint)
+
+    return "success"
+
+
+@router.get("/util/votifier/outbox")
+@admin_required
+def get_votifier_outbox(
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    """Endpoint for getting the size and delivery lag of the votifier outbox"""
+
+    stats = get_votifier_outbox_stats(db=db)
+
+    return GetVotifierOutboxOutputDto.from_service(
+        stats=stats,
+        now=datetime.utcnow(),
+    )
@@ -26,6 +26,7 @@ from .api import (
     vote_api,
 )
 from .jobs.jobs import persisted_scheduler, scheduler
+from .services.votifier_service import votifier_outbox_worker
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +49,8 @@ def create_app():
     scheduler.start()
     # Initialise scheduler for persisted jobs
     persisted_scheduler.start()
+    # Initialise the worker sending votes to votifier servers
+    votifier_outbox_worker.start()
 
     logger.info("MSC Initialised")
 
@@ -15,6 +15,21 @@ class Config(BaseSettings):
     logging_enable_colour: bool = Field(False, env="LOGGING_ENABLE_COLOUR")
     logging_show_splash: bool = Field(False, env="LOGGING_SHOW_SPLASH")
 
+    # Polling
+    poll_concurrency: int = Field(50, env="POLL_CONCURRENCY")
+    poll_probe_timeout: float = Field(15.0, env="POLL_PROBE_TIMEOUT")
+    poll_cycle_timeout: float = Field(840.0, env="POLL_CYCLE_TIMEOUT")
+    dns_pre_resolve: bool = Field(True, env="DNS_PRE_RESOLVE")
+    poll_min_interval: int = Field(900, env="POLL_MIN_INTERVAL")
+    poll_max_interval: int = Field(21600, env="POLL_MAX_INTERVAL")
+    # a few probe timeouts, so a tick waiting out a timeout doesn't overlap the next
+    poll_scheduler_tick: int = Field(60, env="POLL_SCHEDULER_TICK")
+    poll_udp_multiplex: bool = Field(True, env="POLL_UDP_MULTIPLEX")
+    poll_multiprocess: bool = Field(False, env="POLL_MULTIPROCESS")
+    poll_processes: int = Field(None, env="POLL_PROCESSES")
+    poll_sharding: bool = Field(False, env="POLL_SHARDING")
+    poll_worker_id: str = Field(None, env="POLL_WORKER_ID")
+
     development_mode: bool = Field(False, env="DEVELOPMENT_MODE")
 
 
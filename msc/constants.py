@@ -30,7 +30,76 @@ ADMIN_USER_IDS = [
     "82150464-d0e1-7018-a2ae-4d4f3e80ab92",  # mg
 ]
 
-ASYNC_POLL_BATCH_SIZE = 20
+DNS_CACHE_MIN_TTL = 60
+DNS_CACHE_MAX_TTL = 3600
+DNS_CACHE_NEGATIVE_TTL = 300
+
+POLL_HOT_RANK = 100
+POLL_STABLE_UPTIME = 99.0
+POLL_STABLE_INTERVAL_MULTIPLIER = 2
+
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_BASE_BACKOFF = 1800
+BREAKER_HALF_OPEN_TIMEOUT = 2
+
+POLL_LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+UDP_PROBER_SOCKETS = 4
+UDP_PROBER_TIMEOUT = 3
+UDP_PROBER_RETRIES = 2
+UDP_PROBER_TICK = 0.1
+
+VERSION_RESOLVER_CACHE_SIZE = 4096
+VERSION_RESOLVER_TTL = 3600
+
+ICON_UPLOAD_WORKERS = 4
+ICON_UPLOAD_RETRIES = 3
+ICON_UPLOAD_BACKOFF = 1.0
+
+POLL_WORKER_TTL = 180
+# heartbeats are sent on their own timer, well within the TTL however long a tick
+# runs
+POLL_WORKER_HEARTBEAT_INTERVAL = 60
+POLL_SHARD_VIRTUAL_NODES = 64
+
+POLL_CYCLE_RETENTION_DAYS = 90
+
+UPTIME_WINDOW_DAYS = 30
+
+HISTORY_RAW_RETENTION_DAYS = 30
+HISTORY_COMPACTION_BATCH_SIZE = 500
+HISTORY_HOURLY_ROLLUP_RETENTION_DAYS = 90
+# seconds after a bucket closes before it is sealed, for results still being written
+HISTORY_ROLLUP_SEAL_DELAY = 300
+HISTORY_ROLLUP_SEAL_LOOKBACK_DAYS = 2
+
+PARTITIONED_TABLES = ("server_history", "vote")
+PARTITION_PREMAKE_MONTHS = 3
+# seconds a detach waits for its lock on the table before giving up
+PARTITION_DETACH_LOCK_TIMEOUT = 5
+
+VOTE_COOLDOWN_HOURS = 24
+
+VOTIFIER_OUTBOX_BATCH_SIZE = 100
+# seconds an idle outbox worker waits before checking for deliveries again
+VOTIFIER_OUTBOX_TICK = 5.0
+VOTIFIER_CONCURRENCY = 50
+VOTIFIER_HOST_CONCURRENCY = 2
+VOTIFIER_TIMEOUT = 10
+VOTIFIER_MAX_ATTEMPTS = 8
+VOTIFIER_BASE_BACKOFF = 30
+VOTIFIER_MAX_BACKOFF = 3600
+# seconds a batch of deliveries can take, unfinished deliveries are retried later
+VOTIFIER_BATCH_TIMEOUT = 120
+# seconds a claimed delivery is hidden from other workers, longer than a batch
+# can take
+VOTIFIER_CLAIM_LEASE = 300
+VOTIFIER_CLIENT_CACHE_SIZE = 1024
+VOTIFIER_DELIVERY_RETENTION_DAYS = 7
+VOTIFIER_LAG_BUCKETS_MS = (100, 500, 1000, 5000, 30000, 60000, 300000, 3600000)
+
+POLL_WRITER_BATCH_SIZE = 500
+POLL_WRITER_FLUSH_INTERVAL = 1.0
 
 MINIMUM_BID_DEFAULT = 10
 SPONSORED_SLOTS_DEFAULT = 10
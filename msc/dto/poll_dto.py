@@ -0,0 +1,153 @@
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from pydantic import conint
+
+from msc.dto.base import BaseDto
+from msc.dto.custom_types import DateTimeUTC
+from msc.models import PollBreaker, PollCycle, PollWorker
+from msc.models.poll_breaker import BreakerState
+from msc.models.poll_cycle import PollCycleKind
+
+
+class PollWorkerDto(BaseDto):
+    worker_id: str
+    started_at: DateTimeUTC
+    heartbeat_at: DateTimeUTC
+    is_live: bool
+    shard_size: int
+    servers_polled: int
+    probes_timed_out: int
+    last_cycle_at: Optional[DateTimeUTC] = None
+    last_cycle_duration: Optional[float] = None
+
+    @classmethod
+    def from_service(cls, worker: PollWorker, live_since: datetime):
+        return cls(
+            worker_id=worker.worker_id,
+            started_at=worker.started_at,
+            heartbeat_at=worker.heartbeat_at,
+            is_live=worker.heartbeat_at >= live_since,
+            shard_size=worker.shard_size,
+            servers_polled=worker.servers_polled,
+            probes_timed_out=worker.probes_timed_out,
+            last_cycle_at=worker.last_cycle_at,
+            last_cycle_duration=worker.last_cycle_duration,
+        )
+
+
+class GetPollWorkersOutputDto(BaseDto):
+    __root__: list[PollWorkerDto]
+
+    @classmethod
+    def from_service(cls, workers: list[PollWorker], live_since: datetime):
+        return cls(
+            __root__=[
+                PollWorkerDto.from_service(worker=worker, live_since=live_since)
+                for worker in workers
+            ],
+        )
+
+
+class PollBreakerDto(BaseDto):
+    endpoint: str
+    state: BreakerState
+    is_half_open: bool
+    consecutive_failures: int
+    opened_at: Optional[DateTimeUTC] = None
+    next_check_at: Optional[DateTimeUTC] = None
+    updated_at: DateTimeUTC
+
+    @classmethod
+    def from_service(cls, breaker: PollBreaker, now: datetime):
+        return cls(
+            endpoint=breaker.endpoint,
+            state=breaker.state,
+            is_half_open=(
+                breaker.state == BreakerState.OPEN
+                and breaker.next_check_at is not None
+                and breaker.next_check_at <= now
+            ),
+            consecutive_failures=breaker.consecutive_failures,
+            opened_at=breaker.opened_at,
+            next_check_at=breaker.next_check_at,
+            updated_at=breaker.updated_at,
+        )
+
+
+class GetPollBreakersOutputDto(BaseDto):
+    __root__: list[PollBreakerDto]
+
+    @classmethod
+    def from_service(cls, breakers: list[PollBreaker], now: datetime):
+        return cls(
+            __root__=[
+                PollBreakerDto.from_service(breaker=breaker, now=now)
+                for breaker in breakers
+            ],
+        )
+
+
+class ResetPollBreakerInputDto(BaseDto):
+    endpoint: str
+
+
+class GetPollCyclesInputDto(BaseDto):
+    kind: Optional[PollCycleKind] = None
+    since: Optional[datetime] = None
+    limit: Optional[conint(ge=1, le=1000)] = 100
+
+
+class PollCycleDto(BaseDto):
+    id: UUID
+    kind: PollCycleKind
+    worker_id: str
+    started_at: DateTimeUTC
+    finished_at: DateTimeUTC
+    duration_seconds: float
+    servers_attempted: int
+    servers_online: Optional[int] = None
+    servers_failed: int
+    probes_per_second: float
+    probe_p50_ms: Optional[float] = None
+    probe_p95_ms: Optional[float] = None
+    probe_p99_ms: Optional[float] = None
+    write_ms: Optional[float] = None
+    skipped_overlaps: int
+
+    @classmethod
+    def from_service(cls, cycle: PollCycle):
+        duration_seconds = (cycle.finished_at - cycle.started_at).total_seconds()
+
+        return cls(
+            id=cycle.id,
+            kind=cycle.kind,
+            worker_id=cycle.worker_id,
+            started_at=cycle.started_at,
+            finished_at=cycle.finished_at,
+            duration_seconds=duration_seconds,
+            servers_attempted=cycle.servers_attempted,
+            servers_online=cycle.servers_online,
+            servers_failed=cycle.servers_failed,
+            probes_per_second=(
+                cycle.servers_attempted / duration_seconds
+                if duration_seconds > 0
+                else 0.0
+            ),
+            probe_p50_ms=cycle.probe_p50_ms,
+            probe_p95_ms=cycle.probe_p95_ms,
+            probe_p99_ms=cycle.probe_p99_ms,
+            write_ms=cycle.write_ms,
+            skipped_overlaps=cycle.skipped_overlaps,
+        )
+
+
+class GetPollCyclesOutputDto(BaseDto):
+    __root__: list[PollCycleDto]
+
+    @classmethod
+    def from_service(cls, cycles: list[PollCycle]):
+        return cls(
+            __root__=[PollCycleDto.from_service(cycle=cycle) for cycle in cycles],
+        )
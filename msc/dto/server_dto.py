@@ -73,6 +73,8 @@ class ServerDto(BaseDto):
     last_pinged_at: Optional[DateTimeUTC]
     owner_name: Optional[str]
     uptime: Optional[float]
+    uptime_24h: Optional[float]
+    uptime_7d: Optional[float]
 
     @classmethod
     def from_service(cls, server: Server):
@@ -105,17 +107,22 @@ class ServerDto(BaseDto):
             web_store=server.web_store,
             video_url=server.video_url,
             uptime=server.uptime,
+            uptime_24h=server.uptime_24h,
+            uptime_7d=server.uptime_7d,
         )
 
 
 class ServerHistoryDto(BaseDto):
     date: DateTimeUTC
     players: int
-    uptime: float
-    rank: int
-    new_votes: int
+    # days compacted before ranks and uptime were kept have neither
+    uptime: Optional[float]
+    rank: Optional[int]
+    new_votes: Optional[int]
     votes_this_month: Optional[int]
     total_votes: Optional[int]
+    p50_players: Optional[float]
+    p95_players: Optional[float]
 
     @classmethod
     def from_service(cls, server_history: server_service.ServerHistoryInfo):
@@ -127,6 +134,8 @@ class ServerHistoryDto(BaseDto):
             new_votes=server_history.new_votes,
             votes_this_month=server_history.votes_this_month,
             total_votes=server_history.total_votes,
+            p50_players=server_history.p50_players,
+            p95_players=server_history.p95_players,
         )
 
 
@@ -292,6 +301,7 @@ class ServerPingOutputDto(BaseDto):
 
 class ServerGetHistoryInputDto(BaseDto):
     time_interval: Optional[str] = "day"
+    days: Optional[conint(ge=1, le=365)] = 30
 
     @validator("time_interval")
     def validate_time_interval(cls, time_interval):
@@ -1,8 +1,10 @@
+from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
 from msc.dto.base import BaseDto
 from msc.dto.custom_types import DateTimeUTC
+from msc.services.votifier_service import VotifierOutboxStats
 
 
 class CreateVoteInputDto(BaseDto):
@@ -20,3 +22,36 @@ class CheckVoteOutputDto(BaseDto):
     last_vote: Optional[DateTimeUTC] = None
     time_left_ms: Optional[int] = None
     client_ip: str  # TODO: Remove this
+
+
+class VotifierDeliveryLagDto(BaseDto):
+    count: int
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class GetVotifierOutboxOutputDto(BaseDto):
+    pending: int
+    failed: int
+    oldest_pending_at: Optional[DateTimeUTC] = None
+    lag_seconds: float
+    worker_delivered: int
+    worker_retried: int
+    worker_failed: int
+    delivery_lag: VotifierDeliveryLagDto
+
+    @classmethod
+    def from_service(cls, stats: VotifierOutboxStats, now: datetime):
+        return cls(
+            pending=stats.pending,
+            failed=stats.failed,
+            oldest_pending_at=stats.oldest_pending_at,
+            lag_seconds=stats.get_lag(now),
+            worker_delivered=stats.metrics["delivered"],
+            worker_retried=stats.metrics["retried"],
+            worker_failed=stats.metrics["failed"],
+            delivery_lag=VotifierDeliveryLagDto(**stats.metrics["lag"]),
+        )
@@ -1,15 +1,83 @@
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, JobSubmissionEvent
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 
+from msc.config import config
+from msc.constants import POLL_WORKER_HEARTBEAT_INTERVAL
 from msc.database import get_url
 from msc.jobs.tasks import set_all_minecraft_versions
-from msc.services.ping_service import poll_servers_async, update_servers_uptime
+from msc.models.poll_cycle import PollCycleKind
+from msc.services.history_service import (
+    compact_server_history_task,
+    roll_up_server_history_task,
+)
+from msc.services.leaderboard_service import reconcile_leaderboard_task
+from msc.services.partition_service import maintain_partitions_task
+from msc.services.ping_service import poll_due_servers_async, update_servers_uptime
+from msc.services.poll_cycle_service import record_skipped_run
+from msc.services.poll_shard_service import heartbeat_task
+from msc.services.vote_service import (
+    prune_vote_cooldowns_task,
+    reconcile_server_vote_stats_task,
+)
+from msc.services.votifier_service import prune_votifier_deliveries_task
+
+POLL_JOB_ID = "poll_due_servers"
+UPTIME_JOB_ID = "update_servers_uptime"
+
+_poll_cycle_jobs = {
+    POLL_JOB_ID: PollCycleKind.POLL,
+    UPTIME_JOB_ID: PollCycleKind.UPTIME,
+}
+
+
+def _on_job_max_instances(event: JobSubmissionEvent):
+    """Counts polling job runs skipped because the previous run overlapped them,
+    the count is recorded with the job's next poll cycle"""
+
+    kind = _poll_cycle_jobs.get(event.job_id)
+
+    if kind is not None:
+        record_skipped_run(kind)
+
 
 scheduler = BackgroundScheduler()
 persisted_scheduler = BackgroundScheduler()
 
 persisted_scheduler.add_jobstore("sqlalchemy", url=get_url())
 
-scheduler.add_job(poll_servers_async, "interval", seconds=900)
-scheduler.add_job(update_servers_uptime, "interval", seconds=3600)
+scheduler.add_listener(_on_job_max_instances, EVENT_JOB_MAX_INSTANCES)
+
+scheduler.add_job(
+    poll_due_servers_async,
+    "interval",
+    seconds=config.poll_scheduler_tick,
+    id=POLL_JOB_ID,
+)
+
+if config.poll_sharding:
+    scheduler.add_job(
+        heartbeat_task,
+        "interval",
+        seconds=POLL_WORKER_HEARTBEAT_INTERVAL,
+    )
+
+scheduler.add_job(
+    update_servers_uptime,
+    "interval",
+    seconds=3600,
+    id=UPTIME_JOB_ID,
+)
 scheduler.add_job(set_all_minecraft_versions, trigger=CronTrigger(hour=2))
+scheduler.add_job(maintain_partitions_task, trigger=CronTrigger(hour=1))
+scheduler.add_job(compact_server_history_task, trigger=CronTrigger(hour=3))
+scheduler.add_job(roll_up_server_history_task, trigger=CronTrigger(minute=10))
+scheduler.add_job(prune_vote_cooldowns_task, trigger=CronTrigger(minute=40))
+# just after midnight, so the first run of a month rolls the counters over
+scheduler.add_job(
+    reconcile_server_vote_stats_task,
+    trigger=CronTrigger(hour=0, minute=5),
+)
+# after the vote counters it's rebuilt from are reconciled
+scheduler.add_job(reconcile_leaderboard_task, trigger=CronTrigger(hour=0, minute=15))
+scheduler.add_job(prune_votifier_deliveries_task, trigger=CronTrigger(hour=4))
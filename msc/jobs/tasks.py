@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from msc.database import get_db
 from msc.errors import InternalError
 from msc.models.minecraft_version import MinecraftVersion, VersionType
+from msc.services.version_service import version_resolver
 
 logger = logging.getLogger(__name__)
 
@@ -84,3 +85,6 @@ def set_all_minecraft_versions():
 
         db.add(minecraft_version)
         db.commit()
+
+    # pick up the new versions on the next lookup
+    version_resolver.invalidate()
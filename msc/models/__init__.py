@@ -5,11 +5,21 @@ SQLAlchemy models for the msc app.
 from .auction import Auction
 from .auction_bid import AuctionBid
 from .minecraft_version import MinecraftVersion
+from .poll_breaker import PollBreaker
+from .poll_cycle import PollCycle
+from .poll_worker import PollWorker
 from .server import Server
 from .server_history import ServerHistory
+from .server_history_daily import ServerHistoryDaily
+from .server_history_hourly import ServerHistoryHourly
 from .server_history_old import ServerHistoryOld
+from .server_leaderboard import ServerLeaderboard
+from .server_uptime_bucket import ServerUptimeBucket
+from .server_vote_stats import ServerVoteStats
 from .sponsor import Sponsor
 from .tag import Tag
 from .user import User
 from .vote import Vote
+from .vote_cooldown import VoteCooldown
 from .vote_history import VoteHistory
+from .votifier_delivery import VotifierDelivery
@@ -0,0 +1,51 @@
+import enum
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Enum, Index, Integer, String
+
+from msc.database import Base
+
+
+class BreakerState(str, enum.Enum):
+    CLOSED = "Closed"
+    OPEN = "Open"
+
+
+class PollBreaker(Base):
+    """
+    Represents the circuit breaker of a server endpoint which is failing to be
+    polled, rows are removed once the endpoint answers again
+    """
+
+    __tablename__ = "poll_breaker"
+
+    endpoint = Column(String, primary_key=True, nullable=False)
+    state = Column(Enum(BreakerState), nullable=False)
+    consecutive_failures = Column(Integer, nullable=False)
+    opened_at = Column(DateTime, nullable=True)
+    next_check_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "idx_poll_breaker_next_check_at",
+            "next_check_at",
+            postgresql_where=state == BreakerState.OPEN,
+        ),
+    )
+
+    def __init__(
+        self,
+        endpoint: str,
+        state: BreakerState = BreakerState.CLOSED,
+        consecutive_failures: int = 0,
+        opened_at: datetime = None,
+        next_check_at: datetime = None,
+    ):
+        self.endpoint = endpoint
+        self.state = state
+        self.consecutive_failures = consecutive_failures
+        self.opened_at = opened_at
+        self.next_check_at = next_check_at
+
+        self.updated_at = datetime.utcnow()
@@ -0,0 +1,68 @@
+import enum
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import Column, DateTime, Enum, Float, Index, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+
+from msc.database import Base
+
+
+class PollCycleKind(str, enum.Enum):
+    POLL = "Poll"
+    UPTIME = "Uptime"
+
+
+class PollCycle(Base):
+    """
+    Represents a run of a polling job, kept as a ledger to track poll throughput
+    over time
+    """
+
+    __tablename__ = "poll_cycle"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, nullable=False, default=uuid4)
+    kind = Column(Enum(PollCycleKind), nullable=False)
+    worker_id = Column(String, nullable=False)
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=False)
+    servers_attempted = Column(Integer, nullable=False, default=0)
+    servers_online = Column(Integer, nullable=True)
+    servers_failed = Column(Integer, nullable=False, default=0)
+    probe_p50_ms = Column(Float, nullable=True)
+    probe_p95_ms = Column(Float, nullable=True)
+    probe_p99_ms = Column(Float, nullable=True)
+    write_ms = Column(Float, nullable=True)
+    # runs of the job skipped by the scheduler since the previous cycle, as the
+    # previous run was still going
+    skipped_overlaps = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (Index("idx_poll_cycle_kind_started_at", "kind", "started_at"),)
+
+    def __init__(
+        self,
+        kind: PollCycleKind,
+        worker_id: str,
+        started_at: datetime,
+        finished_at: datetime,
+        servers_attempted: int = 0,
+        servers_online: int = None,
+        servers_failed: int = 0,
+        probe_p50_ms: float = None,
+        probe_p95_ms: float = None,
+        probe_p99_ms: float = None,
+        write_ms: float = None,
+        skipped_overlaps: int = 0,
+    ):
+        self.kind = kind
+        self.worker_id = worker_id
+        self.started_at = started_at
+        self.finished_at = finished_at
+        self.servers_attempted = servers_attempted
+        self.servers_online = servers_online
+        self.servers_failed = servers_failed
+        self.probe_p50_ms = probe_p50_ms
+        self.probe_p95_ms = probe_p95_ms
+        self.probe_p99_ms = probe_p99_ms
+        self.write_ms = write_ms
+        self.skipped_overlaps = skipped_overlaps
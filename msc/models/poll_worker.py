@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Float, Integer, String
+
+from msc.database import Base
+
+
+class PollWorker(Base):
+    """
+    Represents a worker taking part in sharded polling and the progress of its
+    latest poll cycle
+    """
+
+    __tablename__ = "poll_worker"
+
+    worker_id = Column(String, primary_key=True, nullable=False)
+    started_at = Column(DateTime, nullable=False)
+    heartbeat_at = Column(DateTime, nullable=False)
+    shard_size = Column(Integer, nullable=False, default=0)
+    servers_polled = Column(Integer, nullable=False, default=0)
+    probes_timed_out = Column(Integer, nullable=False, default=0)
+    last_cycle_at = Column(DateTime, nullable=True)
+    last_cycle_duration = Column(Float, nullable=True)
+
+    def __init__(
+        self,
+        worker_id: str,
+    ):
+        self.worker_id = worker_id
+
+        self.started_at = datetime.utcnow()
+        self.heartbeat_at = self.started_at
+        self.shard_size = 0
+        self.servers_polled = 0
+        self.probes_timed_out = 0
@@ -10,6 +10,7 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKeyConstraint,
+    Index,
     Integer,
     Text,
     UniqueConstraint,
@@ -56,11 +57,16 @@ class Server(Base):
     banner_filetype = Column(Text, nullable=True)
     icon_checksum = Column(Text, nullable=True)
     last_pinged_at = Column(DateTime, nullable=True)
+    latency = Column(Integer, nullable=True)
+    next_poll_at = Column(DateTime, nullable=True)
+    consecutive_poll_failures = Column(Integer, nullable=False, default=0)
     owner_name = Column(Text, nullable=True)
     web_store = Column(Text, nullable=True)
     flagged_for_deletion = Column(Boolean, nullable=False)
     flagged_for_deletion_at = Column(DateTime, nullable=True)
     uptime = Column(Float, nullable=False)
+    uptime_24h = Column(Float, nullable=True)
+    uptime_7d = Column(Float, nullable=True)
     search_index = Column(TSVECTOR(), nullable=False)
 
     tags = relationship("Tag", backref="server")
@@ -79,6 +85,11 @@ class Server(Base):
             "java_ip_address IS NOT NULL OR bedrock_ip_address IS NOT NULL",
             name="check_ip_address",
         ),
+        Index(
+            "idx_server_next_poll_at",
+            "next_poll_at",
+            postgresql_where=flagged_for_deletion.is_(False),
+        ),
     )
 
     def __init__(
@@ -127,6 +138,7 @@ class Server(Base):
         self.web_store = web_store
         self.flagged_for_deletion = False
         self.uptime = 100.0
+        self.consecutive_poll_failures = 0
         self.use_votifier = use_votifier
 
         current_datetime = datetime.utcnow()
@@ -1,14 +1,7 @@
 from datetime import datetime
 from uuid import UUID, uuid4
 
-from sqlalchemy import (
-    Boolean,
-    Column,
-    DateTime,
-    ForeignKeyConstraint,
-    Integer,
-    UniqueConstraint,
-)
+from sqlalchemy import Boolean, Column, DateTime, ForeignKeyConstraint, Index, Integer
 from sqlalchemy.dialects.postgresql import UUID
 
 from msc.database import Base
@@ -16,7 +9,9 @@ from msc.database import Base
 
 class ServerHistory(Base):
     """
-    Represents a historical data point for a server listing for the past month
+    Represents a historical data point for a server listing for the past month,
+    partitioned by month on the time it was made so the partition key is part of
+    the primary key
     """
 
     __tablename__ = "server_history"
@@ -30,18 +25,23 @@ class ServerHistory(Base):
     new_votes = Column(Integer, nullable=False)
     votes_this_month = Column(Integer, nullable=False)
     total_votes = Column(Integer, nullable=False)
-    created_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, primary_key=True, nullable=False)
 
     __table_args__ = (
-        UniqueConstraint(
-            "id",
-            name="unique_server_history_id",
-        ),
         ForeignKeyConstraint(
             ["server_id"],
             ["server.id"],
             ondelete="CASCADE",
         ),
+        # covers the latest data point lookups of the poll writer and the uptime
+        # recounts, so they are answered from the index alone
+        Index(
+            "idx_server_history_server_id_created_at",
+            "server_id",
+            "created_at",
+            postgresql_include=["total_votes", "is_online"],
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
 
     def __init__(
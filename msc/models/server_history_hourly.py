@@ -0,0 +1,44 @@
+from sqlalchemy import Column, DateTime, Float, ForeignKeyConstraint, Index, Integer
+from sqlalchemy.dialects.postgresql import UUID
+
+from msc.database import Base
+
+
+class ServerHistoryHourly(Base):
+    """
+    Represents the data points of a server for an hour, added onto as data points
+    are written so history never has to be aggregated from the raw data points
+    """
+
+    __tablename__ = "server_history_hourly"
+
+    server_id = Column(UUID(as_uuid=True), primary_key=True, nullable=False)
+    # the start of the bucket
+    bucket = Column(DateTime, primary_key=True, nullable=False)
+    data_points = Column(Integer, nullable=False, default=0)
+    online_count = Column(Integer, nullable=False, default=0)
+    players_sum = Column(Integer, nullable=False, default=0)
+    min_players = Column(Integer, nullable=False)
+    max_players = Column(Integer, nullable=False)
+    # only set once the bucket has closed, as percentiles cannot be added onto
+    p50_players = Column(Float, nullable=True)
+    p95_players = Column(Float, nullable=True)
+    best_rank = Column(Integer, nullable=True)
+    uptime_sum = Column(Integer, nullable=True)
+    new_votes = Column(Integer, nullable=True)
+    votes_this_month = Column(Integer, nullable=True)
+    total_votes = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["server_id"],
+            ["server.id"],
+            ondelete="CASCADE",
+        ),
+        # buckets are sealed oldest first
+        Index(
+            "idx_server_history_hourly_unsealed",
+            "bucket",
+            postgresql_where=p50_players.is_(None),
+        ),
+    )
@@ -17,7 +17,8 @@ from msc.database import Base
 class ServerHistoryOld(Base):
     """
     Represents a historical data point for a server listing older than a month,
-    data points are aggregated by day
+    data points are aggregated by day. No longer written, the days it holds were
+    copied into the daily rollups which serve compacted history
     """
 
     __tablename__ = "server_history_old"
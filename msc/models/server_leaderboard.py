@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKeyConstraint, Index, Integer
+from sqlalchemy.dialects.postgresql import UUID
+
+from msc.database import Base
+
+
+class ServerLeaderboard(Base):
+    """
+    Represents a listed server's place on the leaderboard, the votes it has this
+    month. Servers without votes this month and servers flagged for deletion
+    have no entry, entries of an earlier month are ignored until pruned
+    """
+
+    __tablename__ = "server_leaderboard"
+
+    server_id = Column(UUID(as_uuid=True), primary_key=True, nullable=False)
+    month_start = Column(DateTime, nullable=False)
+    votes_this_month = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["server_id"],
+            ["server.id"],
+            ondelete="CASCADE",
+        ),
+        # a server's rank is a count of the entries ahead of it, read from the
+        # index alone
+        Index(
+            "idx_server_leaderboard_month_start_votes_this_month",
+            "month_start",
+            "votes_this_month",
+        ),
+    )
+
+    def __init__(
+        self,
+        server_id: UUID,
+        month_start: datetime,
+        votes_this_month: int,
+    ):
+        self.server_id = server_id
+        self.month_start = month_start
+        self.votes_this_month = votes_this_month
+        self.updated_at = datetime.utcnow()
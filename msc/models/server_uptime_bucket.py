@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Date, ForeignKeyConstraint, Integer
+from sqlalchemy.dialects.postgresql import UUID
+
+from msc.database import Base
+
+
+class ServerUptimeBucket(Base):
+    """
+    Represents the seconds a server was seen online and the seconds it was polled
+    over for a day, kept up to date as data points are written so uptime never
+    has to be counted from the history
+    """
+
+    __tablename__ = "server_uptime_bucket"
+
+    server_id = Column(UUID(as_uuid=True), primary_key=True, nullable=False)
+    day = Column(Date, primary_key=True, nullable=False)
+    online_seconds = Column(Integer, nullable=False, default=0)
+    total_seconds = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["server_id"],
+            ["server.id"],
+            ondelete="CASCADE",
+        ),
+    )
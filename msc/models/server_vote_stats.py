@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKeyConstraint, Integer
+from sqlalchemy.dialects.postgresql import UUID
+
+from msc.database import Base
+
+
+class ServerVoteStats(Base):
+    """
+    Represents a server's vote counters, kept up to date by the statement which
+    adds a vote so listings and ranks don't aggregate the vote table.
+    votes_this_month counts the votes of the month starting at month_start, the
+    counter of an earlier month is rolled over by the next vote or the
+    reconciliation job
+    """
+
+    __tablename__ = "server_vote_stats"
+
+    server_id = Column(UUID(as_uuid=True), primary_key=True, nullable=False)
+    total_votes = Column(Integer, nullable=False, default=0)
+    votes_this_month = Column(Integer, nullable=False, default=0)
+    month_start = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["server_id"],
+            ["server.id"],
+            ondelete="CASCADE",
+        ),
+    )
+
+    def __init__(
+        self,
+        server_id: UUID,
+        total_votes: int,
+        votes_this_month: int,
+        month_start: datetime,
+    ):
+        self.server_id = server_id
+        self.total_votes = total_votes
+        self.votes_this_month = votes_this_month
+        self.month_start = month_start
+        self.updated_at = datetime.utcnow()
@@ -1,7 +1,7 @@
 from datetime import datetime
 from uuid import uuid4
 
-from sqlalchemy import Column, DateTime, ForeignKeyConstraint, Text, UniqueConstraint
+from sqlalchemy import Column, DateTime, ForeignKeyConstraint, Index, Text
 from sqlalchemy.dialects.postgresql import UUID
 
 from msc.database import Base
@@ -9,7 +9,8 @@ from msc.database import Base
 
 class Vote(Base):
     """
-    Represents a vote
+    Represents a vote, partitioned by month on the time it was made so the
+    partition key is part of the primary key
     """
 
     __tablename__ = "vote"
@@ -18,7 +19,7 @@ class Vote(Base):
     server_id = Column(UUID(as_uuid=True), nullable=False)
     client_ip_address = Column(Text, nullable=False)
     minecraft_username = Column(Text, nullable=False)
-    created_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, primary_key=True, nullable=False)
 
     __table_args__ = (
         ForeignKeyConstraint(
@@ -26,10 +27,20 @@ class Vote(Base):
             ["server.id"],
             ondelete="CASCADE",
         ),
-        UniqueConstraint(
-            "id",
-            name="unique_vote_id",
+        Index("idx_vote_server_id_created_at", "server_id", "created_at"),
+        Index(
+            "idx_vote_server_id_client_ip_address_created_at",
+            "server_id",
+            "client_ip_address",
+            "created_at",
         ),
+        Index(
+            "idx_vote_server_id_minecraft_username_created_at",
+            "server_id",
+            "minecraft_username",
+            "created_at",
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
 
     def __init__(
@@ -0,0 +1,47 @@
+import enum
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Enum, ForeignKeyConstraint, Text
+from sqlalchemy.dialects.postgresql import UUID
+
+from msc.database import Base
+
+
+class VoteCooldownKind(str, enum.Enum):
+    IP_ADDRESS = "IpAddress"
+    MINECRAFT_USERNAME = "MinecraftUsername"
+
+
+class VoteCooldown(Base):
+    """
+    Represents the time a voter can next vote for a server, by IP address or by
+    Minecraft username. A vote claims both rows, so the primary key stops two
+    concurrent votes from both being accepted
+    """
+
+    __tablename__ = "vote_cooldown"
+
+    server_id = Column(UUID(as_uuid=True), primary_key=True, nullable=False)
+    kind = Column(Enum(VoteCooldownKind), primary_key=True, nullable=False)
+    value = Column(Text, primary_key=True, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["server_id"],
+            ["server.id"],
+            ondelete="CASCADE",
+        ),
+    )
+
+    def __init__(
+        self,
+        server_id: UUID,
+        kind: VoteCooldownKind,
+        value: str,
+        expires_at: datetime,
+    ):
+        self.server_id = server_id
+        self.kind = kind
+        self.value = value
+        self.expires_at = expires_at
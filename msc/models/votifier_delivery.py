@@ -0,0 +1,75 @@
+import enum
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Enum,
+    ForeignKeyConstraint,
+    Index,
+    Integer,
+    Text,
+)
+from sqlalchemy.dialects.postgresql import UUID
+
+from msc.database import Base
+
+
+class VotifierDeliveryStatus(str, enum.Enum):
+    PENDING = "Pending"
+    DELIVERED = "Delivered"
+    FAILED = "Failed"
+
+
+class VotifierDelivery(Base):
+    """
+    Represents a vote waiting to be sent to, or sent to, a server's votifier. Rows
+    are added in the same transaction as the vote and drained by the votifier
+    outbox worker
+    """
+
+    __tablename__ = "votifier_delivery"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, nullable=False, default=uuid4)
+    vote_id = Column(UUID(as_uuid=True), nullable=False)
+    server_id = Column(UUID(as_uuid=True), nullable=False)
+    minecraft_username = Column(Text, nullable=False)
+    client_ip_address = Column(Text, nullable=False)
+    status = Column(Enum(VotifierDeliveryStatus), nullable=False)
+    attempts = Column(Integer, nullable=False)
+    next_attempt_at = Column(DateTime, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    delivered_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["server_id"],
+            ["server.id"],
+            ondelete="CASCADE",
+        ),
+        Index(
+            "idx_votifier_delivery_next_attempt_at",
+            "next_attempt_at",
+            postgresql_where=status == VotifierDeliveryStatus.PENDING,
+        ),
+    )
+
+    def __init__(
+        self,
+        vote_id: UUID,
+        server_id: UUID,
+        minecraft_username: str,
+        client_ip_address: str,
+    ):
+        self.vote_id = vote_id
+        self.server_id = server_id
+        self.minecraft_username = minecraft_username
+        self.client_ip_address = client_ip_address
+        self.status = VotifierDeliveryStatus.PENDING
+        self.attempts = 0
+
+        now = datetime.utcnow()
+        self.next_attempt_at = now
+        self.created_at = now
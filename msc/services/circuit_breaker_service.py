@@ -0,0 +1,203 @@
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from msc.config import config
+from msc.constants import BREAKER_BASE_BACKOFF, BREAKER_FAILURE_THRESHOLD
+from msc.models import PollBreaker
+from msc.models.poll_breaker import BreakerState
+
+logger = logging.getLogger(__name__)
+
+# caps the backoff exponent, the backoff is clamped to the maximum long before this
+MAX_BACKOFF_EXPONENT = 32
+
+
+@contextmanager
+def _handle_db_errors():
+    """Handles database errors"""
+    try:
+        yield
+    except Exception as e:
+        # TODO: Raise a custom exception here
+        raise e
+
+
+@dataclass
+class BreakerUpdate:
+    state: BreakerState
+    consecutive_failures: int
+    opened_at: Optional[datetime]
+    next_check_at: Optional[datetime]
+
+
+def get_endpoint(target) -> Optional[str]:
+    """Gets the endpoint a server or poll target is probed at, java is preferred
+    as servers with both addresses are only polled on java"""
+
+    if target.java_ip_address:
+        address = target.java_ip_address.lower()
+        return f"java:{address}:{target.java_port or ''}"
+
+    if target.bedrock_ip_address:
+        address = target.bedrock_ip_address.lower()
+        return f"bedrock:{address}:{target.bedrock_port or ''}"
+
+    return None
+
+
+def get_breaker_backoff(consecutive_failures: int) -> int:
+    """Works out how many seconds an open breaker waits before its next half-open
+    check, doubling for every failure past the threshold
+
+    The backoff is capped at the maximum poll interval, as uptime counts no data
+    point for longer than that, see uptime_service.get_data_point_seconds"""
+
+    exponent = min(
+        max(consecutive_failures - BREAKER_FAILURE_THRESHOLD, 0),
+        MAX_BACKOFF_EXPONENT,
+    )
+
+    return min(BREAKER_BASE_BACKOFF * 2**exponent, config.poll_max_interval)
+
+
+def get_breaker_update(
+    breaker: Optional[PollBreaker],
+    is_online: bool,
+    polled_at: datetime,
+) -> Optional[BreakerUpdate]:
+    """Works out an endpoint's breaker after it has been polled
+
+    :returns: The new breaker, or None if the endpoint answered and its breaker
+        should be removed"""
+
+    if is_online:
+        return None
+
+    consecutive_failures = (breaker.consecutive_failures if breaker else 0) + 1
+
+    if consecutive_failures < BREAKER_FAILURE_THRESHOLD:
+        return BreakerUpdate(
+            state=BreakerState.CLOSED,
+            consecutive_failures=consecutive_failures,
+            opened_at=None,
+            next_check_at=None,
+        )
+
+    opened_at = polled_at
+
+    if breaker is not None and breaker.state == BreakerState.OPEN:
+        opened_at = breaker.opened_at
+
+    return BreakerUpdate(
+        state=BreakerState.OPEN,
+        consecutive_failures=consecutive_failures,
+        opened_at=opened_at,
+        next_check_at=polled_at
+        + timedelta(seconds=get_breaker_backoff(consecutive_failures)),
+    )
+
+
+def get_breakers(db: Session, endpoints: Iterable[str]) -> Dict[str, PollBreaker]:
+    """Gets the breakers of some endpoints in a single query"""
+
+    endpoints = [endpoint for endpoint in endpoints if endpoint]
+
+    if not endpoints:
+        return {}
+
+    with _handle_db_errors():
+        return {
+            breaker.endpoint: breaker
+            for breaker in db.query(PollBreaker)
+            .filter(
+                PollBreaker.endpoint.in_(endpoints),
+            )
+            .all()
+        }
+
+
+def get_open_breakers(db: Session) -> Dict[str, PollBreaker]:
+    """Gets every open breaker"""
+
+    with _handle_db_errors():
+        return {
+            breaker.endpoint: breaker
+            for breaker in db.query(PollBreaker)
+            .filter(
+                PollBreaker.state == BreakerState.OPEN,
+            )
+            .all()
+        }
+
+
+def save_breaker_updates(
+    db: Session,
+    updates: Dict[str, Optional[BreakerUpdate]],
+):
+    """Saves breaker updates without committing, with one upsert for failing
+    endpoints and one delete for endpoints which answered"""
+
+    now = datetime.utcnow()
+
+    rows = [
+        {
+            "endpoint": endpoint,
+            "state": update.state,
+            "consecutive_failures": update.consecutive_failures,
+            "opened_at": update.opened_at,
+            "next_check_at": update.next_check_at,
+            "updated_at": now,
+        }
+        for endpoint, update in updates.items()
+        if update is not None
+    ]
+    recovered = [endpoint for endpoint, update in updates.items() if update is None]
+
+    if rows:
+        statement = insert(PollBreaker.__table__)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["endpoint"],
+                set_={
+                    column: statement.excluded[column]
+                    for column in rows[0].keys()
+                    if column != "endpoint"
+                },
+            ),
+            rows,
+        )
+
+    if recovered:
+        db.query(PollBreaker).filter(
+            PollBreaker.endpoint.in_(recovered),
+        ).delete(synchronize_session=False)
+
+
+def get_poll_breakers(db: Session) -> List[PollBreaker]:
+    """Gets every breaker, open breakers first"""
+
+    with _handle_db_errors():
+        return (
+            db.query(PollBreaker)
+            .order_by(
+                PollBreaker.state.desc(),
+                PollBreaker.consecutive_failures.desc(),
+            )
+            .all()
+        )
+
+
+def reset_poll_breaker(db: Session, endpoint: str):
+    """Removes an endpoint's breaker so it is polled normally again"""
+
+    with _handle_db_errors():
+        db.query(PollBreaker).filter(
+            PollBreaker.endpoint == endpoint,
+        ).delete()
+        db.commit()
@@ -0,0 +1,506 @@
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import Float, case, cast, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from msc.constants import (
+    HISTORY_COMPACTION_BATCH_SIZE,
+    HISTORY_HOURLY_ROLLUP_RETENTION_DAYS,
+    HISTORY_RAW_RETENTION_DAYS,
+    HISTORY_ROLLUP_SEAL_DELAY,
+    HISTORY_ROLLUP_SEAL_LOOKBACK_DAYS,
+)
+from msc.database import get_db
+from msc.models import ServerHistory, ServerHistoryDaily, ServerHistoryHourly
+from msc.services.partition_service import Partition, drop_partition, get_partitions
+from msc.utils.time_utils import get_day_range, get_month_start, in_range
+
+logger = logging.getLogger(__name__)
+
+# the rollup kept for each history time interval
+HISTORY_ROLLUPS = {
+    "hour": ServerHistoryHourly,
+    "day": ServerHistoryDaily,
+}
+
+
+@contextmanager
+def _handle_db_errors():
+    """Handles database errors"""
+    try:
+        yield
+    except Exception as e:
+        # TODO: Raise a custom exception here
+        raise e
+
+
+@dataclass
+class CompactionStats:
+    batches: int = 0
+    rows_compacted: int = 0
+    partitions_dropped: int = 0
+
+
+def get_compaction_cutoff(now: Optional[datetime] = None) -> datetime:
+    """Gets the time raw data points are compacted before, the start of the month
+    the retention period ends in, so raw history is removed a whole monthly
+    partition at a time and is kept for at least the retention period"""
+
+    now = now or datetime.utcnow()
+
+    return get_month_start(now - timedelta(days=HISTORY_RAW_RETENTION_DAYS))
+
+
+def _get_oldest_raw_day(db: Session, cutoff: datetime) -> Optional[datetime]:
+    oldest = (
+        db.query(func.min(ServerHistory.created_at))
+        .filter(
+            ServerHistory.created_at < cutoff,
+        )
+        .scalar()
+    )
+
+    if oldest is None:
+        return None
+
+    return datetime.combine(oldest.date(), time())
+
+
+def compact_server_history_batch(
+    db: Session,
+    day: datetime,
+    batch_size: int = HISTORY_COMPACTION_BATCH_SIZE,
+) -> int:
+    """Deletes a day of raw data points for up to a batch of servers
+
+    :returns: The number of raw data points deleted"""
+
+    in_day = in_range(ServerHistory.created_at, *get_day_range(day))
+
+    with _handle_db_errors():
+        server_ids = [
+            server_id
+            for server_id, in db.query(ServerHistory.server_id)
+            .filter(in_day)
+            .distinct()
+            .limit(batch_size)
+            .all()
+        ]
+
+        if not server_ids:
+            return 0
+
+        rows_compacted = (
+            db.query(ServerHistory)
+            .filter(ServerHistory.server_id.in_(server_ids), in_day)
+            .delete(
+                synchronize_session=False,
+            )
+        )
+
+        db.commit()
+
+    return rows_compacted
+
+
+def compact_server_history_partition(db: Session, partition: Partition) -> int:
+    """Drops a monthly partition of raw data points
+
+    :returns: The number of raw data points dropped"""
+
+    with _handle_db_errors():
+        rows_compacted = (
+            db.query(func.count(ServerHistory.id))
+            .filter(
+                in_range(ServerHistory.created_at, partition.start, partition.end),
+            )
+            .scalar()
+        )
+
+        drop_partition(db=db, partition=partition)
+
+    return rows_compacted
+
+
+def compact_server_history(
+    db: Session,
+    cutoff: Optional[datetime] = None,
+    batch_size: int = HISTORY_COMPACTION_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+) -> CompactionStats:
+    """Removes raw data points older than the cutoff, the oldest first
+
+    Every data point is added onto its server's daily rollup as it's written and
+    the daily rollups are kept, so the history of compacted days is served from
+    them. Monthly partitions which end before the cutoff are dropped whole, any
+    data points left in the default partition are deleted a day at a time.
+    Every partition and batch is committed on its own, so the next run carries
+    on from the oldest data points left
+
+    :param cutoff: Data points before this are compacted, defaults to
+        get_compaction_cutoff
+    :param max_batches: Stops after this many batches, runs until there is
+        nothing left to compact if not provided"""
+
+    cutoff = cutoff or get_compaction_cutoff()
+    stats = CompactionStats()
+
+    for partition in get_partitions(db=db, table=ServerHistory.__tablename__):
+        if partition.is_default or partition.end > cutoff:
+            continue
+
+        if max_batches is not None and stats.batches >= max_batches:
+            return stats
+
+        rows_compacted = compact_server_history_partition(db=db, partition=partition)
+
+        stats.batches += 1
+        stats.partitions_dropped += 1
+        stats.rows_compacted += rows_compacted
+
+    while max_batches is None or stats.batches < max_batches:
+        day = _get_oldest_raw_day(db=db, cutoff=cutoff)
+
+        if day is None:
+            break
+
+        rows_compacted = compact_server_history_batch(
+            db=db,
+            day=day,
+            batch_size=batch_size,
+        )
+
+        stats.batches += 1
+        stats.rows_compacted += rows_compacted
+
+    return stats
+
+
+def compact_server_history_task():
+    """Compacts raw server history older than the retention period"""
+
+    # create a new db session for this job
+    db: Session = next(get_db())
+
+    logger.info("Compacting server history")
+
+    try:
+        stats = compact_server_history(db=db)
+
+        logger.info(
+            f"Compacted {stats.rows_compacted} data points in {stats.batches} "
+            f"batches, dropping {stats.partitions_dropped} partitions"
+        )
+    except Exception as e:
+        logger.error(f"Error compacting server history: {e}")
+    finally:
+        db.close()
+
+
+def get_bucket_start(value: datetime, time_interval: str) -> datetime:
+    """Gets the start of the hour or day bucket a time falls in"""
+
+    if time_interval == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+
+    return datetime.combine(value.date(), time())
+
+
+def get_hourly_rollup_cutoff(now: Optional[datetime] = None) -> datetime:
+    """Gets the time hourly rollups are kept from, always the start of a day so
+    the daily rollups can take over from it"""
+
+    now = now or datetime.utcnow()
+
+    return get_bucket_start(
+        now - timedelta(days=HISTORY_HOURLY_ROLLUP_RETENTION_DAYS),
+        "day",
+    )
+
+
+def add_history_rollups(
+    db: Session,
+    data_points: Iterable[dict],
+):
+    """Adds data points to their servers' hourly and daily rollups without
+    committing, with a single upsert per rollup
+
+    :param data_points: The column values of each server history data point"""
+
+    data_points = list(data_points)
+
+    if not data_points:
+        return
+
+    for time_interval, rollup in HISTORY_ROLLUPS.items():
+        buckets: Dict[Tuple[UUID, datetime], dict] = defaultdict(
+            lambda: {
+                "data_points": 0,
+                "online_count": 0,
+                "players_sum": 0,
+                "uptime_sum": 0,
+                "new_votes": 0,
+            }
+        )
+
+        for data_point in data_points:
+            server_id = data_point["server_id"]
+            bucket_start = get_bucket_start(data_point["created_at"], time_interval)
+            players = data_point["players"]
+
+            bucket = buckets[(server_id, bucket_start)]
+            bucket["server_id"] = server_id
+            bucket["bucket"] = bucket_start
+            bucket["data_points"] += 1
+            bucket["online_count"] += 1 if data_point["is_online"] else 0
+            bucket["players_sum"] += players
+            bucket["min_players"] = min(bucket.get("min_players", players), players)
+            bucket["max_players"] = max(bucket.get("max_players", players), players)
+            bucket["best_rank"] = min(
+                bucket.get("best_rank", data_point["rank"]), data_point["rank"]
+            )
+            bucket["uptime_sum"] += data_point["uptime"]
+            bucket["new_votes"] += data_point["new_votes"]
+            bucket["votes_this_month"] = max(
+                bucket.get("votes_this_month", data_point["votes_this_month"]),
+                data_point["votes_this_month"],
+            )
+            bucket["total_votes"] = max(
+                bucket.get("total_votes", data_point["total_votes"]),
+                data_point["total_votes"],
+            )
+
+        table = rollup.__table__
+        statement = insert(table)
+        excluded = statement.excluded
+
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["server_id", "bucket"],
+                set_={
+                    "data_points": table.c.data_points + excluded.data_points,
+                    "online_count": table.c.online_count + excluded.online_count,
+                    "players_sum": table.c.players_sum + excluded.players_sum,
+                    "min_players": func.least(
+                        table.c.min_players, excluded.min_players
+                    ),
+                    "max_players": func.greatest(
+                        table.c.max_players, excluded.max_players
+                    ),
+                    "best_rank": func.least(table.c.best_rank, excluded.best_rank),
+                    "uptime_sum": func.coalesce(table.c.uptime_sum, 0)
+                    + excluded.uptime_sum,
+                    "new_votes": func.coalesce(table.c.new_votes, 0)
+                    + excluded.new_votes,
+                    "votes_this_month": func.greatest(
+                        table.c.votes_this_month, excluded.votes_this_month
+                    ),
+                    "total_votes": func.greatest(
+                        table.c.total_votes, excluded.total_votes
+                    ),
+                },
+            ),
+            list(buckets.values()),
+        )
+
+
+def get_players_percentiles(time_interval: str):
+    """Builds the columns of a raw data point query which group data points into
+    buckets and take the p50 and p95 players of each"""
+
+    return (
+        func.date_trunc(time_interval, ServerHistory.created_at),
+        cast(
+            func.percentile_cont(0.5).within_group(ServerHistory.players),
+            Float,
+        ),
+        cast(
+            func.percentile_cont(0.95).within_group(ServerHistory.players),
+            Float,
+        ),
+    )
+
+
+def rebuild_history_rollups(db: Session, server_id: Optional[UUID] = None):
+    """Rebuilds the hourly and daily rollups the raw history still covers from
+    the raw data points without committing, for every server or only one"""
+
+    now = datetime.utcnow()
+    # raw data points are always kept from the compaction cutoff, which is the
+    # start of a month so the start of an hour and a day too
+    since = get_compaction_cutoff(now)
+
+    with _handle_db_errors():
+        for time_interval, rollup in HISTORY_ROLLUPS.items():
+            bucket, p50_players, p95_players = get_players_percentiles(time_interval)
+            # the current bucket is sealed once it closes
+            is_closed = bucket < get_bucket_start(now, time_interval)
+
+            delete_query = db.query(rollup).filter(rollup.bucket >= since)
+            history_query = select(
+                ServerHistory.server_id,
+                bucket,
+                func.count(),
+                func.count().filter(ServerHistory.is_online == True),
+                func.sum(ServerHistory.players),
+                func.min(ServerHistory.players),
+                func.max(ServerHistory.players),
+                case((is_closed, p50_players)),
+                case((is_closed, p95_players)),
+                func.min(ServerHistory.rank),
+                func.sum(ServerHistory.uptime),
+                func.sum(ServerHistory.new_votes),
+                func.max(ServerHistory.votes_this_month),
+                func.max(ServerHistory.total_votes),
+            ).where(
+                ServerHistory.created_at >= since,
+            )
+
+            if server_id is not None:
+                delete_query = delete_query.filter(rollup.server_id == server_id)
+                history_query = history_query.where(
+                    ServerHistory.server_id == server_id
+                )
+
+            delete_query.delete(synchronize_session=False)
+
+            db.execute(
+                insert(rollup).from_select(
+                    [
+                        "server_id",
+                        "bucket",
+                        "data_points",
+                        "online_count",
+                        "players_sum",
+                        "min_players",
+                        "max_players",
+                        "p50_players",
+                        "p95_players",
+                        "best_rank",
+                        "uptime_sum",
+                        "new_votes",
+                        "votes_this_month",
+                        "total_votes",
+                    ],
+                    history_query.group_by(ServerHistory.server_id, bucket),
+                )
+            )
+
+
+def seal_history_rollups(db: Session, now: Optional[datetime] = None) -> int:
+    """Sets the p50 and p95 players of rollup buckets which have closed, from the
+    raw data points
+
+    Buckets are sealed once no more data points can be written to them, only
+    buckets within the lookback are looked at so the raw data points are always
+    there
+
+    :returns: The number of buckets sealed"""
+
+    now = now or datetime.utcnow()
+    sealed = 0
+
+    with _handle_db_errors():
+        for time_interval, rollup in HISTORY_ROLLUPS.items():
+            sealed_before = get_bucket_start(
+                now - timedelta(seconds=HISTORY_ROLLUP_SEAL_DELAY),
+                time_interval,
+            )
+            lookback = get_bucket_start(
+                now - timedelta(days=HISTORY_ROLLUP_SEAL_LOOKBACK_DAYS),
+                time_interval,
+            )
+
+            oldest_unsealed = (
+                db.query(func.min(rollup.bucket))
+                .filter(
+                    rollup.p50_players == None,
+                    rollup.bucket >= lookback,
+                )
+                .scalar()
+            )
+
+            if oldest_unsealed is None or oldest_unsealed >= sealed_before:
+                continue
+
+            bucket, p50_players, p95_players = get_players_percentiles(time_interval)
+
+            percentiles = (
+                select(
+                    ServerHistory.server_id,
+                    bucket.label("bucket"),
+                    p50_players.label("p50_players"),
+                    p95_players.label("p95_players"),
+                )
+                .where(
+                    in_range(
+                        ServerHistory.created_at,
+                        oldest_unsealed,
+                        sealed_before,
+                    )
+                )
+                .group_by(ServerHistory.server_id, bucket)
+                .subquery()
+            )
+
+            sealed += db.execute(
+                update(rollup)
+                .where(
+                    rollup.server_id == percentiles.c.server_id,
+                    rollup.bucket == percentiles.c.bucket,
+                    rollup.p50_players == None,
+                )
+                .values(
+                    p50_players=percentiles.c.p50_players,
+                    p95_players=percentiles.c.p95_players,
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+
+        db.commit()
+
+    return sealed
+
+
+def prune_history_rollups(db: Session, now: Optional[datetime] = None) -> int:
+    """Deletes hourly rollups past their retention period, the daily rollups are
+    kept
+
+    :returns: The number of buckets deleted"""
+
+    with _handle_db_errors():
+        deleted = (
+            db.query(ServerHistoryHourly)
+            .filter(
+                ServerHistoryHourly.bucket < get_hourly_rollup_cutoff(now),
+            )
+            .delete(synchronize_session=False)
+        )
+
+        db.commit()
+
+    return deleted
+
+
+def roll_up_server_history_task():
+    """Seals the history rollups of closed buckets and prunes old hourly rollups"""
+
+    # create a new db session for this job
+    db: Session = next(get_db())
+
+    try:
+        sealed = seal_history_rollups(db=db)
+        pruned = prune_history_rollups(db=db)
+
+        logger.info(f"Sealed {sealed} history rollups, pruned {pruned}")
+    except Exception as e:
+        logger.error(f"Error rolling up server history: {e}")
+    finally:
+        db.close()
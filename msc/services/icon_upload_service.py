@@ -0,0 +1,190 @@
+import base64
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from uuid import UUID
+
+import boto3
+
+from msc.constants import (
+    CDN_DOMAIN,
+    ICON_UPLOAD_BACKOFF,
+    ICON_UPLOAD_RETRIES,
+    ICON_UPLOAD_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _upload_server_icon(
+    icon_base64: str,
+    server_id: UUID,
+    s3=None,
+):
+    """Uploads a server icon to S3
+
+    :raises Exception: If the upload fails"""
+
+    # Remove metadata from base64 string
+    base64_data = icon_base64.split("base64,")[1]
+
+    # Decode the base64 image
+    decoded_data = base64.b64decode(base64_data.encode() + b"==")
+
+    s3 = s3 or boto3.client("s3")
+    key = f"icon/{server_id}.png"
+
+    s3.put_object(
+        Body=decoded_data,
+        Bucket=CDN_DOMAIN,
+        Key=key,
+    )
+
+
+@dataclass
+class IconUploadStats:
+    enqueued: int = 0
+    deduplicated: int = 0
+    uploaded: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+class IconUploadQueue:
+    """Uploads server icons from a pool of background threads sharing one S3
+    client
+
+    Only the latest icon queued for a server is uploaded, an icon which is
+    replaced while waiting or between retries is dropped"""
+
+    def __init__(
+        self,
+        workers: int = ICON_UPLOAD_WORKERS,
+        retries: int = ICON_UPLOAD_RETRIES,
+        backoff: float = ICON_UPLOAD_BACKOFF,
+    ):
+        """
+        :param workers: The number of upload threads
+        :param retries: The number of times a failed upload is retried
+        :param backoff: The delay in seconds before the first retry, doubled for
+            each retry after
+        """
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.stats = IconUploadStats()
+
+        self._queue = queue.Queue()
+        self._pending: Dict[UUID, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._s3 = None
+
+    @property
+    def depth(self) -> int:
+        """The number of servers with an icon waiting to be uploaded"""
+
+        with self._lock:
+            return len(self._pending)
+
+    def enqueue(self, server_id: UUID, checksum: str, icon_base64: str):
+        """Queues a server icon to be uploaded, never blocks"""
+
+        with self._lock:
+            self.stats.enqueued += 1
+
+            is_queued = server_id in self._pending
+            self._pending[server_id] = (checksum, icon_base64)
+
+            if is_queued:
+                self.stats.deduplicated += 1
+                return
+
+            self._start()
+
+        self._queue.put_nowait(server_id)
+
+    def join(self):
+        """Waits for every queued icon to be uploaded or dropped"""
+
+        self._queue.join()
+
+    def _start(self):
+        if self._threads:
+            return
+
+        self._s3 = boto3.client("s3")
+
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._run,
+                name=f"icon-upload-{i}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            server_id = self._queue.get()
+
+            try:
+                self._upload(server_id)
+            finally:
+                self._queue.task_done()
+
+    def _upload(self, server_id: UUID):
+        with self._lock:
+            checksum, icon_base64 = self._pending[server_id]
+
+        for attempt in range(self.retries + 1):
+            try:
+                _upload_server_icon(
+                    icon_base64=icon_base64,
+                    server_id=server_id,
+                    s3=self._s3,
+                )
+                self.stats.uploaded += 1
+                break
+            except Exception as e:
+                if attempt == self.retries:
+                    self.stats.failed += 1
+                    logger.error(f"Error uploading server icon: {e}")
+                    break
+
+                self.stats.retried += 1
+                time.sleep(self.backoff * 2**attempt)
+
+                with self._lock:
+                    pending = self._pending.get(server_id)
+
+                # a newer icon was queued while waiting, upload that instead
+                if pending is not None and pending[0] != checksum:
+                    checksum, icon_base64 = pending
+
+        with self._lock:
+            pending = self._pending.get(server_id)
+
+            if pending is not None and pending[0] == checksum:
+                del self._pending[server_id]
+                return
+
+        # a newer icon was queued during the upload
+        if pending is not None:
+            self._queue.put_nowait(server_id)
+
+
+icon_upload_queue = IconUploadQueue()
+
+
+def enqueue_icon_upload(server_id: UUID, checksum: str, icon_base64: str):
+    """Queues a server icon to be uploaded in the background"""
+
+    icon_upload_queue.enqueue(
+        server_id=server_id,
+        checksum=checksum,
+        icon_base64=icon_base64,
+    )
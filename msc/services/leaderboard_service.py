@@ -0,0 +1,319 @@
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import DateTime, and_, func, literal, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, aliased
+
+from msc.database import get_db
+from msc.models import Server, ServerLeaderboard, ServerVoteStats, Sponsor
+from msc.utils.time_utils import get_month_start
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def _handle_db_errors():
+    """Handles database errors"""
+    try:
+        yield
+    except Exception as e:
+        # TODO: Raise a custom exception here
+        raise e
+
+
+def get_sponsor_slots(db: Session, now: Optional[datetime] = None) -> Dict[UUID, int]:
+    """Gets the slot of every listed server sponsored this month
+
+    Sponsors are booked for the months ahead, so they are read when ranking
+    rather than kept on the leaderboard"""
+
+    now = now or datetime.utcnow()
+
+    with _handle_db_errors():
+        return dict(
+            db.query(Sponsor.server_id, Sponsor.slot)
+            .join(Server, Server.id == Sponsor.server_id)
+            .filter(
+                Sponsor.month == now.month,
+                Sponsor.year == now.year,
+                Server.flagged_for_deletion == False,
+            )
+            .all()
+        )
+
+
+def _get_entries_query(db: Session, month_start: datetime, sponsor_slots: dict):
+    """Builds the query of the leaderboard entries this month, other than of
+    sponsored servers which are ranked by slot"""
+
+    query = db.query(ServerLeaderboard).filter(
+        ServerLeaderboard.month_start == month_start,
+        ServerLeaderboard.votes_this_month > 0,
+    )
+
+    if sponsor_slots:
+        query = query.filter(ServerLeaderboard.server_id.notin_(list(sponsor_slots)))
+
+    return query
+
+
+def get_server_rank(db: Session, server: Server) -> Optional[int]:
+    """Gets a server's rank from the leaderboard, sponsored servers first by
+    slot then by votes this month, servers with as many votes share a rank
+
+    :returns: The rank, or None for servers flagged for deletion"""
+
+    return get_ranks(db=db, servers=[server])[server.id]
+
+
+def get_ranks(db: Session, servers: List[Server]) -> Dict[UUID, Optional[int]]:
+    """Gets the ranks of a page of servers from the leaderboard, counting the
+    servers ahead of each in a single query
+
+    :returns: The rank of each server, or None for servers flagged for deletion"""
+
+    now = datetime.utcnow()
+    month_start = get_month_start(now)
+    sponsor_slots = get_sponsor_slots(db=db, now=now)
+
+    ranks = {}
+    unsponsored_ids = []
+
+    for server in servers:
+        if server.flagged_for_deletion:
+            ranks[server.id] = None
+        elif server.id in sponsor_slots:
+            slot = sponsor_slots[server.id]
+            ranks[server.id] = 1 + sum(
+                1 for other_slot in sponsor_slots.values() if other_slot < slot
+            )
+        else:
+            unsponsored_ids.append(server.id)
+
+    if not unsponsored_ids:
+        return ranks
+
+    entry = aliased(ServerLeaderboard)
+    votes_this_month = func.coalesce(entry.votes_this_month, 0)
+
+    # the sponsored servers are ahead of every other server, so they're only
+    # counted once
+    servers_ahead = select(func.count()).where(
+        ServerLeaderboard.month_start == month_start,
+        ServerLeaderboard.votes_this_month > votes_this_month,
+    )
+
+    if sponsor_slots:
+        servers_ahead = servers_ahead.where(
+            ServerLeaderboard.server_id.notin_(list(sponsor_slots))
+        )
+
+    with _handle_db_errors():
+        rows = (
+            db.query(
+                Server.id,
+                servers_ahead.correlate(entry).scalar_subquery(),
+            )
+            .outerjoin(
+                entry,
+                and_(
+                    entry.server_id == Server.id,
+                    entry.month_start == month_start,
+                ),
+            )
+            .filter(
+                Server.id.in_(unsponsored_ids),
+            )
+            .all()
+        )
+
+    for server_id, ahead in rows:
+        ranks[server_id] = 1 + len(sponsor_slots) + ahead
+
+    return ranks
+
+
+def get_leaderboard(
+    db: Session,
+    limit: Optional[int] = None,
+) -> List[Tuple[UUID, int]]:
+    """Gets the top servers and their ranks in rank order, the sponsored servers
+    and the servers with votes this month. Every other listed server shares the
+    rank after the last of these"""
+
+    now = datetime.utcnow()
+    month_start = get_month_start(now)
+    sponsor_slots = get_sponsor_slots(db=db, now=now)
+
+    leaderboard = [
+        (server_id, rank)
+        for rank, server_id in enumerate(
+            sorted(sponsor_slots, key=sponsor_slots.get),
+            start=1,
+        )
+    ]
+
+    if limit is not None and len(leaderboard) >= limit:
+        return leaderboard[:limit]
+
+    entries_query = (
+        _get_entries_query(
+            db=db,
+            month_start=month_start,
+            sponsor_slots=sponsor_slots,
+        )
+        .with_entities(
+            ServerLeaderboard.server_id,
+            ServerLeaderboard.votes_this_month,
+        )
+        .order_by(ServerLeaderboard.votes_this_month.desc())
+    )
+
+    if limit is not None:
+        entries_query = entries_query.limit(limit - len(leaderboard))
+
+    with _handle_db_errors():
+        entries = entries_query.all()
+
+    rank = None
+    previous_votes = None
+
+    for position, (server_id, votes_this_month) in enumerate(
+        entries,
+        start=len(leaderboard) + 1,
+    ):
+        if votes_this_month != previous_votes:
+            rank = position
+            previous_votes = votes_this_month
+
+        leaderboard.append((server_id, rank))
+
+    return leaderboard
+
+
+def get_server_ranks(db: Session) -> Dict[UUID, int]:
+    """Gets every listed server's rank from the leaderboard"""
+
+    ranks = dict(get_leaderboard(db=db))
+
+    # the servers without votes this month are tied after the leaderboard
+    unranked = len(ranks) + 1
+
+    with _handle_db_errors():
+        for (server_id,) in db.query(Server.id).filter(
+            Server.flagged_for_deletion == False,
+        ):
+            ranks.setdefault(server_id, unranked)
+
+    return ranks
+
+
+def remove_server(db: Session, server_id: UUID):
+    """Removes a server from the leaderboard without committing"""
+
+    with _handle_db_errors():
+        db.query(ServerLeaderboard).filter(
+            ServerLeaderboard.server_id == server_id,
+        ).delete(synchronize_session=False)
+
+
+def rebuild_leaderboard(db: Session, now: Optional[datetime] = None):
+    """Rebuilds the leaderboard from the vote counters without committing
+
+    Votes wait for the rebuild to commit before writing their entries, so none
+    are lost to it"""
+
+    now = now or datetime.utcnow()
+    month_start = get_month_start(now)
+
+    with _handle_db_errors():
+        db.execute(text("LOCK TABLE server_leaderboard IN EXCLUSIVE MODE"))
+
+        db.query(ServerLeaderboard).delete(synchronize_session=False)
+
+        db.execute(
+            insert(ServerLeaderboard).from_select(
+                ["server_id", "month_start", "votes_this_month", "updated_at"],
+                select(
+                    ServerVoteStats.server_id,
+                    ServerVoteStats.month_start,
+                    ServerVoteStats.votes_this_month,
+                    literal(now, DateTime),
+                )
+                .join(Server, Server.id == ServerVoteStats.server_id)
+                .where(
+                    Server.flagged_for_deletion == False,
+                    ServerVoteStats.month_start == month_start,
+                    ServerVoteStats.votes_this_month > 0,
+                ),
+            )
+        )
+
+
+def verify_leaderboard(db: Session) -> List[UUID]:
+    """Compares the leaderboard ranks with the ranks computed by the rank window
+    function over every listed server
+
+    :returns: The servers whose ranks differ"""
+
+    from msc.services.server_service import get_computed_server_ranks
+
+    computed_ranks = get_computed_server_ranks(db=db)
+    ranks = get_server_ranks(db=db)
+
+    return [
+        server_id
+        for server_id in computed_ranks.keys() | ranks.keys()
+        if computed_ranks.get(server_id) != ranks.get(server_id)
+    ]
+
+
+def reconcile_leaderboard(db: Session) -> int:
+    """Prunes the entries of earlier months, and rebuilds the leaderboard if its
+    ranks differ from the computed ranks
+
+    :returns: The number of servers whose ranks differed"""
+
+    month_start = get_month_start(datetime.utcnow())
+
+    with _handle_db_errors():
+        db.query(ServerLeaderboard).filter(
+            ServerLeaderboard.month_start < month_start,
+        ).delete(synchronize_session=False)
+
+        db.commit()
+
+    mismatched = verify_leaderboard(db=db)
+
+    if mismatched:
+        logger.warning(
+            f"The leaderboard ranks of {len(mismatched)} servers differ from "
+            "their computed ranks, rebuilding the leaderboard"
+        )
+
+        rebuild_leaderboard(db=db)
+
+        with _handle_db_errors():
+            db.commit()
+
+    return len(mismatched)
+
+
+def reconcile_leaderboard_task():
+    """Prunes the leaderboard and rebuilds it if its ranks differ"""
+
+    # create a new db session for this job
+    db: Session = next(get_db())
+
+    try:
+        mismatched = reconcile_leaderboard(db=db)
+
+        logger.info(f"Reconciled the leaderboard, {mismatched} ranks differed")
+    except Exception as e:
+        logger.error(f"Error reconciling the leaderboard: {e}")
+    finally:
+        db.close()
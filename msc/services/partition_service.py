@@ -0,0 +1,251 @@
+import logging
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from msc.constants import (
+    PARTITION_DETACH_LOCK_TIMEOUT,
+    PARTITION_PREMAKE_MONTHS,
+    PARTITIONED_TABLES,
+)
+from msc.database import get_db
+from msc.utils.time_utils import get_month_range, get_month_start
+
+logger = logging.getLogger(__name__)
+
+_PARTITION_BOUNDS = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+@contextmanager
+def _handle_db_errors():
+    """Handles database errors"""
+    try:
+        yield
+    except Exception as e:
+        # TODO: Raise a custom exception here
+        raise e
+
+
+@dataclass
+class Partition:
+    """A partition of a table range partitioned by month on created_at, the
+    default partition has no bounds"""
+
+    name: str
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+
+    @property
+    def is_default(self) -> bool:
+        return self.start is None
+
+    @property
+    def table(self) -> str:
+        # partitions are named after their table, see get_partition_name
+        return self.name.rsplit("_", 1 if self.is_default else 2)[0]
+
+
+def get_partition_name(table: str, month: datetime) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+def _validate_table(table: str):
+    # table names are put into DDL directly, so only known tables are allowed
+    if table not in PARTITIONED_TABLES:
+        raise ValueError(f"{table} is not a partitioned table")
+
+
+def get_partitions(db: Session, table: str) -> List[Partition]:
+    """Gets the partitions of a table, oldest first and the default partition
+    last"""
+
+    _validate_table(table)
+
+    with _handle_db_errors():
+        rows = db.execute(
+            text(
+                """
+                SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+                FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname = :table
+                """
+            ),
+            {"table": table},
+        ).all()
+
+    partitions = []
+
+    for name, bounds in rows:
+        match = _PARTITION_BOUNDS.search(bounds)
+
+        if match:
+            partitions.append(
+                Partition(
+                    name=name,
+                    start=datetime.fromisoformat(match.group(1)),
+                    end=datetime.fromisoformat(match.group(2)),
+                )
+            )
+        else:
+            partitions.append(Partition(name=name))
+
+    return sorted(
+        partitions,
+        key=lambda p: (p.is_default, p.start or datetime.min),
+    )
+
+
+def create_partition(db: Session, table: str, month: datetime) -> bool:
+    """Creates the partition of a table for a month, any rows for the month which
+    landed in the default partition are moved into it
+
+    :returns: False if the partition already exists"""
+
+    _validate_table(table)
+
+    start, end = get_month_range(month)
+    partitions = get_partitions(db=db, table=table)
+
+    if any(partition.start == start for partition in partitions):
+        return False
+
+    name = get_partition_name(table, start)
+    default = next((p for p in partitions if p.is_default), None)
+
+    with _handle_db_errors():
+        # attaching a table rather than creating it as a partition, as a partition
+        # cannot be created while the default partition holds rows in its range
+        db.execute(
+            text(
+                f"CREATE TABLE {name} "
+                f"(LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+            )
+        )
+
+        if default:
+            db.execute(
+                text(
+                    f"""
+                    WITH moved AS (
+                        DELETE FROM {default.name}
+                        WHERE created_at >= :start AND created_at < :end
+                        RETURNING *
+                    )
+                    INSERT INTO {name} SELECT * FROM moved
+                    """
+                ),
+                {"start": start, "end": end},
+            )
+
+        db.execute(
+            text(
+                f"ALTER TABLE {table} ATTACH PARTITION {name} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+        )
+
+        db.commit()
+
+    logger.info(f"Created partition {name}")
+
+    return True
+
+
+def detach_partition(db: Session, partition: Partition):
+    """Detaches a monthly partition from its table in a transaction of its own,
+    committing the session first
+
+    The partition is detached concurrently so queries and writes on the table
+    carry on while it waits for them. Postgres can't detach concurrently while
+    the table has a default partition, then the table is only locked for the
+    detach itself, which gives up after the lock timeout rather than holding up
+    the queries queued behind it"""
+
+    if partition.is_default:
+        raise ValueError("The default partition cannot be detached")
+
+    table = partition.table
+    _validate_table(table)
+
+    has_default = any(p.is_default for p in get_partitions(db=db, table=table))
+
+    with _handle_db_errors():
+        db.commit()
+
+        if has_default:
+            db.execute(
+                text(f"SET LOCAL lock_timeout = '{PARTITION_DETACH_LOCK_TIMEOUT}s'")
+            )
+            db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition.name}"))
+            db.commit()
+        else:
+            # a concurrent detach can't run inside a transaction block
+            with db.get_bind().engine.connect().execution_options(
+                isolation_level="AUTOCOMMIT"
+            ) as connection:
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {table} DETACH PARTITION {partition.name} "
+                    "CONCURRENTLY"
+                )
+
+    logger.info(f"Detached partition {partition.name}")
+
+
+def drop_partition(db: Session, partition: Partition):
+    """Drops a monthly partition and every row in it, committing the session
+
+    The partition is detached first, so dropping it doesn't lock the table"""
+
+    detach_partition(db=db, partition=partition)
+
+    with _handle_db_errors():
+        db.execute(text(f"DROP TABLE {partition.name}"))
+        db.commit()
+
+    logger.info(f"Dropped partition {partition.name}")
+
+
+def create_future_partitions(
+    db: Session,
+    months: int = PARTITION_PREMAKE_MONTHS,
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """Creates the partitions of every partitioned table for the current month and
+    the months after it, so rows never have to land in the default partition
+
+    :returns: The names of the partitions created"""
+
+    now = now or datetime.utcnow()
+    created = []
+
+    for table in PARTITIONED_TABLES:
+        for i in range(months + 1):
+            month = get_month_start(now, months=i)
+
+            if create_partition(db=db, table=table, month=month):
+                created.append(get_partition_name(table, month))
+
+    return created
+
+
+def maintain_partitions_task():
+    """Creates the monthly partitions ahead of time"""
+
+    # create a new db session for this job
+    db: Session = next(get_db())
+
+    try:
+        created = create_future_partitions(db=db)
+
+        logger.info(f"Created {len(created)} partitions")
+    except Exception as e:
+        logger.error(f"Error maintaining partitions: {e}")
+    finally:
+        db.close()
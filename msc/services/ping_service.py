@@ -1,23 +1,47 @@
 import asyncio
-import base64
 import logging
+import time
 from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from socket import gaierror
-from typing import List, Optional
+from typing import Callable, List, Optional
 from uuid import UUID
 
-import boto3
-from mcstatus import BedrockServer, JavaServer
 from mcstatus.querier import QueryResponse
 from mcstatus.status_response import BedrockStatusResponse, JavaStatusResponse
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
-from msc.constants import ASYNC_POLL_BATCH_SIZE
+from msc.config import config
+from msc.constants import BREAKER_HALF_OPEN_TIMEOUT
 from msc.database import get_db
 from msc.errors import BadRequest, NotFound, Unauthorized
 from msc.models import Server, ServerHistory, Vote
-from msc.services.version_service import process_version_from_ping
+from msc.services.circuit_breaker_service import get_endpoint, get_open_breakers
+from msc.services.history_service import add_history_rollups
+from msc.services.icon_upload_service import enqueue_icon_upload, icon_upload_queue
+from msc.services.poll_metrics_service import (
+    PollMetrics,
+    ProbeOutcome,
+    ProbeStage,
+    classify_probe_error,
+)
+from msc.services.poll_schedule_service import get_next_poll
+from msc.services.resolver_service import (
+    async_lookup_bedrock_server,
+    async_lookup_java_server,
+    lookup_bedrock_server,
+    lookup_java_server,
+    resolver_cache,
+)
+from msc.services.udp_prober_service import UdpProber
+from msc.services.uptime_service import (
+    add_uptime_seconds,
+    rebuild_uptime_buckets,
+    refresh_uptimes,
+)
+from msc.services.version_service import process_version_from_ping, version_resolver
 from msc.services.vote_service import (
     get_new_votes,
     get_total_votes,
@@ -32,6 +56,78 @@ class ServerUnreachable(BadRequest):
     """Represents a 400 Bad Request error."""
 
 
+@dataclass
+class PollTarget:
+    """A plain snapshot of the server fields needed to probe it"""
+
+    server_id: UUID
+    java_ip_address: Optional[str] = None
+    java_port: Optional[int] = None
+    bedrock_ip_address: Optional[str] = None
+    bedrock_port: Optional[str] = None
+    icon_checksum: Optional[str] = None
+    # only a single cheap check is made while the endpoint's breaker is open
+    half_open: bool = False
+
+    @classmethod
+    def from_server(cls, server: Server):
+        return cls(
+            server_id=server.id,
+            java_ip_address=server.java_ip_address,
+            java_port=server.java_port,
+            bedrock_ip_address=server.bedrock_ip_address,
+            bedrock_port=server.bedrock_port,
+            icon_checksum=server.icon_checksum,
+        )
+
+
+@dataclass
+class PollResult:
+    """The outcome of probing a server
+
+    max_players and raw_version are only applied when the server is online and
+    icon_checksum is only applied when update_icon is set"""
+
+    server_id: UUID
+    is_online: bool = False
+    players: int = 0
+    max_players: Optional[int] = None
+    raw_version: Optional[str] = None
+    update_icon: bool = False
+    icon_checksum: Optional[str] = None
+    polled_at: datetime = field(default_factory=datetime.utcnow)
+    # the outcome of the probe, the status attempt's failure if both failed
+    outcome: Optional[ProbeOutcome] = None
+    # time spent in each probe stage, None if the stage was not reached
+    lookup_ms: Optional[float] = None
+    status_ms: Optional[float] = None
+    query_ms: Optional[float] = None
+    # the latency reported by the server's status response
+    latency_ms: Optional[float] = None
+
+
+@dataclass
+class PollCycleStats:
+    servers: int
+    probes_started: int = 0
+    probes_completed: int = 0
+    probes_timed_out: int = 0
+    probes_skipped: int = 0
+    duration_seconds: float = 0.0
+    # icons still waiting to be uploaded when the cycle ended, summed across the
+    # poll processes which queued them
+    icon_upload_queue_depth: int = 0
+    # per stage latency aggregates and outcome counts, see PollMetrics.summary
+    metrics: Optional[dict] = None
+
+    @property
+    def probes_per_second(self) -> float:
+        if self.duration_seconds <= 0:
+            return 0.0
+
+        return self.probes_completed / self.duration_seconds
+
+
 @contextmanager
 def _handle_db_errors():
     """Handles database errors"""
@@ -98,10 +194,8 @@ def _check_java_server_online(
     if java_port:
         ip = f"{ip}:{java_port}"
 
-    minecraft_server = JavaServer.lookup(ip)
-
     try:
-        status: JavaStatusResponse = minecraft_server.status()
+        status: JavaStatusResponse = lookup_java_server(ip).status()
         return True
     except TimeoutError as timeout_error:
         pass
@@ -112,10 +206,12 @@ def _check_java_server_online(
         pass
 
     try:
-        query: QueryResponse = minecraft_server.query()
+        query: QueryResponse = lookup_java_server(ip).query()
         return True
     except TimeoutError as timeout_error:
         pass
+    except gaierror as gai_error:
+        pass
     except Exception as e:
         logger.error(f"Unhandled error polling java server by query: {e}")
         pass
@@ -134,10 +230,8 @@ def _check_bedrock_server_online(
     if bedrock_port:
         ip = f"{ip}:{bedrock_port}"
 
-    minecraft_server = BedrockServer.lookup(ip)
-
     try:
-        status: BedrockStatusResponse = minecraft_server.status()
+        status: BedrockStatusResponse = lookup_bedrock_server(ip).status()
         return True
     except TimeoutError as timeout_error:
         pass
@@ -150,31 +244,6 @@ def _check_bedrock_server_online(
     return False
 
 
-def _upload_server_icon(
-    icon_base64: str,
-    server_id: UUID,
-) -> str:
-    """Uploads a server icon to S3 and returns the URL"""
-
-    # Remove metadata from base64 string
-    base64_data = icon_base64.split("base64,")[1]
-
-    # Decode the base64 image
-    decoded_data = base64.b64decode(base64_data.encode() + b"==")
-
-    s3 = boto3.client("s3")
-    key = f"icon/{server_id}.png"
-
-    try:
-        s3.put_object(
-            Body=decoded_data,
-            Bucket="cdn.minecraftservercentral.com",
-            Key=key,
-        )
-    except Exception as e:
-        logger.error(f"Error uploading server icon: {e}")
-
-
 def poll_bedrock_server(
     db: Session,
     server: Server,
@@ -192,13 +261,11 @@ def poll_bedrock_server(
     if server.bedrock_port:
         ip = f"{ip}:{server.bedrock_port}"
 
-    minecraft_server = BedrockServer.lookup(ip)
-
     is_online = False
     players = 0
 
     try:
-        status: BedrockStatusResponse = minecraft_server.status()
+        status: BedrockStatusResponse = lookup_bedrock_server(ip).status()
 
         is_online = True
         players = status.players.online
@@ -207,6 +274,7 @@ def poll_bedrock_server(
         server.players = players
         server.max_players = status.players.max
         server.last_pinged_at = datetime.utcnow()
+        server.latency = round(status.latency)
 
         server.minecraft_version = process_version_from_ping(
             db=db,
@@ -256,13 +324,11 @@ def poll_java_server(
     if server.java_port:
         ip = f"{ip}:{server.java_port}"
 
-    minecraft_server = JavaServer.lookup(ip)
-
     is_online = False
     players = 0
 
     try:
-        status: JavaStatusResponse = minecraft_server.status()
+        status: JavaStatusResponse = lookup_java_server(ip).status()
 
         is_online = True
         players = status.players.online
@@ -271,6 +337,7 @@ def poll_java_server(
         server.players = players
         server.max_players = status.players.max
         server.last_pinged_at = datetime.utcnow()
+        server.latency = round(status.latency)
         server.minecraft_version = process_version_from_ping(
             db=db,
             raw_version=status.version.name,
@@ -281,9 +348,10 @@ def poll_java_server(
 
             if checksum != server.icon_checksum:
                 server.icon_checksum = checksum
-                _upload_server_icon(
-                    icon_base64=status.icon,
+                enqueue_icon_upload(
                     server_id=server.id,
+                    checksum=checksum,
+                    icon_base64=status.icon,
                 )
         else:
             server.icon_checksum = None
@@ -318,7 +386,7 @@ def poll_java_server(
         return True
 
     try:
-        query: QueryResponse = minecraft_server.query()
+        query: QueryResponse = lookup_java_server(ip).query()
 
         is_online = True
         players = query.players.online
@@ -327,6 +395,7 @@ def poll_java_server(
         server.players = players
         server.max_players = query.players.max
         server.last_pinged_at = datetime.utcnow()
+        server.latency = None
 
         server.minecraft_version = process_version_from_ping(
             db=db,
@@ -335,6 +404,8 @@ def poll_java_server(
 
     except TimeoutError as timeout_error:
         pass
+    except gaierror as gai_error:
+        pass
     except Exception as e:
         logger.error(f"Unhandled error polling java server by query: {e}")
     finally:
@@ -356,170 +427,168 @@ def poll_java_server(
     return is_online
 
 
+def _elapsed_ms(started_at: float) -> float:
+    return (time.perf_counter() - started_at) * 1000
+
+
 async def poll_bedrock_server_async(
-    db: Session,
-    server: Server,
-) -> bool:
-    """Polls a bedrock server for information asyncronously"""
+    target: PollTarget,
+    udp_prober: Optional[UdpProber] = None,
+) -> PollResult:
+    """Polls a bedrock server for information asyncronously
 
-    ip = server.bedrock_ip_address
+    The database is never touched here, the result is returned as a plain record
+    to be applied by the poll result writer, along with the probe's stage timings
+    and outcome
 
-    if server.bedrock_port:
-        ip = f"{ip}:{server.bedrock_port}"
+    :param udp_prober: Sends the ping through the prober's shared sockets rather
+        than a socket of its own"""
 
-    minecraft_server = BedrockServer.lookup(ip)
+    ip = target.bedrock_ip_address
 
-    is_online = False
-    players = 0
+    if target.bedrock_port:
+        ip = f"{ip}:{target.bedrock_port}"
+
+    result = PollResult(server_id=target.server_id)
 
     try:
-        status: BedrockStatusResponse = await minecraft_server.async_status()
+        started_at = time.perf_counter()
 
-        is_online = True
-        players = status.players.online
+        minecraft_server = await async_lookup_bedrock_server(
+            ip,
+            timeout=BREAKER_HALF_OPEN_TIMEOUT if target.half_open else 3,
+        )
 
-        server.is_online = is_online
-        server.players = players
-        server.max_players = status.players.max
-        server.last_pinged_at = datetime.utcnow()
+        result.lookup_ms = _elapsed_ms(started_at)
+        started_at = time.perf_counter()
 
-        server.minecraft_version = process_version_from_ping(
-            db=db,
-            raw_version=status.version.name,
-        )
+        if udp_prober is not None:
+            status: BedrockStatusResponse = await udp_prober.bedrock_status(
+                ip=minecraft_server.address.host,
+                port=minecraft_server.address.port,
+                retries=0 if target.half_open else None,
+            )
+        else:
+            status: BedrockStatusResponse = await minecraft_server.async_status()
 
-    except TimeoutError as e:
-        pass
-    except gaierror as e:
-        pass
+        result.status_ms = _elapsed_ms(started_at)
+
+        result.is_online = True
+        result.outcome = ProbeOutcome.OK
+        result.latency_ms = status.latency
+        result.players = status.players.online
+        result.max_players = status.players.max
+        result.raw_version = status.version.name
+
+    except (TimeoutError, gaierror) as e:
+        result.outcome = classify_probe_error(e)
     except Exception as e:
+        result.outcome = classify_probe_error(e)
         logger.error(f"Unhandled error polling bedrock server: {e}")
-    finally:
-        server.is_online = is_online
-        server.players = players
 
-        _create_server_history_data_point(
-            db=db,
-            server=server,
-            is_online=is_online,
-            players=players,
-            commit=False,
-        )
+    return result
 
-    with _handle_db_errors():
-        db.commit()
 
-    return is_online
+async def poll_java_server_async(
+    target: PollTarget,
+    udp_prober: Optional[UdpProber] = None,
+) -> PollResult:
+    """Polls a java server for information asyncronously
 
+    The database is never touched here, the result is returned as a plain record
+    to be applied by the poll result writer, along with the probe's stage timings
+    and outcome
 
-async def poll_java_server_async(
-    db: Session,
-    server: Server,
-) -> bool:
-    """Polls a java server for information asyncronously"""
+    :param udp_prober: Sends the query fallback through the prober's shared
+        sockets rather than a socket of its own"""
 
-    ip = server.java_ip_address
+    ip = target.java_ip_address
 
-    if server.java_port:
-        ip = f"{ip}:{server.java_port}"
+    if target.java_port:
+        ip = f"{ip}:{target.java_port}"
 
-    is_online = False
-    players = 0
+    result = PollResult(server_id=target.server_id)
 
     try:
-        status: JavaStatusResponse = await (
-            await JavaServer.async_lookup(ip)
-        ).async_status()
+        started_at = time.perf_counter()
 
-        is_online = True
-        players = status.players.online
+        minecraft_server = await async_lookup_java_server(
+            ip,
+            timeout=BREAKER_HALF_OPEN_TIMEOUT if target.half_open else 3,
+        )
 
-        server.is_online = is_online
-        server.players = players
-        server.max_players = status.players.max
-        server.last_pinged_at = datetime.utcnow()
+        result.lookup_ms = _elapsed_ms(started_at)
+        started_at = time.perf_counter()
 
-        server.minecraft_version = process_version_from_ping(
-            db=db,
-            raw_version=status.version.name,
-        )
+        status: JavaStatusResponse = await minecraft_server.async_status()
+
+        result.status_ms = _elapsed_ms(started_at)
+
+        result.is_online = True
+        result.outcome = ProbeOutcome.OK
+        result.latency_ms = status.latency
+        result.players = status.players.online
+        result.max_players = status.players.max
+        result.raw_version = status.version.name
 
         if status.icon:
             checksum = _get_checksum(status.icon)
 
-            if checksum != server.icon_checksum:
-                server.icon_checksum = checksum
-                _upload_server_icon(
+            if checksum != target.icon_checksum:
+                result.update_icon = True
+                result.icon_checksum = checksum
+                # the upload happens off the event loop, only queue it here
+                enqueue_icon_upload(
+                    server_id=target.server_id,
+                    checksum=checksum,
                     icon_base64=status.icon,
-                    server_id=server.id,
                 )
         else:
-            server.icon_checksum = None
-    except TimeoutError as timeout_error:
-        # Dont commit here, we need to check query
-        pass
-    except gaierror as gai_error:
-        # Dont commit here, we need to check query
-        pass
+            result.update_icon = True
+            result.icon_checksum = None
+    except (TimeoutError, gaierror) as e:
+        result.outcome = classify_probe_error(e)
     except Exception as e:
+        result.outcome = classify_probe_error(e)
         logger.error(f"Unhandled error polling java server by status: {e}")
-        # Dont commit here, we need to check query
-    finally:
-        server.is_online = is_online
-        server.players = players
 
-        _create_server_history_data_point(
-            db=db,
-            server=server,
-            is_online=is_online,
-            players=players,
-            commit=False,
-        )
+    # If server is online by status, we dont need to check query, and a half-open
+    # check only makes the status attempt
+    if result.is_online or target.half_open:
+        return result
 
-    # If server is online by status, we dont need to check query
-    # and we can commit here
-    if is_online:
-        with _handle_db_errors():
-            db.commit()
-
-        return True
+    # servers which fail dns would fail it again
+    if result.outcome == ProbeOutcome.DNS:
+        return result
 
     try:
-        query: QueryResponse = await (await JavaServer.async_lookup(ip)).async_query()
+        # the lookup is answered from the resolver cache after the status attempt
+        minecraft_server = await async_lookup_java_server(ip)
 
-        is_online = True
-        players = query.players.online
+        started_at = time.perf_counter()
 
-        server.is_online = is_online
-        server.players = query.players.online
-        server.max_players = query.players.max
-        server.last_pinged_at = datetime.utcnow()
+        if udp_prober is not None:
+            query: QueryResponse = await udp_prober.query(
+                ip=minecraft_server.ip_address.host,
+                port=minecraft_server.ip_address.port,
+            )
+        else:
+            query: QueryResponse = await minecraft_server.async_query()
 
-        server.minecraft_version = process_version_from_ping(
-            db=db,
-            raw_version=query.software.version,
-        )
+        result.query_ms = _elapsed_ms(started_at)
 
-    except TimeoutError as timeout_error:
+        result.is_online = True
+        result.outcome = ProbeOutcome.OK
+        result.players = query.players.online
+        result.max_players = query.players.max
+        result.raw_version = query.software.version
+
+    except (TimeoutError, gaierror) as e:
         pass
     except Exception as e:
         logger.error(f"Unhandled error polling java server by query: {e}")
-    finally:
-        server.is_online = is_online
-        server.players = players
 
-        _create_server_history_data_point(
-            db=db,
-            server=server,
-            is_online=is_online,
-            players=players,
-            commit=False,
-        )
-
-    with _handle_db_errors():
-        db.commit()
-
-    return is_online
+    return result
 
 
 def poll_server_by_id(
@@ -584,111 +653,413 @@ def poll_server(
                 commit=commit,
             )
 
+    (
+        server.consecutive_poll_failures,
+        server.next_poll_at,
+    ) = get_next_poll(
+        is_online=is_online,
+        consecutive_failures=server.consecutive_poll_failures,
+        uptime=server.uptime,
+        polled_at=datetime.utcnow(),
+        server_id=server.id,
+    )
+
+    if commit:
+        with _handle_db_errors():
+            db.commit()
+
     if not is_online:
         raise ServerUnreachable("Server is offline")
 
 
 async def poll_server_async(
-    db: Session,
-    server: Server,
-):
+    target: PollTarget,
+    udp_prober: Optional[UdpProber] = None,
+) -> PollResult:
     """Polls a server for information asyncronously"""
 
     try:
-        if server.java_ip_address and server.bedrock_ip_address:
+        if target.java_ip_address and target.bedrock_ip_address:
             # we only need to poll java server
-            await poll_java_server_async(
-                db=db,
-                server=server,
+            return await poll_java_server_async(
+                target=target,
+                udp_prober=udp_prober,
             )
         else:
-            if server.java_ip_address:
-                await poll_java_server_async(
-                    db=db,
-                    server=server,
+            if target.java_ip_address:
+                return await poll_java_server_async(
+                    target=target,
+                    udp_prober=udp_prober,
                 )
 
-            if server.bedrock_ip_address:
-                await poll_bedrock_server_async(
-                    db=db,
-                    server=server,
+            if target.bedrock_ip_address:
+                return await poll_bedrock_server_async(
+                    target=target,
+                    udp_prober=udp_prober,
                 )
     except Exception as e:
         pass
         logger.error(f"Unhandled error polling server: {e}")
 
+    return PollResult(server_id=target.server_id)
+
+
+async def _poll_servers_aynsc_batch(
+    targets: List[PollTarget],
+    on_result: Callable[[PollResult], None],
+    concurrency: Optional[int] = None,
+    probe_timeout: Optional[float] = None,
+    cycle_timeout: Optional[float] = None,
+) -> PollCycleStats:
+    """Polls servers asyncronously through a sliding window
+
+    A fixed number of workers share one iterator over the targets, so a new probe
+    starts as soon as any in-flight probe finishes rather than waiting on the
+    slowest server of a batch.
+
+    :param targets: The servers to poll
+    :param on_result: Called with each poll result, this must not block the loop
+    :param concurrency: The maximum number of in-flight probes
+    :param probe_timeout: The deadline in seconds for a single server probe
+    :param cycle_timeout: The deadline in seconds for the whole cycle, any
+        probes still running or waiting are abandoned when it is reached
 
-async def _poll_servers_aynsc_batch(db: Session, servers: List[Server]):
-    """Batches the polling of servers asyncronously"""
+    :returns: The stats for the poll cycle"""
 
-    for i in range(0, len(servers), ASYNC_POLL_BATCH_SIZE):
-        await asyncio.wait(
-            {
-                asyncio.create_task(
-                    poll_server_async(
-                        db=db,
-                        server=process_server,
-                    )
+    concurrency = concurrency or config.poll_concurrency
+    probe_timeout = probe_timeout or config.poll_probe_timeout
+    cycle_timeout = cycle_timeout or config.poll_cycle_timeout
+
+    stats = PollCycleStats(servers=len(targets))
+    targets_iter = iter(targets)
+
+    async def _worker():
+        for target in targets_iter:
+            stats.probes_started += 1
+
+            try:
+                result = await asyncio.wait_for(
+                    poll_server_async(target=target, udp_prober=udp_prober),
+                    timeout=probe_timeout,
+                )
+                stats.probes_completed += 1
+            except asyncio.TimeoutError:
+                stats.probes_timed_out += 1
+                logger.warning(
+                    f"Probe deadline of {probe_timeout}s exceeded for server {target.server_id}"
+                )
+                # a server that cannot answer within the deadline is recorded as offline
+                result = PollResult(
+                    server_id=target.server_id,
+                    outcome=ProbeOutcome.TIMEOUT,
                 )
-                for process_server in servers[i : i + ASYNC_POLL_BATCH_SIZE]
-            }
+
+            on_result(result)
+
+    started_at = time.monotonic()
+
+    # bedrock pings and query fallbacks share one small pool of udp sockets
+    udp_prober = None
+
+    if config.poll_udp_multiplex and targets:
+        udp_prober = UdpProber()
+        await udp_prober.start()
+
+    workers = [
+        asyncio.create_task(_worker()) for _ in range(min(concurrency, len(targets)))
+    ]
+
+    try:
+        if workers:
+            _, pending = await asyncio.wait(workers, timeout=cycle_timeout)
+
+            if pending:
+                logger.warning(f"Poll cycle deadline of {cycle_timeout}s exceeded")
+
+                for worker in pending:
+                    worker.cancel()
+
+                await asyncio.gather(*pending, return_exceptions=True)
+    finally:
+        if udp_prober is not None:
+            await udp_prober.close()
+
+    stats.duration_seconds = time.monotonic() - started_at
+    stats.probes_skipped = (
+        stats.servers - stats.probes_completed - stats.probes_timed_out
+    )
+
+    logger.info(
+        f"Polled {stats.probes_completed}/{stats.servers} servers in "
+        f"{stats.duration_seconds:.2f}s ({stats.probes_per_second:.2f} probes/sec), "
+        f"{stats.probes_timed_out} timed out, {stats.probes_skipped} skipped"
+    )
+
+    return stats
+
+
+def _get_poll_targets(db: Session, due_only: bool = False) -> List[PollTarget]:
+    """Gets the servers to poll as plain targets
+
+    :param due_only: Only get servers whose next poll time has passed, most
+        overdue first"""
+
+    query = db.query(Server).filter(
+        Server.flagged_for_deletion == False,
+    )
+
+    if due_only:
+        query = query.filter(
+            or_(
+                Server.next_poll_at == None,
+                Server.next_poll_at <= datetime.utcnow(),
+            )
+        ).order_by(
+            Server.next_poll_at.asc().nulls_first(),
         )
-        print(f"Processed {i} servers")
 
-    db.close()
+    targets = [PollTarget.from_server(server) for server in query.all()]
+
+    return _apply_breakers(db=db, targets=targets)
+
+
+def _apply_breakers(db: Session, targets: List[PollTarget]) -> List[PollTarget]:
+    """Drops targets whose endpoint breaker is open and marks those due a
+    half-open check"""
+
+    open_breakers = get_open_breakers(db=db)
+
+    if not open_breakers:
+        return targets
+
+    now = datetime.utcnow()
+    applied = []
+
+    for target in targets:
+        breaker = open_breakers.get(get_endpoint(target))
+
+        if breaker is not None:
+            if breaker.next_check_at and breaker.next_check_at > now:
+                continue
+
+            target.half_open = True
+
+        applied.append(target)
+
+    return applied
+
+
+def _run_poll_cycle(targets: List[PollTarget]) -> PollCycleStats:
+    """Polls the targets and writes the results
+
+    Probing runs on an event loop which never touches the database, results are
+    handed to a single writer thread which applies them in batches. In
+    multiprocess mode the targets are split between a pool of processes, each
+    with its own event loop, and their results still go through the one writer"""
+
+    from msc.services.poll_process_service import poll_servers_multiprocess
+    from msc.services.poll_writer_service import PollResultWriter
+
+    metrics = PollMetrics()
+
+    writer = PollResultWriter(metrics=metrics)
+    writer.start()
+
+    def _on_result(result: PollResult):
+        metrics.record_result(result)
+        writer.submit(result)
+
+    try:
+        if config.poll_multiprocess:
+            stats = poll_servers_multiprocess(
+                targets=targets,
+                on_result=_on_result,
+            )
+        else:
+            stats = asyncio.run(
+                _poll_servers_aynsc_batch(
+                    targets=targets,
+                    on_result=_on_result,
+                )
+            )
+    finally:
+        writer.close()
+
+    # in multiprocess mode the icons are queued in the poll processes, which send
+    # their depth back with their stats
+    if not config.poll_multiprocess:
+        stats.icon_upload_queue_depth = icon_upload_queue.depth
+
+    stats.metrics = metrics.summary()
+
+    logger.info(f"Poll outcomes {stats.metrics['outcomes']}")
+
+    for stage in ProbeStage:
+        stage_metrics = stats.metrics[stage.value]
+
+        logger.info(
+            f"Poll {stage.value} p50 {stage_metrics['p50_ms']}ms "
+            f"p95 {stage_metrics['p95_ms']}ms max {stage_metrics['max_ms']}ms "
+            f"({stage_metrics['count']} observations)"
+        )
+
+    logger.info(f"Icon upload queue depth {stats.icon_upload_queue_depth}")
+
+    logger.info(
+        f"Version resolver hit rate {version_resolver.stats.hit_rate:.2%} "
+        f"({version_resolver.stats.hits} hits, {version_resolver.stats.misses} misses)"
+    )
+
+    resolver_stats = resolver_cache.stats
+
+    logger.info(
+        f"Resolver cache hit rate {resolver_stats.hit_rate:.2%} "
+        f"({resolver_stats.hits} hits, {resolver_stats.negative_hits} negative hits, "
+        f"{resolver_stats.misses} misses)"
+    )
+
+    return stats
+
+
+def _record_poll_cycle(started_at: datetime, stats: PollCycleStats):
+    """Adds a poll cycle to the ledger, a failure is logged rather than failing
+    the job"""
+
+    from msc.services.poll_cycle_service import record_poll_cycle
+
+    db: Session = next(get_db())
+
+    try:
+        record_poll_cycle(db=db, started_at=started_at, stats=stats)
+    except Exception as e:
+        logger.error(f"Error recording poll cycle: {e}")
+    finally:
+        db.close()
 
 
 def poll_servers_async():
-    """Polls minecraft servers for information"""
+    """Polls all minecraft servers for information"""
+
+    started_at = datetime.utcnow()
 
     # create a new db session for this job
     db: Session = next(get_db())
 
     logger.info("Polling servers")
 
-    servers = []
+    targets = []
 
     # Get all servers
     with _handle_db_errors():
-        servers = (
-            db.query(Server)
-            .filter(
-                Server.flagged_for_deletion == False,
+        targets = _get_poll_targets(db=db)
+
+    db.close()
+
+    stats = _run_poll_cycle(targets=targets)
+
+    _record_poll_cycle(started_at=started_at, stats=stats)
+
+    return stats
+
+
+def poll_due_servers_async():
+    """Polls the minecraft servers whose next poll time has passed
+
+    Each poll moves the server's next poll time along its own schedule, see
+    poll_schedule_service. With sharding enabled only this worker's shard of the
+    due servers is polled, see poll_shard_service"""
+
+    from msc.services import poll_shard_service
+
+    started_at = datetime.utcnow()
+
+    # create a new db session for this job
+    db: Session = next(get_db())
+
+    targets = []
+
+    # Get due servers
+    with _handle_db_errors():
+        targets = _get_poll_targets(db=db, due_only=True)
+
+    if config.poll_sharding:
+        # without its shard this worker would poll every due server, which the
+        # other workers are polling too, so the tick is skipped instead
+        try:
+            targets = poll_shard_service.get_shard(db=db, targets=targets)
+        except Exception as e:
+            logger.error(f"Error getting this worker's shard, skipping the tick: {e}")
+            return None
+        finally:
+            db.close()
+    else:
+        db.close()
+
+    stats = None
+
+    # ticks with nothing due take no snapshot and record no poll cycle
+    if targets:
+        logger.info(f"Polling {len(targets)} due servers")
+
+        stats = _run_poll_cycle(targets=targets)
+
+        _record_poll_cycle(started_at=started_at, stats=stats)
+
+    if config.poll_sharding:
+        db = next(get_db())
+
+        try:
+            poll_shard_service.record_progress(
+                db=db,
+                shard_size=len(targets),
+                stats=stats,
             )
-            .all()
-        )
+        finally:
+            db.close()
 
-    asyncio.run(
-        _poll_servers_aynsc_batch(
-            db=db,
-            servers=servers,
-        )
-    )
+    return stats
 
 
 def update_servers_uptime():
+    """Updates every server's uptime from its day buckets in a single UPDATE"""
+
+    from msc.services.poll_cycle_service import record_uptime_cycle
+
+    started_at = datetime.utcnow()
+
     # create a new db session for this job
     db: Session = next(get_db())
 
     logger.info("Updating servers uptime")
 
-    servers = []
+    write_started_at = time.perf_counter()
+    servers_updated = 0
+    servers_failed = 0
 
-    # Get all servers
-    with _handle_db_errors():
-        servers = (
+    try:
+        servers_updated = refresh_uptimes(db=db)
+    except Exception as e:
+        logger.error(f"Unhandled error updating servers uptime: {e}")
+        db.rollback()
+
+        servers_failed = (
             db.query(Server)
             .filter(
                 Server.flagged_for_deletion == False,
             )
-            .all()
+            .count()
         )
 
-    for server in servers:
-        _update_server_uptime(
+    try:
+        record_uptime_cycle(
             db=db,
-            server=server,
+            started_at=started_at,
+            servers_attempted=servers_updated + servers_failed,
+            servers_failed=servers_failed,
+            write_ms=_elapsed_ms(write_started_at),
         )
+    except Exception as e:
+        logger.error(f"Error recording uptime cycle: {e}")
 
     db.close()
 
@@ -696,43 +1067,21 @@ def update_servers_uptime():
 def _update_server_uptime(
     db: Session,
     server: Server,
-):
-    """Updates the server uptime from the past 30 days of data points"""
-
-    try:
-        # update the server uptime from the past 30 days of data points
-        online_data_points = (
-            db.query(ServerHistory)
-            .filter(
-                ServerHistory.server_id == server.id,
-                ServerHistory.created_at >= datetime.utcnow() - timedelta(days=30),
-                ServerHistory.is_online == True,
-            )
-            .count()
-        )
-
-        total_data_points = (
-            db.query(ServerHistory)
-            .filter(
-                ServerHistory.server_id == server.id,
-                ServerHistory.created_at >= datetime.utcnow() - timedelta(days=30),
-            )
-            .count()
-        )
+) -> bool:
+    """Recounts a server's day buckets from its history and updates its uptime
 
-        if total_data_points == 0 or online_data_points == 0:
-            uptime = 0
-        else:
-            uptime = (online_data_points / total_data_points) * 100
+    :returns: Whether the uptime was updated"""
 
-        server.uptime = round(uptime, 2)
+    try:
+        rebuild_uptime_buckets(db=db, server_id=server.id)
+        refresh_uptimes(db=db, server_id=server.id)
 
-        with _handle_db_errors():
-            db.commit()
+        return True
 
     except Exception as e:
         logger.error(f"Unhandled error updating server uptime: {e}")
-        pass
+        db.rollback()
+        return False
 
 
 def _create_server_history_data_point(
@@ -744,22 +1093,23 @@ def _create_server_history_data_point(
 ):
     """Creates a data point in the server history table, limited to 1 per 60 seconds"""
 
-    # Get the last data point
-    last_data_point = (
-        db.query(ServerHistory)
+    # Get the time of the last data point
+    last_data_point_at = (
+        db.query(ServerHistory.created_at)
         .filter(
             ServerHistory.server_id == server.id,
         )
         .order_by(
             ServerHistory.created_at.desc(),
         )
-        .first()
+        .limit(1)
+        .scalar()
     )
 
-    if last_data_point:
+    if last_data_point_at:
         # If the last data point was created less than a minute ago, dont create a new one
         # This is to prevent spamming the database with data points
-        if (datetime.utcnow() - last_data_point.created_at).total_seconds() < 60:
+        if (datetime.utcnow() - last_data_point_at).total_seconds() < 60:
             return
 
     from msc.services.server_service import get_server_rank
@@ -790,6 +1140,22 @@ def _create_server_history_data_point(
 
         db.add(server_history)
 
+        add_uptime_seconds(
+            db=db,
+            data_points=[
+                (server.id, is_online, server_history.created_at, last_data_point_at)
+            ],
+        )
+        add_history_rollups(
+            db=db,
+            data_points=[
+                {
+                    column.name: getattr(server_history, column.name)
+                    for column in ServerHistory.__table__.columns
+                }
+            ],
+        )
+
         if commit:
             with _handle_db_errors():
                 db.commit()
@@ -0,0 +1,141 @@
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from msc.constants import POLL_CYCLE_RETENTION_DAYS
+from msc.models import PollCycle
+from msc.models.poll_cycle import PollCycleKind
+from msc.services.ping_service import PollCycleStats
+from msc.services.poll_shard_service import get_worker_id
+
+logger = logging.getLogger(__name__)
+
+# runs skipped by the scheduler per job kind, carried into the next recorded cycle
+_skipped_runs: Dict[PollCycleKind, int] = {kind: 0 for kind in PollCycleKind}
+_skipped_runs_lock = threading.Lock()
+
+
+@contextmanager
+def _handle_db_errors():
+    try:
+        yield
+    except Exception as e:
+        logger.error(f"Error in poll cycle service: {e}")
+        raise e
+
+
+def record_skipped_run(kind: PollCycleKind):
+    """Counts a run of a polling job the scheduler skipped because the previous
+    run had not finished"""
+
+    with _skipped_runs_lock:
+        _skipped_runs[kind] += 1
+
+    logger.warning(f"{kind.value} job run skipped, the previous run is still going")
+
+
+def _take_skipped_runs(kind: PollCycleKind) -> int:
+    with _skipped_runs_lock:
+        skipped_runs = _skipped_runs[kind]
+        _skipped_runs[kind] = 0
+
+    return skipped_runs
+
+
+def _save_cycle(db: Session, cycle: PollCycle) -> PollCycle:
+    """Saves a cycle and drops cycles past the retention period"""
+
+    with _handle_db_errors():
+        db.add(cycle)
+
+        db.query(PollCycle).filter(
+            PollCycle.started_at
+            < datetime.utcnow() - timedelta(days=POLL_CYCLE_RETENTION_DAYS),
+        ).delete(synchronize_session=False)
+
+        db.commit()
+
+    return cycle
+
+
+def record_poll_cycle(
+    db: Session,
+    started_at: datetime,
+    stats: PollCycleStats,
+    worker_id: Optional[str] = None,
+) -> PollCycle:
+    """Records a poll cycle from its stats"""
+
+    metrics = stats.metrics or {}
+    outcomes = metrics.get("outcomes", {})
+    probe = metrics.get("probe", {})
+    write = metrics.get("write", {})
+
+    servers_online = outcomes.get("ok", 0)
+
+    return _save_cycle(
+        db=db,
+        cycle=PollCycle(
+            kind=PollCycleKind.POLL,
+            worker_id=worker_id or get_worker_id(),
+            started_at=started_at,
+            finished_at=datetime.utcnow(),
+            servers_attempted=stats.servers,
+            servers_online=servers_online,
+            servers_failed=sum(outcomes.values()) - servers_online,
+            probe_p50_ms=probe.get("p50_ms"),
+            probe_p95_ms=probe.get("p95_ms"),
+            probe_p99_ms=probe.get("p99_ms"),
+            write_ms=write.get("total_ms"),
+            skipped_overlaps=_take_skipped_runs(PollCycleKind.POLL),
+        ),
+    )
+
+
+def record_uptime_cycle(
+    db: Session,
+    started_at: datetime,
+    servers_attempted: int,
+    servers_failed: int,
+    write_ms: float,
+    worker_id: Optional[str] = None,
+) -> PollCycle:
+    """Records a run of the server uptime job, which only writes to the database"""
+
+    return _save_cycle(
+        db=db,
+        cycle=PollCycle(
+            kind=PollCycleKind.UPTIME,
+            worker_id=worker_id or get_worker_id(),
+            started_at=started_at,
+            finished_at=datetime.utcnow(),
+            servers_attempted=servers_attempted,
+            servers_failed=servers_failed,
+            write_ms=write_ms,
+            skipped_overlaps=_take_skipped_runs(PollCycleKind.UPTIME),
+        ),
+    )
+
+
+def get_poll_cycles(
+    db: Session,
+    kind: Optional[PollCycleKind] = None,
+    since: Optional[datetime] = None,
+    limit: int = 100,
+) -> List[PollCycle]:
+    """Gets the latest poll cycles, newest first"""
+
+    with _handle_db_errors():
+        query = db.query(PollCycle)
+
+        if kind is not None:
+            query = query.filter(PollCycle.kind == kind)
+
+        if since is not None:
+            query = query.filter(PollCycle.started_at >= since)
+
+        return query.order_by(PollCycle.started_at.desc()).limit(limit).all()
@@ -0,0 +1,159 @@
+import asyncio
+import bisect
+import enum
+import socket
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from msc.constants import POLL_LATENCY_BUCKETS_MS
+
+
+class ProbeOutcome(str, enum.Enum):
+    OK = "ok"
+    TIMEOUT = "timeout"
+    DNS = "dns"
+    REFUSED = "refused"
+    PROTOCOL_ERROR = "protocol_error"
+
+
+class ProbeStage(str, enum.Enum):
+    LOOKUP = "lookup"
+    STATUS = "status"
+    QUERY = "query"
+    WRITE = "write"
+
+
+def classify_probe_error(error: BaseException) -> ProbeOutcome:
+    """Classifies the error a probe failed with"""
+
+    if isinstance(error, socket.gaierror):
+        return ProbeOutcome.DNS
+
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, socket.timeout)):
+        return ProbeOutcome.TIMEOUT
+
+    # connection level errors carry an errno, mcstatus raises bare IOErrors for
+    # invalid packets
+    if isinstance(error, ConnectionError) or (
+        isinstance(error, OSError) and error.errno is not None
+    ):
+        return ProbeOutcome.REFUSED
+
+    return ProbeOutcome.PROTOCOL_ERROR
+
+
+@dataclass
+class Histogram:
+    """Fixed bucket histogram of durations in milliseconds"""
+
+    bounds: Tuple[float, ...] = POLL_LATENCY_BUCKETS_MS
+    counts: List[int] = field(default_factory=list)
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def __post_init__(self):
+        if not self.counts:
+            # the last bucket holds everything above the highest bound
+            self.counts = [0] * (len(self.bounds) + 1)
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> float:
+        """Estimates a percentile as the upper bound of the bucket it falls in"""
+
+        if not self.count:
+            return 0.0
+
+        rank = percentile / 100 * self.count
+        seen = 0
+
+        for i, count in enumerate(self.counts):
+            seen += count
+
+            if seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+
+        return self.max
+
+
+class PollMetrics:
+    """Latency histograms per probe stage and counters per probe outcome for a
+    poll cycle, safe to record from the poll loop and the writer thread"""
+
+    def __init__(self):
+        self.histograms: Dict[ProbeStage, Histogram] = {
+            stage: Histogram() for stage in ProbeStage
+        }
+        self.outcomes: Dict[ProbeOutcome, int] = {
+            outcome: 0 for outcome in ProbeOutcome
+        }
+        self.probe_latency = Histogram()
+        self.server_latency = Histogram()
+
+        self._lock = threading.Lock()
+
+    def observe(self, stage: ProbeStage, duration_ms: float):
+        with self._lock:
+            self.histograms[stage].observe(duration_ms)
+
+    def record_result(self, result):
+        """Records the timings and outcome carried by a poll result"""
+
+        with self._lock:
+            if result.outcome is not None:
+                self.outcomes[result.outcome] += 1
+
+            probe_ms = None
+
+            for stage, duration_ms in (
+                (ProbeStage.LOOKUP, result.lookup_ms),
+                (ProbeStage.STATUS, result.status_ms),
+                (ProbeStage.QUERY, result.query_ms),
+            ):
+                if duration_ms is not None:
+                    self.histograms[stage].observe(duration_ms)
+                    probe_ms = (probe_ms or 0) + duration_ms
+
+            if probe_ms is not None:
+                self.probe_latency.observe(probe_ms)
+
+            if result.latency_ms is not None:
+                self.server_latency.observe(result.latency_ms)
+
+    def summary(self) -> Dict[str, dict]:
+        """Aggregates for the cycle, keyed by stage, "probe" covers every stage of
+        a probe together"""
+
+        with self._lock:
+            summary = {
+                "outcomes": {
+                    outcome.value: count for outcome, count in self.outcomes.items()
+                },
+            }
+
+            for name, histogram in [
+                *((stage.value, h) for stage, h in self.histograms.items()),
+                ("probe", self.probe_latency),
+                ("server_latency", self.server_latency),
+            ]:
+                summary[name] = {
+                    "count": histogram.count,
+                    "mean_ms": round(histogram.mean, 2),
+                    "p50_ms": histogram.percentile(50),
+                    "p95_ms": histogram.percentile(95),
+                    "p99_ms": histogram.percentile(99),
+                    "max_ms": round(histogram.max, 2),
+                    "total_ms": round(histogram.total, 2),
+                }
+
+            return summary
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional
+
+from msc.config import config
+from msc.services.icon_upload_service import icon_upload_queue
+from msc.services.ping_service import (
+    PollCycleStats,
+    PollResult,
+    PollTarget,
+    _poll_servers_aynsc_batch,
+)
+from msc.services.resolver_service import resolver_cache
+
+logger = logging.getLogger(__name__)
+
+_CLOSE = None
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_processes: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_poll_processes() -> int:
+    """Gets the number of poll processes, defaults to the number of CPUs"""
+
+    return config.poll_processes or os.cpu_count() or 1
+
+
+def _init_poll_process():
+    logging.basicConfig(level=config.logging_level)
+
+
+def _get_pool(processes: int) -> ProcessPoolExecutor:
+    """Gets the poll process pool, the pool is kept between cycles so each process
+    keeps its warm resolver cache and the interpreter start up is only paid once"""
+
+    global _pool, _pool_processes
+
+    with _pool_lock:
+        if _pool is None or _pool_processes != processes:
+            if _pool is not None:
+                _pool.shutdown(wait=True)
+
+            # processes are spawned rather than forked as the parent is running
+            # scheduler and writer threads
+            _pool = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_poll_process,
+            )
+            _pool_processes = processes
+
+        return _pool
+
+
+def _reset_pool():
+    global _pool, _pool_processes
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+
+        _pool = None
+        _pool_processes = None
+
+
+def _poll_slice(
+    targets: List[PollTarget],
+    result_queue,
+    concurrency: int,
+) -> PollCycleStats:
+    """Polls a slice of the targets on this process's own event loop, results are
+    sent back to the parent through the result queue"""
+
+    stats = asyncio.run(
+        _poll_servers_aynsc_batch(
+            targets=targets,
+            on_result=result_queue.put,
+            concurrency=concurrency,
+        )
+    )
+
+    stats.icon_upload_queue_depth = icon_upload_queue.depth
+
+    resolver_stats = resolver_cache.stats
+
+    logger.info(
+        f"Poll process {os.getpid()} resolver cache hit rate "
+        f"{resolver_stats.hit_rate:.2%}"
+    )
+
+    return stats
+
+
+def _forward_results(result_queue, on_result: Callable[[PollResult], None]):
+    while True:
+        result = result_queue.get()
+
+        if result is _CLOSE:
+            return
+
+        on_result(result)
+
+
+def poll_servers_multiprocess(
+    targets: List[PollTarget],
+    on_result: Callable[[PollResult], None],
+    processes: Optional[int] = None,
+) -> PollCycleStats:
+    """Polls servers across a pool of processes, each running its own event loop
+
+    Targets are dealt out round robin so every process keeps the most overdue
+    servers at the front of its slice, and the total number of in-flight probes
+    is split between the processes. Results from every process are handed to
+    on_result from a single thread in this process
+
+    :param targets: The servers to poll
+    :param on_result: Called with each poll result
+    :param processes: The number of processes, defaults to get_poll_processes
+
+    :returns: The combined stats for the poll cycle"""
+
+    processes = min(processes or get_poll_processes(), len(targets))
+
+    stats = PollCycleStats(servers=len(targets))
+
+    if processes == 0:
+        return stats
+
+    concurrency = max(config.poll_concurrency // processes, 1)
+    started_at = time.monotonic()
+
+    with multiprocessing.get_context("spawn").Manager() as manager:
+        result_queue = manager.Queue()
+
+        forwarder = threading.Thread(
+            target=_forward_results,
+            args=(result_queue, on_result),
+            name="poll-result-forwarder",
+            daemon=True,
+        )
+        forwarder.start()
+
+        try:
+            pool = _get_pool(processes)
+
+            futures = [
+                pool.submit(
+                    _poll_slice,
+                    targets[i::processes],
+                    result_queue,
+                    concurrency,
+                )
+                for i in range(processes)
+            ]
+
+            for future in futures:
+                try:
+                    slice_stats = future.result()
+                except BrokenProcessPool as e:
+                    logger.error(f"Poll process pool broke: {e}")
+                    _reset_pool()
+                    break
+                except Exception as e:
+                    logger.error(f"Error in poll process: {e}")
+                    continue
+
+                stats.probes_started += slice_stats.probes_started
+                stats.probes_completed += slice_stats.probes_completed
+                stats.probes_timed_out += slice_stats.probes_timed_out
+                stats.icon_upload_queue_depth += slice_stats.icon_upload_queue_depth
+        finally:
+            result_queue.put(_CLOSE)
+            forwarder.join()
+
+    stats.duration_seconds = time.monotonic() - started_at
+    stats.probes_skipped = (
+        stats.servers - stats.probes_completed - stats.probes_timed_out
+    )
+
+    logger.info(
+        f"Polled {stats.probes_completed}/{stats.servers} servers across "
+        f"{processes} processes in {stats.duration_seconds:.2f}s "
+        f"({stats.probes_per_second:.2f} probes/sec)"
+    )
+
+    return stats
@@ -0,0 +1,128 @@
+import hashlib
+from datetime import datetime, timedelta
+from typing import Optional, Tuple, Union
+from uuid import UUID
+
+from msc.config import config
+from msc.constants import (
+    POLL_HOT_RANK,
+    POLL_STABLE_INTERVAL_MULTIPLIER,
+    POLL_STABLE_UPTIME,
+)
+
+# caps the backoff exponent, the interval is clamped to the maximum long before this
+MAX_BACKOFF_EXPONENT = 32
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def get_poll_interval(
+    is_online: bool,
+    consecutive_failures: int,
+    uptime: float,
+    rank: Optional[int] = None,
+) -> int:
+    """Works out how many seconds to wait before polling a server again
+
+    Hot listings and unstable servers are polled at the minimum interval, stable
+    online servers at a multiple of it, and offline servers back off exponentially
+    from the minimum interval for every consecutive failure.
+
+    Uptime weights each data point by the time since the server's previous one,
+    so backing off doesn't under-count offline periods. The maximum interval
+    bounds the time a single data point can stand for
+
+    :param is_online: Whether the latest poll found the server online
+    :param consecutive_failures: The number of consecutive failed polls, including
+        the latest
+    :param uptime: The server's current uptime percentage
+    :param rank: The server's current rank, if known"""
+
+    min_interval = config.poll_min_interval
+    max_interval = config.poll_max_interval
+
+    is_hot = rank is not None and rank <= POLL_HOT_RANK
+
+    if is_hot:
+        interval = min_interval
+    elif is_online:
+        if uptime is not None and uptime < POLL_STABLE_UPTIME:
+            interval = min_interval
+        else:
+            interval = min_interval * POLL_STABLE_INTERVAL_MULTIPLIER
+    else:
+        # the first failure is rechecked at the minimum interval in case the
+        # server was only restarting
+        exponent = min(max(consecutive_failures - 1, 0), MAX_BACKOFF_EXPONENT)
+        interval = min_interval * 2**exponent
+
+    return min(max(interval, min_interval), max_interval)
+
+
+def get_poll_slot(server_id: Union[UUID, str]) -> float:
+    """Gets a server's stable position within any poll interval, as a fraction of
+    the interval hashed from its id"""
+
+    digest = hashlib.md5(str(server_id).encode()).digest()
+
+    return int.from_bytes(digest[:8], "big") / 2**64
+
+
+def get_slot_time(
+    server_id: Union[UUID, str],
+    interval: int,
+    after: datetime,
+) -> datetime:
+    """Gets the first time after a given time which falls on a server's slot
+
+    Slots repeat every interval from the epoch, so the servers sharing an interval
+    are spread evenly across it and each server comes round once per interval"""
+
+    # worked out in whole microseconds so a server's slot times never drift
+    interval = int(interval * 1_000_000)
+    offset = int(get_poll_slot(server_id) * interval)
+    elapsed = (after - EPOCH) // timedelta(microseconds=1)
+
+    # the number of whole intervals until the first slot strictly after the time
+    intervals = (elapsed - offset) // interval + 1
+
+    return EPOCH + timedelta(microseconds=intervals * interval + offset)
+
+
+def get_next_poll(
+    is_online: bool,
+    consecutive_failures: int,
+    uptime: float,
+    polled_at: datetime,
+    rank: Optional[int] = None,
+    server_id: Optional[Union[UUID, str]] = None,
+) -> Tuple[int, datetime]:
+    """Works out a server's schedule after it has been polled
+
+    With a server id the next poll lands on the server's slot, the first slot
+    at least half an interval away, so a server polled on its slot is next polled
+    exactly one interval later however long its probe took. Without one the next
+    poll is one interval after the poll
+
+    :param consecutive_failures: The number of consecutive failed polls before
+        the latest
+
+    :returns: The new consecutive failure count and the next poll time"""
+
+    consecutive_failures = 0 if is_online else (consecutive_failures or 0) + 1
+
+    interval = get_poll_interval(
+        is_online=is_online,
+        consecutive_failures=consecutive_failures,
+        uptime=uptime,
+        rank=rank,
+    )
+
+    if server_id is None:
+        return consecutive_failures, polled_at + timedelta(seconds=interval)
+
+    return consecutive_failures, get_slot_time(
+        server_id=server_id,
+        interval=interval,
+        after=polled_at + timedelta(seconds=interval / 2),
+    )
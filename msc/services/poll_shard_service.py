@@ -0,0 +1,180 @@
+import bisect
+import hashlib
+import logging
+import os
+import socket
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from msc.config import config
+from msc.constants import POLL_SHARD_VIRTUAL_NODES, POLL_WORKER_TTL
+from msc.database import get_db
+from msc.models import PollWorker
+from msc.services.ping_service import PollCycleStats, PollTarget
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def _handle_db_errors():
+    try:
+        yield
+    except Exception as e:
+        logger.error(f"Error in poll shard service: {e}")
+        raise e
+
+
+def get_worker_id() -> str:
+    """Gets this process's worker id, unique per host and process unless set in
+    config"""
+
+    return config.poll_worker_id or f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hash ring of poll workers
+
+    Each worker is placed on the ring at several virtual nodes, so when a worker
+    joins or leaves only its neighbours' share of servers moves"""
+
+    def __init__(
+        self,
+        worker_ids: List[str],
+        virtual_nodes: int = POLL_SHARD_VIRTUAL_NODES,
+    ):
+        nodes = sorted(
+            (_hash(f"{worker_id}#{i}"), worker_id)
+            for worker_id in worker_ids
+            for i in range(virtual_nodes)
+        )
+
+        self._hashes = [node_hash for node_hash, _ in nodes]
+        self._worker_ids = [worker_id for _, worker_id in nodes]
+
+    def get_worker(self, key: str) -> Optional[str]:
+        """Gets the worker which owns a key"""
+
+        if not self._hashes:
+            return None
+
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+
+        return self._worker_ids[index]
+
+
+def heartbeat(db: Session, worker_id: str) -> PollWorker:
+    """Registers a worker or refreshes its heartbeat"""
+
+    with _handle_db_errors():
+        worker = db.get(PollWorker, worker_id)
+
+        if worker is None:
+            worker = PollWorker(worker_id=worker_id)
+            db.add(worker)
+            logger.info(f"Poll worker {worker_id} joined")
+
+        worker.heartbeat_at = datetime.utcnow()
+
+        db.commit()
+
+    return worker
+
+
+def heartbeat_task():
+    """Refreshes this worker's heartbeat
+
+    Runs on its own timer rather than with the poll ticks, which can run for up
+    to the poll cycle timeout, longer than the worker TTL"""
+
+    # create a new db session for this job
+    db: Session = next(get_db())
+
+    try:
+        heartbeat(db=db, worker_id=get_worker_id())
+    except Exception as e:
+        logger.error(f"Error sending poll worker heartbeat: {e}")
+    finally:
+        db.close()
+
+
+def get_live_worker_ids(db: Session) -> List[str]:
+    """Gets the workers which have sent a heartbeat within the worker TTL"""
+
+    cutoff = datetime.utcnow() - timedelta(seconds=POLL_WORKER_TTL)
+
+    with _handle_db_errors():
+        return [
+            worker_id
+            for worker_id, in db.query(PollWorker.worker_id)
+            .filter(
+                PollWorker.heartbeat_at >= cutoff,
+            )
+            .order_by(
+                PollWorker.worker_id,
+            )
+            .all()
+        ]
+
+
+def get_shard(
+    db: Session,
+    targets: List[PollTarget],
+    worker_id: Optional[str] = None,
+) -> List[PollTarget]:
+    """Gets the slice of targets owned by a worker
+
+    Membership is read from the heartbeats every cycle, so shards rebalance as
+    workers join, and a dead worker's servers stay due and are picked up by the
+    remaining workers once its heartbeat expires. Workers may briefly disagree on
+    membership, in which case a server can be polled twice in one tick"""
+
+    worker_id = worker_id or get_worker_id()
+
+    heartbeat(db=db, worker_id=worker_id)
+
+    ring = HashRing(get_live_worker_ids(db=db))
+
+    return [
+        target
+        for target in targets
+        if ring.get_worker(str(target.server_id)) == worker_id
+    ]
+
+
+def record_progress(
+    db: Session,
+    shard_size: int,
+    stats: Optional[PollCycleStats],
+    worker_id: Optional[str] = None,
+):
+    """Records the progress of a worker's latest poll cycle"""
+
+    worker_id = worker_id or get_worker_id()
+
+    with _handle_db_errors():
+        worker = db.get(PollWorker, worker_id)
+
+        if worker is None:
+            return
+
+        worker.shard_size = shard_size
+        worker.servers_polled = stats.probes_completed if stats else 0
+        worker.probes_timed_out = stats.probes_timed_out if stats else 0
+        worker.last_cycle_at = datetime.utcnow()
+        worker.last_cycle_duration = stats.duration_seconds if stats else 0
+
+        db.commit()
+
+
+def get_poll_workers(db: Session) -> List[PollWorker]:
+    """Gets all registered poll workers and their progress"""
+
+    with _handle_db_errors():
+        return db.query(PollWorker).order_by(PollWorker.worker_id).all()
@@ -0,0 +1,422 @@
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.orm import Session
+
+from msc.constants import POLL_WRITER_BATCH_SIZE, POLL_WRITER_FLUSH_INTERVAL
+from msc.database import get_db
+from msc.models import Server, ServerHistory
+from msc.services.circuit_breaker_service import (
+    BreakerUpdate,
+    get_breaker_update,
+    get_breakers,
+    get_endpoint,
+    save_breaker_updates,
+)
+from msc.services.history_service import add_history_rollups
+from msc.services.ping_service import PollResult
+from msc.services.poll_metrics_service import PollMetrics, ProbeStage
+from msc.services.poll_schedule_service import get_next_poll
+from msc.services.uptime_service import add_uptime_seconds
+from msc.services.version_service import process_version_from_ping
+from msc.services.vote_service import VoteCounts, get_vote_counts
+
+logger = logging.getLogger(__name__)
+
+_CLOSE = object()
+
+
+@dataclass
+class PollSnapshot:
+    """Ranks and vote counts of every server, taken once per poll cycle"""
+
+    ranks: Dict[UUID, int]
+    vote_counts: Dict[UUID, VoteCounts]
+    taken_at: datetime
+
+
+def take_poll_snapshot(db: Session) -> PollSnapshot:
+    """Takes a snapshot of every server's rank and vote counts in two queries"""
+
+    from msc.services.server_service import get_server_ranks
+
+    return PollSnapshot(
+        ranks=get_server_ranks(db=db),
+        vote_counts=get_vote_counts(db=db),
+        taken_at=datetime.utcnow(),
+    )
+
+
+class PollResultWriter:
+    """Applies poll results to the database from a single writer thread
+
+    Results are queued by the poll loop and drained in batches, each batch is
+    written with multi-row statements and committed once"""
+
+    def __init__(
+        self,
+        db: Optional[Session] = None,
+        batch_size: int = POLL_WRITER_BATCH_SIZE,
+        flush_interval: float = POLL_WRITER_FLUSH_INTERVAL,
+        snapshot: Optional[PollSnapshot] = None,
+        metrics: Optional[PollMetrics] = None,
+    ):
+        """
+        :param db: The session to write with, a new session is created for the
+            writer thread if not provided
+        :param batch_size: The maximum number of results per commit
+        :param flush_interval: The maximum time in seconds a result waits for its
+            batch to fill before it is written
+        :param snapshot: The ranks and vote counts to write history with, taken
+            when the writer starts if not provided
+        :param metrics: Records how long each batch takes to write
+        """
+        self._db = db
+        self._snapshot = snapshot
+        self._metrics = metrics
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="poll-result-writer",
+            daemon=True,
+        )
+
+        self.results_written = 0
+        self.batches_written = 0
+
+    def start(self):
+        self._thread.start()
+
+    def submit(self, result: PollResult):
+        """Queues a poll result to be written, never blocks"""
+        self._queue.put_nowait(result)
+
+    def close(self):
+        """Writes any queued results and waits for the writer thread to finish"""
+        self._queue.put_nowait(_CLOSE)
+        self._thread.join()
+
+    def _next_batch(self) -> Tuple[List[PollResult], bool]:
+        """Waits for the next batch of results
+
+        :returns: The batch and whether the writer has been closed"""
+
+        batch = []
+        deadline = None
+
+        while len(batch) < self._batch_size:
+            timeout = None
+
+            if deadline is not None:
+                timeout = max(deadline - time.monotonic(), 0)
+
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+
+            if item is _CLOSE:
+                return batch, True
+
+            batch.append(item)
+
+            if deadline is None:
+                deadline = time.monotonic() + self._flush_interval
+
+        return batch, False
+
+    def _run(self):
+        db = self._db if self._db is not None else next(get_db())
+
+        try:
+            snapshot = self._snapshot
+
+            if snapshot is None:
+                try:
+                    snapshot = take_poll_snapshot(db=db)
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Error taking poll snapshot: {e}")
+
+            closed = False
+
+            while not closed:
+                batch, closed = self._next_batch()
+
+                if not batch:
+                    continue
+
+                started_at = time.perf_counter()
+
+                if write_poll_results(db=db, results=batch, snapshot=snapshot):
+                    self.results_written += len(batch)
+                    self.batches_written += 1
+
+                if self._metrics is not None:
+                    self._metrics.observe(
+                        ProbeStage.WRITE,
+                        (time.perf_counter() - started_at) * 1000,
+                    )
+        finally:
+            if self._db is None:
+                db.close()
+
+
+def write_poll_results(
+    db: Session,
+    results: List[PollResult],
+    snapshot: Optional[PollSnapshot] = None,
+) -> bool:
+    """Applies a batch of poll results in a single transaction
+
+    Servers are updated with one batched UPDATE per set of changed columns, which
+    also moves each server's next poll time, the history data points are added
+    with one multi-row INSERT and counted into the uptime buckets and history
+    rollups with one upsert each
+
+    :param snapshot: The ranks and vote counts to write history with, taken for
+        this batch if not provided
+
+    :returns: True if the batch was committed"""
+
+    # only the latest result for each server is applied
+    latest_results: Dict = {result.server_id: result for result in results}
+
+    try:
+        servers = {
+            server.id: server
+            for server in db.query(Server)
+            .filter(
+                Server.id.in_(latest_results.keys()),
+            )
+            .all()
+        }
+
+        if snapshot is None:
+            snapshot = take_poll_snapshot(db=db)
+
+        versions = {}
+
+        for result in latest_results.values():
+            if result.is_online and result.raw_version is not None:
+                if result.raw_version not in versions:
+                    versions[result.raw_version] = process_version_from_ping(
+                        db=db,
+                        raw_version=result.raw_version,
+                    )
+
+        breakers = get_breakers(
+            db=db,
+            endpoints={get_endpoint(server) for server in servers.values()},
+        )
+        breaker_updates = {}
+        server_rows_by_columns = {}
+
+        for result in latest_results.values():
+            server = servers.get(result.server_id)
+
+            if not server:
+                continue
+
+            endpoint = get_endpoint(server)
+
+            if endpoint is not None:
+                breaker_updates[endpoint] = get_breaker_update(
+                    breaker=breakers.get(endpoint),
+                    is_online=result.is_online,
+                    polled_at=result.polled_at,
+                )
+
+            row = _get_server_row(
+                result=result,
+                server=server,
+                rank=snapshot.ranks.get(result.server_id),
+                versions=versions,
+                breaker_update=breaker_updates.get(endpoint),
+            )
+            server_rows_by_columns.setdefault(tuple(row.keys()), []).append(row)
+
+        save_breaker_updates(db=db, updates=breaker_updates)
+
+        server_table = Server.__table__
+
+        for rows in server_rows_by_columns.values():
+            db.execute(
+                update(server_table).where(
+                    server_table.c.id == bindparam("_server_id"),
+                ),
+                rows,
+            )
+
+        last_data_points = _get_last_data_points(db=db, server_ids=servers.keys())
+
+        history_rows = _get_server_history_rows(
+            results=list(latest_results.values()),
+            servers=servers,
+            snapshot=snapshot,
+            last_data_points=last_data_points,
+        )
+
+        if history_rows:
+            db.execute(insert(ServerHistory), history_rows)
+
+            add_uptime_seconds(
+                db=db,
+                data_points=[
+                    (
+                        row["server_id"],
+                        row["is_online"],
+                        row["created_at"],
+                        last_data_points.get(row["server_id"], (None, None))[0],
+                    )
+                    for row in history_rows
+                ],
+            )
+            add_history_rollups(db=db, data_points=history_rows)
+
+        db.commit()
+
+        return True
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error writing poll results: {e}")
+
+        return False
+
+
+def _get_server_row(
+    result: PollResult,
+    server: Server,
+    rank: Optional[int],
+    versions: Dict[str, str],
+    breaker_update: Optional[BreakerUpdate] = None,
+) -> dict:
+    """Builds the column values to update a server with from a poll result"""
+
+    consecutive_poll_failures, next_poll_at = get_next_poll(
+        is_online=result.is_online,
+        consecutive_failures=server.consecutive_poll_failures,
+        uptime=server.uptime,
+        polled_at=result.polled_at,
+        rank=rank,
+        server_id=result.server_id,
+    )
+
+    # a server behind an open breaker is not due again until its half-open check
+    if breaker_update is not None and breaker_update.next_check_at is not None:
+        next_poll_at = max(next_poll_at, breaker_update.next_check_at)
+
+    row = {
+        "_server_id": result.server_id,
+        "is_online": result.is_online,
+        "players": result.players,
+        "consecutive_poll_failures": consecutive_poll_failures,
+        "next_poll_at": next_poll_at,
+    }
+
+    if result.is_online:
+        row["max_players"] = result.max_players
+        row["last_pinged_at"] = result.polled_at
+        row["latency"] = (
+            round(result.latency_ms) if result.latency_ms is not None else None
+        )
+
+        if result.raw_version is not None:
+            row["minecraft_version"] = versions.get(result.raw_version)
+
+    if result.update_icon:
+        row["icon_checksum"] = result.icon_checksum
+
+    return row
+
+
+def _get_last_data_points(
+    db: Session,
+    server_ids: Iterable[UUID],
+) -> Dict[UUID, Tuple[datetime, int]]:
+    """Gets the time and total votes of each server's last history data point"""
+
+    return {
+        server_id: (created_at, total_votes)
+        for server_id, created_at, total_votes in db.query(
+            ServerHistory.server_id,
+            ServerHistory.created_at,
+            ServerHistory.total_votes,
+        )
+        .filter(
+            ServerHistory.server_id.in_(list(server_ids)),
+        )
+        .distinct(
+            ServerHistory.server_id,
+        )
+        .order_by(
+            ServerHistory.server_id,
+            ServerHistory.created_at.desc(),
+        )
+        .all()
+    }
+
+
+def _get_server_history_rows(
+    results: List[PollResult],
+    servers: Dict[UUID, Server],
+    snapshot: PollSnapshot,
+    last_data_points: Dict[UUID, Tuple[datetime, int]],
+) -> List[dict]:
+    """Builds the history data points for a batch of poll results, limited to 1
+    per server per 60 seconds
+
+    New votes are the growth in total votes since the server's last data point"""
+
+    history_rows = []
+
+    for result in results:
+        server = servers.get(result.server_id)
+        rank = snapshot.ranks.get(result.server_id)
+
+        # servers flagged for deletion are not ranked
+        if not server or rank is None:
+            continue
+
+        vote_counts = snapshot.vote_counts.get(
+            result.server_id,
+            VoteCounts(total_votes=0, votes_this_month=0),
+        )
+        new_votes = vote_counts.total_votes
+
+        last_data_point = last_data_points.get(result.server_id)
+
+        if last_data_point:
+            last_data_point_at, last_total_votes = last_data_point
+
+            # If the last data point was created less than a minute ago, dont create a new one
+            if (result.polled_at - last_data_point_at).total_seconds() < 60:
+                continue
+
+            new_votes = max(vote_counts.total_votes - last_total_votes, 0)
+
+        history_rows.append(
+            {
+                "server_id": server.id,
+                "is_online": result.is_online,
+                "players": result.players,
+                "rank": rank,
+                "uptime": server.uptime,
+                "new_votes": new_votes,
+                "votes_this_month": vote_counts.votes_this_month,
+                "total_votes": vote_counts.total_votes,
+                "created_at": result.polled_at,
+            }
+        )
+
+    return history_rows
@@ -0,0 +1,403 @@
+import ipaddress
+import logging
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+from urllib.parse import urlparse
+
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+from dns.rdatatype import RdataType
+from mcstatus import BedrockServer, JavaServer
+from mcstatus.address import Address
+from mcstatus.protocol.connection import TCPAsyncSocketConnection, TCPSocketConnection
+from mcstatus.querier import QueryResponse
+from mcstatus.status_response import JavaStatusResponse
+
+from msc.constants import DNS_CACHE_MAX_TTL, DNS_CACHE_MIN_TTL, DNS_CACHE_NEGATIVE_TTL
+
+logger = logging.getLogger(__name__)
+
+
+class ResolvedJavaServer(JavaServer):
+    """A java server whose address was resolved through the resolver cache
+
+    Connections are made to the cached ip while the handshake keeps the host name,
+    so servers behind virtual host proxies still answer"""
+
+    def __init__(self, host: str, port: int, ip: str, timeout: float = 3):
+        super().__init__(host, port, timeout=timeout)
+        self.ip = ip
+        self.ip_address = Address(ip, port)
+
+    def status(self, **kwargs) -> JavaStatusResponse:
+        with TCPSocketConnection(self.ip_address, self.timeout) as connection:
+            return self._retry_status(connection, **kwargs)
+
+    async def async_status(self, **kwargs) -> JavaStatusResponse:
+        async with TCPAsyncSocketConnection(
+            self.ip_address, self.timeout
+        ) as connection:
+            return await self._retry_async_status(connection, **kwargs)
+
+    def query(self) -> QueryResponse:
+        return self._retry_query(self.ip_address)
+
+    async def async_query(self) -> QueryResponse:
+        return await self._retry_async_query(self.ip_address)
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    expires_at: float
+    is_negative: bool = False
+
+
+@dataclass
+class ResolverStats:
+    hits: int = 0
+    negative_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.negative_hits + self.misses
+
+        if lookups == 0:
+            return 0.0
+
+        return (self.hits + self.negative_hits) / lookups
+
+
+class ResolverCache:
+    """TTL aware cache of SRV and A/AAAA lookups for minecraft server addresses
+
+    Positive answers are kept for their record TTL clamped to the configured
+    bounds, NXDOMAIN and empty answers are kept for the negative TTL"""
+
+    def __init__(
+        self,
+        min_ttl: int = DNS_CACHE_MIN_TTL,
+        max_ttl: int = DNS_CACHE_MAX_TTL,
+        negative_ttl: int = DNS_CACHE_NEGATIVE_TTL,
+    ):
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.stats = ResolverStats()
+
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: Tuple[str, str]) -> Optional[_CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry.expires_at <= time.monotonic():
+                self.stats.misses += 1
+                return None
+
+            if entry.is_negative:
+                self.stats.negative_hits += 1
+            else:
+                self.stats.hits += 1
+
+            return entry
+
+    def _set(
+        self,
+        key: Tuple[str, str],
+        value: Any,
+        ttl: Optional[int] = None,
+        is_negative: bool = False,
+    ):
+        if ttl is None:
+            ttl = self.negative_ttl
+        else:
+            ttl = min(max(ttl, self.min_ttl), self.max_ttl)
+
+        with self._lock:
+            self._entries[key] = _CacheEntry(
+                value=value,
+                expires_at=time.monotonic() + ttl,
+                is_negative=is_negative,
+            )
+
+    def invalidate(self, host: str):
+        """Removes all cached answers for a host"""
+
+        host = host.lower()
+
+        with self._lock:
+            self._entries.pop(("srv", host), None)
+            self._entries.pop(("ip", host), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.stats = ResolverStats()
+
+    def resolve_srv(
+        self,
+        host: str,
+        lifetime: Optional[float] = None,
+    ) -> Optional[Tuple[str, int]]:
+        """Resolves the minecraft SRV record for a host
+
+        :returns: The target host and port, or None if there is no SRV record"""
+
+        key = ("srv", host.lower())
+        entry = self._get(key)
+
+        if entry is not None:
+            return entry.value
+
+        try:
+            answers = dns.resolver.resolve(
+                f"_minecraft._tcp.{host}",
+                RdataType.SRV,
+                lifetime=lifetime,
+            )
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            self._set(key, None)
+            return None
+        except dns.exception.Timeout as e:
+            raise TimeoutError(f"Timed out resolving SRV record for {host}") from e
+
+        return self._set_srv_answers(key, answers)
+
+    async def async_resolve_srv(
+        self,
+        host: str,
+        lifetime: Optional[float] = None,
+    ) -> Optional[Tuple[str, int]]:
+        """Asynchronous alternative to resolve_srv"""
+
+        key = ("srv", host.lower())
+        entry = self._get(key)
+
+        if entry is not None:
+            return entry.value
+
+        try:
+            answers = await dns.asyncresolver.resolve(
+                f"_minecraft._tcp.{host}",
+                RdataType.SRV,
+                lifetime=lifetime,
+            )
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            self._set(key, None)
+            return None
+        except dns.exception.Timeout as e:
+            raise TimeoutError(f"Timed out resolving SRV record for {host}") from e
+
+        return self._set_srv_answers(key, answers)
+
+    def _set_srv_answers(
+        self,
+        key: Tuple[str, str],
+        answers: dns.resolver.Answer,
+    ) -> Tuple[str, int]:
+        # like the minecraft client, we just pick the first answer
+        answer = answers[0]
+        value = (str(answer.target).rstrip("."), int(answer.port))
+
+        self._set(key, value, ttl=answers.rrset.ttl)
+
+        return value
+
+    def resolve_ip(
+        self,
+        host: str,
+        lifetime: Optional[float] = None,
+    ) -> str:
+        """Resolves the A record for a host, falling back to AAAA
+
+        :raises socket.gaierror: If the host does not exist or has no address"""
+
+        if _is_ip_address(host):
+            return host
+
+        key = ("ip", host.lower())
+        entry = self._get(key)
+
+        if entry is not None:
+            return self._get_ip_value(host, entry)
+
+        for rdtype in (RdataType.A, RdataType.AAAA):
+            try:
+                answers = dns.resolver.resolve(host, rdtype, lifetime=lifetime)
+                return self._set_ip_answers(key, answers)
+            except dns.resolver.NoAnswer:
+                continue
+            except dns.resolver.NXDOMAIN:
+                break
+            except dns.exception.Timeout as e:
+                raise TimeoutError(f"Timed out resolving {host}") from e
+
+        return self._set_ip_not_found(host, key)
+
+    async def async_resolve_ip(
+        self,
+        host: str,
+        lifetime: Optional[float] = None,
+    ) -> str:
+        """Asynchronous alternative to resolve_ip"""
+
+        if _is_ip_address(host):
+            return host
+
+        key = ("ip", host.lower())
+        entry = self._get(key)
+
+        if entry is not None:
+            return self._get_ip_value(host, entry)
+
+        for rdtype in (RdataType.A, RdataType.AAAA):
+            try:
+                answers = await dns.asyncresolver.resolve(
+                    host, rdtype, lifetime=lifetime
+                )
+                return self._set_ip_answers(key, answers)
+            except dns.resolver.NoAnswer:
+                continue
+            except dns.resolver.NXDOMAIN:
+                break
+            except dns.exception.Timeout as e:
+                raise TimeoutError(f"Timed out resolving {host}") from e
+
+        return self._set_ip_not_found(host, key)
+
+    def _get_ip_value(self, host: str, entry: _CacheEntry) -> str:
+        if entry.is_negative:
+            raise socket.gaierror(socket.EAI_NONAME, f"Could not resolve {host}")
+
+        return entry.value
+
+    def _set_ip_answers(
+        self,
+        key: Tuple[str, str],
+        answers: dns.resolver.Answer,
+    ) -> str:
+        value = str(answers[0]).rstrip(".")
+
+        self._set(key, value, ttl=answers.rrset.ttl)
+
+        return value
+
+    def _set_ip_not_found(self, host: str, key: Tuple[str, str]):
+        self._set(key, None, is_negative=True)
+
+        raise socket.gaierror(socket.EAI_NONAME, f"Could not resolve {host}")
+
+
+resolver_cache = ResolverCache()
+
+
+def _is_ip_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+def _parse_address(address: str) -> Tuple[str, Optional[int]]:
+    """Parses an address like 127.0.0.1:25565 into host and port, port is None
+    if the address does not have one"""
+
+    parsed = urlparse("//" + address)
+
+    if not parsed.hostname:
+        raise ValueError(f"Invalid address '{address}', can't parse.")
+
+    return parsed.hostname, parsed.port
+
+
+def lookup_java_server(
+    address: str,
+    timeout: float = 3,
+) -> ResolvedJavaServer:
+    """Resolves a java server address through the resolver cache, mimics the
+    minecraft server address field"""
+
+    host, port = _parse_address(address)
+
+    if port is None:
+        srv = resolver_cache.resolve_srv(host, lifetime=timeout)
+        host, port = srv if srv else (host, JavaServer.DEFAULT_PORT)
+
+    ip = resolver_cache.resolve_ip(host, lifetime=timeout)
+
+    return ResolvedJavaServer(host, port, ip=ip, timeout=timeout)
+
+
+async def async_lookup_java_server(
+    address: str,
+    timeout: float = 3,
+) -> ResolvedJavaServer:
+    """Asynchronous alternative to lookup_java_server"""
+
+    host, port = _parse_address(address)
+
+    if port is None:
+        srv = await resolver_cache.async_resolve_srv(host, lifetime=timeout)
+        host, port = srv if srv else (host, JavaServer.DEFAULT_PORT)
+
+    ip = await resolver_cache.async_resolve_ip(host, lifetime=timeout)
+
+    return ResolvedJavaServer(host, port, ip=ip, timeout=timeout)
+
+
+def lookup_bedrock_server(
+    address: str,
+    timeout: float = 3,
+) -> BedrockServer:
+    """Resolves a bedrock server address through the resolver cache"""
+
+    host, port = _parse_address(address)
+    ip = resolver_cache.resolve_ip(host, lifetime=timeout)
+
+    return BedrockServer(ip, port or BedrockServer.DEFAULT_PORT, timeout=timeout)
+
+
+async def async_lookup_bedrock_server(
+    address: str,
+    timeout: float = 3,
+) -> BedrockServer:
+    """Asynchronous alternative to lookup_bedrock_server"""
+
+    host, port = _parse_address(address)
+    ip = await resolver_cache.async_resolve_ip(host, lifetime=timeout)
+
+    return BedrockServer(ip, port or BedrockServer.DEFAULT_PORT, timeout=timeout)
+
+
+def pre_resolve(
+    java_ip_address: Optional[str] = None,
+    java_port: Optional[int] = None,
+    bedrock_ip_address: Optional[str] = None,
+    bedrock_port: Optional[int] = None,
+):
+    """Refreshes the cached answers for a server's addresses so the next poll
+    cycle does not pay for resolution, errors are only logged"""
+
+    for ip_address, port, lookup in (
+        (java_ip_address, java_port, lookup_java_server),
+        (bedrock_ip_address, bedrock_port, lookup_bedrock_server),
+    ):
+        if not ip_address:
+            continue
+
+        address = f"{ip_address}:{port}" if port else ip_address
+
+        try:
+            host, _ = _parse_address(address)
+            resolver_cache.invalidate(host)
+            lookup(address)
+        except Exception as e:
+            logger.info(f"Could not pre-resolve {address}: {e}")
@@ -4,7 +4,7 @@ from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from io import BytesIO
-from typing import List, Optional
+from typing import Dict, List, Optional
 from uuid import UUID
 
 import boto3
@@ -12,12 +12,31 @@ from PIL import Image
 from sqlalchemy import Float, Integer, Numeric, Text, and_, cast, desc, func
 from sqlalchemy.orm import Session
 
+from msc.config import config
 from msc.dto.custom_types import NOT_SET
 from msc.errors import BadRequest, NotFound
-from msc.models import Server, ServerHistory, Sponsor, Tag, Vote
+from msc.models import (
+    Server,
+    ServerHistory,
+    ServerHistoryDaily,
+    ServerHistoryHourly,
+    ServerVoteStats,
+    Sponsor,
+    Tag,
+)
 from msc.models.server import INDEX_REMOVE_CHARS
-from msc.services import ping_service
-from msc.services.vote_service import get_total_votes, get_votes_this_month
+from msc.services import leaderboard_service, ping_service, resolver_service
+from msc.services.history_service import (
+    HISTORY_ROLLUPS,
+    get_bucket_start,
+    get_hourly_rollup_cutoff,
+    get_players_percentiles,
+)
+from msc.services.vote_service import (
+    get_total_votes,
+    get_vote_stats_columns,
+    get_votes_this_month,
+)
 from msc.utils.file_utils import _get_checksum
 
 
@@ -62,6 +81,8 @@ class ServerHistoryInfo:
     new_votes: int
     votes_this_month: int
     total_votes: int
+    p50_players: Optional[float] = None
+    p95_players: Optional[float] = None
 
 
 def get_servers(
@@ -118,26 +139,13 @@ def get_servers(
     month = now.month
     year = now.year
 
-    subquery = (
-        db.query(
-            Vote.server_id,
-            func.count(Vote.id).label("votes_this_month_sub"),
-        )
-        .filter(
-            and_(
-                func.extract("month", Vote.created_at) == month,
-                func.extract("year", Vote.created_at) == year,
-            )
-        )
-        .group_by(Vote.server_id)
-        .subquery()
-    )
+    total_votes, votes_this_month = get_vote_stats_columns(now=now)
 
     # Get servers and vote count
     servers_query = db.query(
         Server,
-        func.count(Vote.id).label("total_votes"),
-        func.coalesce(subquery.c.votes_this_month_sub, 0).label("votes_this_month"),
+        total_votes.label("total_votes"),
+        votes_this_month.label("votes_this_month"),
         (Sponsor.slot != None).label("is_sponsored"),
     )
 
@@ -157,12 +165,8 @@ def get_servers(
             ),
         )
         .outerjoin(
-            Vote,
-            Server.id == Vote.server_id,
-        )
-        .outerjoin(
-            subquery,
-            Server.id == subquery.c.server_id,
+            ServerVoteStats,
+            Server.id == ServerVoteStats.server_id,
         )
         .filter(
             Server.flagged_for_deletion == False,
@@ -171,7 +175,7 @@ def get_servers(
         .group_by(
             Server.id,
             Sponsor.slot,
-            subquery.c.votes_this_month_sub,
+            ServerVoteStats.server_id,
             Server.created_at,
         )
         .order_by(
@@ -188,13 +192,18 @@ def get_servers(
     # This needs to reflect the total number of servers in the query
     total_servers = servers_query.count()
 
+    ranks = leaderboard_service.get_ranks(
+        db=db,
+        servers=[s[0] for s in servers_result],
+    )
+
     return GetServersInfo(
         servers=[
             GetServerInfo(
                 server=s[0],
                 votes_this_month=s[2],
                 total_votes=s[1],
-                rank=get_server_rank(db=db, server=s[0]),
+                rank=ranks[s[0].id],
                 is_sponsored=s[3],
             )
             for s in servers_result
@@ -232,6 +241,8 @@ def get_sponsored_servers(db: Session) -> List[GetServerInfo]:
 
     servers = servers_query.all()
 
+    ranks = leaderboard_service.get_ranks(db=db, servers=servers)
+
     return [
         GetServerInfo(
             server=server,
@@ -243,10 +254,7 @@ def get_sponsored_servers(db: Session) -> List[GetServerInfo]:
                 db=db,
                 server=server,
             ),
-            rank=get_server_rank(
-                db=db,
-                server=server,
-            ),
+            rank=ranks[server.id],
             is_sponsored=True,
         )
         for server in servers
@@ -258,37 +266,21 @@ def get_server(
     server_id: UUID,
     include_auction_eligibility: bool = False,
 ) -> Server:
-    # Get the current month and year
+    # Get the current month
     now = datetime.utcnow()
-    month = now.month
-    year = now.year
 
-    subquery = (
-        db.query(
-            Vote.server_id,
-            func.count(Vote.id).label("votes_this_month_sub"),
-        )
-        .filter(
-            and_(
-                func.extract("month", Vote.created_at) == month,
-                func.extract("year", Vote.created_at) == year,
-            )
-        )
-        .group_by(Vote.server_id)
-        .subquery()
-    )
+    total_votes, votes_this_month = get_vote_stats_columns(now=now)
 
     # get server with votes
     server_and_votes = (
         db.query(
             Server,
-            func.count(Vote.id).label("total_votes"),
-            func.coalesce(subquery.c.votes_this_month_sub, 0).label("votes_this_month"),
+            total_votes.label("total_votes"),
+            votes_this_month.label("votes_this_month"),
             (Sponsor.slot != None).label("is_sponsored"),
         )
         .outerjoin(Sponsor, Server.id == Sponsor.server_id)
-        .outerjoin(Vote, Server.id == Vote.server_id)
-        .outerjoin(subquery, Server.id == subquery.c.server_id)
+        .outerjoin(ServerVoteStats, Server.id == ServerVoteStats.server_id)
         .filter(
             Server.id == server_id,
             Server.flagged_for_deletion == False,
@@ -296,7 +288,7 @@ def get_server(
         .group_by(
             Server.id,
             Sponsor.slot,
-            subquery.c.votes_this_month_sub,
+            ServerVoteStats.server_id,
             Server.created_at,
         )
         .one_or_none()
@@ -334,27 +326,14 @@ def get_my_servers(
     month = now.month
     year = now.year
 
-    subquery = (
-        db.query(
-            Vote.server_id,
-            func.count(Vote.id).label("votes_this_month_sub"),
-        )
-        .filter(
-            and_(
-                func.extract("month", Vote.created_at) == month,
-                func.extract("year", Vote.created_at) == year,
-            )
-        )
-        .group_by(Vote.server_id)
-        .subquery()
-    )
+    total_votes, votes_this_month = get_vote_stats_columns(now=now)
 
     # Get servers and vote count
     servers_query = (
         db.query(
             Server,
-            func.count(Vote.id).label("total_votes"),
-            func.coalesce(subquery.c.votes_this_month_sub, 0).label("votes_this_month"),
+            total_votes.label("total_votes"),
+            votes_this_month.label("votes_this_month"),
             (Sponsor.slot != None).label("is_sponsored"),
         )
         .outerjoin(
@@ -366,12 +345,8 @@ def get_my_servers(
             ),
         )
         .outerjoin(
-            Vote,
-            Server.id == Vote.server_id,
-        )
-        .outerjoin(
-            subquery,
-            Server.id == subquery.c.server_id,
+            ServerVoteStats,
+            Server.id == ServerVoteStats.server_id,
         )
         .filter(
             Server.user_id == user_id,
@@ -380,7 +355,7 @@ def get_my_servers(
         .group_by(
             Server.id,
             Sponsor.slot,
-            subquery.c.votes_this_month_sub,
+            ServerVoteStats.server_id,
             Server.created_at,
         )
         .order_by(
@@ -391,12 +366,17 @@ def get_my_servers(
 
     my_servers_result = servers_query.all()
 
+    ranks = leaderboard_service.get_ranks(
+        db=db,
+        servers=[my_server[0] for my_server in my_servers_result],
+    )
+
     return [
         GetServerInfo(
             server=my_server[0],
             votes_this_month=my_server[2],
             total_votes=my_server[1],
-            rank=get_server_rank(db=db, server=my_server[0]),
+            rank=ranks[my_server[0].id],
             is_sponsored=my_server[3],
             auction_eligibility=_get_auction_eligibility(server=my_server[0])
             if include_auction_eligibility
@@ -557,6 +537,19 @@ def update_server(
 
             db.add(server_tag)
 
+    address_changed = any(
+        value != NOT_SET
+        for value in [java_ip_address, java_port, bedrock_ip_address, bedrock_port]
+    )
+
+    if address_changed and config.dns_pre_resolve:
+        resolver_service.pre_resolve(
+            java_ip_address=server.java_ip_address,
+            java_port=server.java_port,
+            bedrock_ip_address=server.bedrock_ip_address,
+            bedrock_port=server.bedrock_port,
+        )
+
     # poll the server to check it is online and get extra data
     ping_service.poll_server(
         db=db,
@@ -636,6 +629,14 @@ def create_server(
     with _handle_db_errors():
         db.flush()
 
+    if config.dns_pre_resolve:
+        resolver_service.pre_resolve(
+            java_ip_address=java_ip_address,
+            java_port=java_port,
+            bedrock_ip_address=bedrock_ip_address,
+            bedrock_port=bedrock_port,
+        )
+
     # poll the server to check it is online and get extra data
     ping_service.poll_server(
         db=db,
@@ -692,6 +693,8 @@ def delete_server(
     server.flagged_for_deletion = True
     server.flagged_for_deletion_at = datetime.utcnow()
 
+    leaderboard_service.remove_server(db=db, server_id=server_id)
+
     with _handle_db_errors():
         db.commit()
 
@@ -702,8 +705,13 @@ def get_server_history(
     db: Session,
     server_id: UUID,
     time_interval: str = "day",
+    days: int = 30,
 ) -> List[ServerHistory]:
-    """Returns a server's historical data"""
+    """Returns a server's historical data
+
+    Closed buckets are read from the hourly or daily rollups and only the current
+    bucket is aggregated from the raw data points. Hours past the hourly rollups'
+    retention are served by day"""
 
     # TODO: Test this
     if time_interval not in ["day", "hour"]:
@@ -722,29 +730,66 @@ def get_server_history(
         raise NotFound("Server not found")
 
     now = datetime.utcnow()
-    from_date = now - timedelta(days=30)
-    to_date = now
+    from_date = get_bucket_start(now - timedelta(days=days), time_interval)
+    current_bucket = get_bucket_start(now, time_interval)
+
+    ranges = [(HISTORY_ROLLUPS[time_interval], from_date, current_bucket)]
+
+    if time_interval == "hour":
+        hourly_cutoff = get_hourly_rollup_cutoff(now)
+
+        # hours past the hourly rollups' retention are served by day
+        if from_date < hourly_cutoff:
+            ranges = [
+                (ServerHistoryDaily, from_date, hourly_cutoff),
+                (ServerHistoryHourly, hourly_cutoff, current_bucket),
+            ]
+
+    server_history = []
+
+    for rollup, start, end in ranges:
+        server_history += (
+            db.query(
+                rollup.bucket,
+                rollup.best_rank,
+                rollup.max_players,
+                cast(rollup.uptime_sum, Float) / rollup.data_points,
+                rollup.new_votes,
+                rollup.votes_this_month,
+                rollup.total_votes,
+                rollup.p50_players,
+                rollup.p95_players,
+            )
+            .filter(
+                rollup.server_id == server_id,
+                rollup.bucket >= start,
+                rollup.bucket < end,
+            )
+            .order_by(rollup.bucket)
+            .all()
+        )
+
+    # the current bucket is still being written to, so it comes from the raw data
+    # points
+    bucket, p50_players, p95_players = get_players_percentiles(time_interval)
 
-    # TODO: Add rigourous testing for this
-    server_history = (
+    server_history += (
         db.query(
-            func.DATE_TRUNC(time_interval, ServerHistory.created_at).label("date"),
-            cast(func.min(ServerHistory.rank), Integer).label("rank"),
-            cast(func.max(ServerHistory.players), Integer).label("players"),
-            cast(func.avg(ServerHistory.uptime), Float).label("uptime"),
-            cast(func.sum(ServerHistory.new_votes), Integer).label("new_votes"),
-            cast(func.max(ServerHistory.votes_this_month), Integer).label(
-                "votes_this_month"
-            ),
-            cast(func.max(ServerHistory.total_votes), Integer).label("total_votes"),
+            bucket,
+            func.min(ServerHistory.rank),
+            func.max(ServerHistory.players),
+            cast(func.avg(ServerHistory.uptime), Float),
+            cast(func.sum(ServerHistory.new_votes), Integer),
+            func.max(ServerHistory.votes_this_month),
+            func.max(ServerHistory.total_votes),
+            p50_players,
+            p95_players,
         )
         .filter(
             ServerHistory.server_id == server_id,
-            ServerHistory.created_at >= from_date,
-            ServerHistory.created_at <= to_date,
+            ServerHistory.created_at >= current_bucket,
         )
-        .group_by("date")
-        .order_by("date")
+        .group_by(bucket)
         .all()
     )
 
@@ -757,6 +802,8 @@ def get_server_history(
             new_votes=s[4],
             votes_this_month=s[5],
             total_votes=s[6],
+            p50_players=s[7],
+            p95_players=s[8],
         )
         for s in server_history
     ]
@@ -764,42 +811,25 @@ def get_server_history(
     return server_history_infos
 
 
-def get_server_rank(
-    db: Session,
-    server: Server,
-) -> int:
-    """Gets a server's computed rank
-
-    Mainly for internal use"""
+def _get_server_rank_subquery(db: Session):
+    """Builds the subquery which ranks every listed server by sponsored slot and
+    then votes this month"""
 
     # Get the current month and year
     now = datetime.utcnow()
     month = now.month
     year = now.year
 
-    vote_subquery = (
-        db.query(
-            Vote.server_id,
-            func.count(Vote.id).label("votes_this_month_sub"),
-        )
-        .filter(
-            and_(
-                func.extract("month", Vote.created_at) == month,
-                func.extract("year", Vote.created_at) == year,
-            )
-        )
-        .group_by(Vote.server_id)
-        .subquery()
-    )
+    _, votes_this_month = get_vote_stats_columns(now=now)
 
-    server_rank_subquery = (
+    return (
         db.query(
             Server.id,
             func.rank()
             .over(
                 order_by=[
                     Sponsor.slot.asc().nulls_last(),
-                    vote_subquery.c.votes_this_month_sub.desc().nulls_last(),
+                    votes_this_month.desc(),
                 ],
                 partition_by=None,
             )
@@ -814,8 +844,8 @@ def get_server_rank(
             ),
         )
         .outerjoin(
-            vote_subquery,
-            Server.id == vote_subquery.c.server_id,
+            ServerVoteStats,
+            Server.id == ServerVoteStats.server_id,
         )
         .filter(
             Server.flagged_for_deletion == False,
@@ -823,12 +853,41 @@ def get_server_rank(
         .group_by(
             Server.id,
             Sponsor.slot,
-            vote_subquery.c.votes_this_month_sub,
+            ServerVoteStats.server_id,
             Server.created_at,
         )
         .subquery()
     )
 
+
+def get_server_rank(
+    db: Session,
+    server: Server,
+) -> int:
+    """Gets a server's rank from the leaderboard
+
+    Mainly for internal use"""
+
+    return leaderboard_service.get_server_rank(db=db, server=server)
+
+
+def get_server_ranks(db: Session) -> Dict[UUID, int]:
+    """Gets every listed server's rank from the leaderboard
+
+    Mainly for internal use"""
+
+    return leaderboard_service.get_server_ranks(db=db)
+
+
+def get_computed_server_rank(
+    db: Session,
+    server: Server,
+) -> int:
+    """Computes a server's rank with the rank window function over every listed
+    server, to verify the leaderboard"""
+
+    server_rank_subquery = _get_server_rank_subquery(db=db)
+
     rank = (
         db.query(server_rank_subquery.c.rank)
         .filter(
@@ -840,6 +899,20 @@ def get_server_rank(
     return rank
 
 
+def get_computed_server_ranks(db: Session) -> Dict[UUID, int]:
+    """Computes every listed server's rank with the rank window function in a
+    single query, to verify the leaderboard"""
+
+    server_rank_subquery = _get_server_rank_subquery(db=db)
+
+    return dict(
+        db.query(
+            server_rank_subquery.c.id,
+            server_rank_subquery.c.rank,
+        ).all()
+    )
+
+
 def _get_auction_eligibility(server: Server) -> ServerAuctionEligibility:
     """The rules for whether a server is eligible for auction are defined here
     the results of each eligibility returned as a dataclass"""
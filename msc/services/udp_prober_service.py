@@ -0,0 +1,335 @@
+import asyncio
+import itertools
+import logging
+import math
+import os
+import socket
+import struct
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from mcstatus.bedrock_status import BedrockServerStatus
+from mcstatus.protocol.connection import Connection
+from mcstatus.querier import QueryResponse
+from mcstatus.status_response import BedrockStatusResponse
+
+from msc.constants import (
+    UDP_PROBER_RETRIES,
+    UDP_PROBER_SOCKETS,
+    UDP_PROBER_TICK,
+    UDP_PROBER_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+# see https://wiki.vg/Raknet_Protocol#Unconnected_Ping
+RAKNET_UNCONNECTED_PING = 0x01
+RAKNET_UNCONNECTED_PONG = 0x1C
+RAKNET_MAGIC = bytes.fromhex("00ffff00fefefefefdfdfdfd12345678")
+
+# see https://wiki.vg/Query
+QUERY_MAGIC = bytes.fromhex("fefd")
+QUERY_TYPE_HANDSHAKE = 0x09
+QUERY_TYPE_STAT = 0x00
+QUERY_PADDING = bytes.fromhex("00000000")
+
+_Key = Tuple[Tuple[str, int], int, int]
+
+
+@dataclass
+class UdpProberStats:
+    requests_sent: int = 0
+    replies_matched: int = 0
+    replies_unmatched: int = 0
+    timeouts: int = 0
+
+
+class _ProberProtocol(asyncio.DatagramProtocol):
+    def __init__(self, prober: "UdpProber"):
+        self.prober = prober
+
+    def datagram_received(self, data: bytes, addr: tuple):
+        self.prober._on_datagram(data, addr)
+
+    def error_received(self, exc: Exception):
+        # ICMP errors on unconnected sockets do not say which request they belong
+        # to, the request is failed by its timeout instead
+        pass
+
+
+class _TimerWheel:
+    """Hashed timer wheel of pending request keys
+
+    Expiry is checked once per tick for a single slot, instead of arming a timer
+    per request"""
+
+    def __init__(self, tick: float, max_timeout: float):
+        self.tick = tick
+        self._slots: List[Set[_Key]] = [
+            set() for _ in range(math.ceil(max_timeout / tick) + 2)
+        ]
+        self._position = 0
+
+    def schedule(self, key: _Key, timeout: float) -> int:
+        ticks = max(math.ceil(timeout / self.tick), 1)
+        slot = (self._position + min(ticks, len(self._slots) - 1)) % len(self._slots)
+
+        self._slots[slot].add(key)
+
+        return slot
+
+    def cancel(self, key: _Key, slot: int):
+        self._slots[slot].discard(key)
+
+    def advance(self) -> Set[_Key]:
+        """Moves the wheel on by one tick and returns the keys which expired"""
+
+        self._position = (self._position + 1) % len(self._slots)
+
+        expired = self._slots[self._position]
+        self._slots[self._position] = set()
+
+        return expired
+
+
+class UdpProber:
+    """Sends RakNet unconnected pings and GameSpy4 queries for many servers
+    through a small fixed pool of UDP sockets
+
+    Replies are matched to their request by the server address, packet type and
+    the nonce or session id the server echoes back, and every request timeout is
+    driven by one timer wheel"""
+
+    def __init__(
+        self,
+        sockets: int = UDP_PROBER_SOCKETS,
+        timeout: float = UDP_PROBER_TIMEOUT,
+        retries: int = UDP_PROBER_RETRIES,
+        tick: float = UDP_PROBER_TICK,
+    ):
+        """
+        :param sockets: The number of sockets per address family
+        :param timeout: The time in seconds to wait for each reply
+        :param retries: The number of times a request is resent after timing out
+        :param tick: The resolution of the timer wheel in seconds
+        """
+        self.sockets = sockets
+        self.timeout = timeout
+        self.retries = retries
+        self.stats = UdpProberStats()
+
+        self._wheel = _TimerWheel(tick=tick, max_timeout=timeout)
+        self._transports: Dict[int, List[asyncio.DatagramTransport]] = {}
+        self._next_transport = itertools.count()
+        self._pending: Dict[_Key, Tuple[asyncio.Future, int]] = {}
+        self._wheel_task: Optional[asyncio.Task] = None
+        self._guid = os.urandom(8)
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+
+        for family, local_addr in (
+            (socket.AF_INET, ("0.0.0.0", 0)),
+            (socket.AF_INET6, ("::", 0)),
+        ):
+            transports = []
+
+            for _ in range(self.sockets):
+                try:
+                    transport, _ = await loop.create_datagram_endpoint(
+                        lambda: _ProberProtocol(self),
+                        local_addr=local_addr,
+                        family=family,
+                    )
+                except OSError as e:
+                    logger.info(f"UDP prober could not open {family.name} socket: {e}")
+                    break
+
+                transports.append(transport)
+
+            self._transports[family] = transports
+
+        self._wheel_task = asyncio.create_task(self._run_wheel())
+
+    async def close(self):
+        if self._wheel_task is not None:
+            self._wheel_task.cancel()
+            await asyncio.gather(self._wheel_task, return_exceptions=True)
+
+        for transports in self._transports.values():
+            for transport in transports:
+                transport.close()
+
+        for future, _ in self._pending.values():
+            if not future.done():
+                future.cancel()
+
+        self._pending.clear()
+
+    async def __aenter__(self) -> "UdpProber":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def _run_wheel(self):
+        while True:
+            await asyncio.sleep(self._wheel.tick)
+
+            for key in self._wheel.advance():
+                pending = self._pending.pop(key, None)
+
+                if pending is None:
+                    continue
+
+                future, _ = pending
+
+                if not future.done():
+                    self.stats.timeouts += 1
+                    future.set_exception(TimeoutError("UDP probe timed out"))
+
+    def _on_datagram(self, data: bytes, addr: tuple):
+        if len(data) < 5:
+            self.stats.replies_unmatched += 1
+            return
+
+        if data[0] == RAKNET_UNCONNECTED_PONG and len(data) >= 9:
+            token = int.from_bytes(data[1:9], "big")
+        else:
+            token = int.from_bytes(data[1:5], "big")
+
+        pending = self._pending.pop(((addr[0], addr[1]), data[0], token), None)
+
+        if pending is None:
+            self.stats.replies_unmatched += 1
+            return
+
+        future, slot = pending
+        self._wheel.cancel(((addr[0], addr[1]), data[0], token), slot)
+
+        if not future.done():
+            self.stats.replies_matched += 1
+            future.set_result(data)
+
+    def _get_transport(self, ip: str) -> asyncio.DatagramTransport:
+        family = socket.AF_INET6 if ":" in ip else socket.AF_INET
+        transports = self._transports.get(family)
+
+        if not transports:
+            raise OSError(f"UDP prober has no {family.name} sockets")
+
+        return transports[next(self._next_transport) % len(transports)]
+
+    async def _request(
+        self,
+        ip: str,
+        port: int,
+        packet: bytes,
+        reply_type: int,
+        token: int,
+        retries: Optional[int] = None,
+    ) -> bytes:
+        """Sends a packet and waits for the reply which echoes the token, the
+        packet is resent up to the number of retries"""
+
+        retries = self.retries if retries is None else retries
+
+        key = ((ip, port), reply_type, token)
+
+        if key in self._pending:
+            raise RuntimeError(f"Duplicate UDP probe to {ip}:{port}")
+
+        transport = self._get_transport(ip)
+        loop = asyncio.get_running_loop()
+
+        for attempt in range(retries + 1):
+            future = loop.create_future()
+            slot = self._wheel.schedule(key, self.timeout)
+            self._pending[key] = (future, slot)
+
+            transport.sendto(packet, (ip, port))
+            self.stats.requests_sent += 1
+
+            try:
+                return await future
+            except TimeoutError:
+                if attempt == retries:
+                    raise
+            finally:
+                if self._pending.get(key, (None,))[0] is future:
+                    self._pending.pop(key)
+                    self._wheel.cancel(key, slot)
+
+    def _new_token(self, mask: int = 0xFFFFFFFFFFFFFFFF) -> int:
+        return int.from_bytes(os.urandom(8), "big") & mask
+
+    async def bedrock_status(
+        self,
+        ip: str,
+        port: int,
+        retries: Optional[int] = None,
+    ) -> BedrockStatusResponse:
+        """Sends a RakNet unconnected ping to a bedrock server
+
+        :param retries: Overrides the prober's number of retries"""
+
+        # the ping time field is echoed back in the pong, so it is used as a nonce
+        nonce = self._new_token()
+        packet = (
+            bytes([RAKNET_UNCONNECTED_PING])
+            + nonce.to_bytes(8, "big")
+            + RAKNET_MAGIC
+            + self._guid
+        )
+
+        started_at = time.perf_counter()
+
+        data = await self._request(
+            ip=ip,
+            port=port,
+            packet=packet,
+            reply_type=RAKNET_UNCONNECTED_PONG,
+            token=nonce,
+            retries=retries,
+        )
+
+        latency = (time.perf_counter() - started_at) * 1000
+
+        return BedrockServerStatus.parse_response(data, latency)
+
+    async def query(self, ip: str, port: int) -> QueryResponse:
+        """Runs a GameSpy4 full stat query against a java server"""
+
+        # minecraft only uses the lower 4 bits of each session id byte
+        session_id = self._new_token(0x0F0F0F0F)
+
+        handshake = await self._request(
+            ip=ip,
+            port=port,
+            packet=QUERY_MAGIC
+            + bytes([QUERY_TYPE_HANDSHAKE])
+            + struct.pack("!I", session_id),
+            reply_type=QUERY_TYPE_HANDSHAKE,
+            token=session_id,
+        )
+
+        challenge = int(handshake[5:].split(b"\x00", 1)[0])
+
+        data = await self._request(
+            ip=ip,
+            port=port,
+            packet=QUERY_MAGIC
+            + bytes([QUERY_TYPE_STAT])
+            + struct.pack("!I", session_id)
+            + struct.pack("!i", challenge)
+            + QUERY_PADDING,
+            reply_type=QUERY_TYPE_STAT,
+            token=session_id,
+        )
+
+        response = Connection()
+        response.receive(data[5:])
+
+        return QueryResponse.from_connection(response)
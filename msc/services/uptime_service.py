@@ -0,0 +1,251 @@
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import Float, Integer, Numeric, and_, cast, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from msc.config import config
+from msc.constants import UPTIME_WINDOW_DAYS
+from msc.models import Server, ServerHistory, ServerUptimeBucket
+
+logger = logging.getLogger(__name__)
+
+# the server columns kept up to date and the number of days each covers
+UPTIME_WINDOWS = {
+    "uptime_24h": 1,
+    "uptime_7d": 7,
+    "uptime": UPTIME_WINDOW_DAYS,
+}
+
+
+@contextmanager
+def _handle_db_errors():
+    """Handles database errors"""
+    try:
+        yield
+    except Exception as e:
+        # TODO: Raise a custom exception here
+        raise e
+
+
+def _get_window_start(now: datetime, days: int):
+    """Gets the first day bucket a window covers, the oldest bucket is counted
+    whole"""
+
+    return (now - timedelta(days=days)).date()
+
+
+def get_data_point_seconds(
+    created_at: datetime,
+    last_data_point_at: Optional[datetime],
+) -> int:
+    """Gets the seconds a data point stands for, the time since the server's
+    previous data point
+
+    Servers are polled less often the longer they're offline, so uptime weights
+    each data point by the time it covers rather than counting them. A server's
+    first data point covers the minimum poll interval, and no data point covers
+    more than the maximum poll interval, longer gaps are time nothing was polled"""
+
+    if last_data_point_at is None:
+        return config.poll_min_interval
+
+    seconds = (created_at - last_data_point_at).total_seconds()
+
+    return round(min(max(seconds, 0), config.poll_max_interval))
+
+
+def add_uptime_seconds(
+    db: Session,
+    data_points: Iterable[Tuple[UUID, bool, datetime, Optional[datetime]]],
+):
+    """Adds the seconds data points stand for to their servers' day buckets
+    without committing, with a single upsert
+
+    :param data_points: The server id, whether the server was online, the time
+        of each data point and the time of the server's previous data point"""
+
+    buckets: Dict[Tuple[UUID, datetime], list] = defaultdict(lambda: [0, 0])
+
+    for server_id, is_online, created_at, last_data_point_at in data_points:
+        seconds = get_data_point_seconds(created_at, last_data_point_at)
+
+        bucket_seconds = buckets[(server_id, created_at.date())]
+        bucket_seconds[0] += seconds if is_online else 0
+        bucket_seconds[1] += seconds
+
+    if not buckets:
+        return
+
+    table = ServerUptimeBucket.__table__
+    statement = pg_insert(table)
+
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=["server_id", "day"],
+            set_={
+                "online_seconds": table.c.online_seconds
+                + statement.excluded.online_seconds,
+                "total_seconds": table.c.total_seconds
+                + statement.excluded.total_seconds,
+            },
+        ),
+        [
+            {
+                "server_id": server_id,
+                "day": day,
+                "online_seconds": online_seconds,
+                "total_seconds": total_seconds,
+            }
+            for (server_id, day), (online_seconds, total_seconds) in buckets.items()
+        ],
+    )
+
+
+def rebuild_uptime_buckets(db: Session, server_id: Optional[UUID] = None):
+    """Recounts the day buckets of the uptime window from the history without
+    committing, for every server or only one, weighting each data point the same
+    way as get_data_point_seconds"""
+
+    since = _get_window_start(datetime.utcnow(), UPTIME_WINDOW_DAYS)
+
+    previous_created_at = func.lag(ServerHistory.created_at).over(
+        partition_by=ServerHistory.server_id,
+        order_by=ServerHistory.created_at,
+    )
+    seconds = func.coalesce(
+        func.least(
+            func.extract("epoch", ServerHistory.created_at - previous_created_at),
+            config.poll_max_interval,
+        ),
+        config.poll_min_interval,
+    )
+
+    # the data points just before the window are read for the time since them
+    lookback = datetime.combine(since, time()) - timedelta(
+        seconds=config.poll_max_interval
+    )
+
+    data_points = select(
+        ServerHistory.server_id,
+        ServerHistory.is_online,
+        ServerHistory.created_at,
+        cast(func.round(seconds), Integer).label("seconds"),
+    ).where(
+        ServerHistory.created_at >= lookback,
+    )
+
+    with _handle_db_errors():
+        delete_query = db.query(ServerUptimeBucket)
+
+        if server_id is not None:
+            delete_query = delete_query.filter(
+                ServerUptimeBucket.server_id == server_id
+            )
+            data_points = data_points.where(ServerHistory.server_id == server_id)
+
+        data_points = data_points.subquery()
+        day = cast(data_points.c.created_at, ServerUptimeBucket.day.type)
+
+        delete_query.delete(synchronize_session=False)
+
+        db.execute(
+            insert(ServerUptimeBucket).from_select(
+                ["server_id", "day", "online_seconds", "total_seconds"],
+                select(
+                    data_points.c.server_id,
+                    day,
+                    func.coalesce(
+                        func.sum(data_points.c.seconds).filter(
+                            data_points.c.is_online == True
+                        ),
+                        0,
+                    ),
+                    func.sum(data_points.c.seconds),
+                )
+                .where(
+                    data_points.c.created_at >= since,
+                )
+                .group_by(data_points.c.server_id, day),
+            )
+        )
+
+
+def refresh_uptimes(db: Session, server_id: Optional[UUID] = None) -> int:
+    """Updates the uptime of every server, or only one, from its day buckets with
+    a single UPDATE, and drops buckets older than the uptime window
+
+    :returns: The number of servers updated"""
+
+    now = datetime.utcnow()
+    oldest = _get_window_start(now, max(UPTIME_WINDOWS.values()))
+
+    def _get_uptime(days: int):
+        since = _get_window_start(now, days)
+
+        online = func.sum(ServerUptimeBucket.online_seconds).filter(
+            ServerUptimeBucket.day >= since
+        )
+        total = func.sum(ServerUptimeBucket.total_seconds).filter(
+            ServerUptimeBucket.day >= since
+        )
+
+        return cast(
+            func.coalesce(
+                func.round(cast(100.0 * online / func.nullif(total, 0), Numeric), 2),
+                0,
+            ),
+            Float,
+        )
+
+    windows = (
+        db.query(
+            Server.id.label("server_id"),
+            *(
+                _get_uptime(days).label(column)
+                for column, days in UPTIME_WINDOWS.items()
+            ),
+        )
+        .outerjoin(
+            ServerUptimeBucket,
+            and_(
+                ServerUptimeBucket.server_id == Server.id,
+                ServerUptimeBucket.day >= oldest,
+            ),
+        )
+        .filter(
+            Server.flagged_for_deletion == False,
+        )
+    )
+
+    if server_id is not None:
+        windows = windows.filter(Server.id == server_id)
+
+    windows = windows.group_by(Server.id).subquery()
+
+    server_table = Server.__table__
+
+    with _handle_db_errors():
+        servers_updated = db.execute(
+            update(server_table)
+            .where(
+                server_table.c.id == windows.c.server_id,
+            )
+            .values(
+                {column: windows.c[column] for column in UPTIME_WINDOWS.keys()},
+            )
+        ).rowcount
+
+        if server_id is None:
+            db.query(ServerUptimeBucket).filter(
+                ServerUptimeBucket.day < oldest,
+            ).delete(synchronize_session=False)
+
+        db.commit()
+
+    return servers_updated
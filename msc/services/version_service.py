@@ -1,10 +1,18 @@
+import bisect
 import logging
+import threading
+import time
+from collections import OrderedDict
 from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Set
 from uuid import UUID
 
 import boto3
 from sqlalchemy.orm import Session
 
+from msc.constants import VERSION_RESOLVER_CACHE_SIZE, VERSION_RESOLVER_TTL
 from msc.errors import BadRequest, InternalError, NotFound, Unauthorized
 from msc.models.minecraft_version import MinecraftVersion, VersionType
 
@@ -40,107 +48,174 @@ def get_versions(
     return versions
 
 
-def process_version_from_ping(db: Session, raw_version: str) -> str:
-    """Processes the raw version from the ping endpoint"""
+@dataclass
+class VersionResolverStats:
+    hits: int = 0
+    misses: int = 0
+    reloads: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+
+        if lookups == 0:
+            return 0.0
+
+        return self.hits / lookups
+
+
+class VersionResolver:
+    """Resolves raw ping versions against an in-memory copy of the minecraft
+    version table
+
+    Exact matches use a hash set, "x" wildcards use a sorted prefix index, and
+    resolved raw versions are memoized in a bounded LRU. The table is reloaded
+    after the versions are refreshed, or once the copy is older than the TTL"""
+
+    def __init__(
+        self,
+        cache_size: int = VERSION_RESOLVER_CACHE_SIZE,
+        ttl: int = VERSION_RESOLVER_TTL,
+    ):
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.stats = VersionResolverStats()
+
+        self._versions: Set[str] = set()
+        self._sorted_versions: List[str] = []
+        self._release_times: Dict[str, datetime] = {}
+        self._latest_release: Optional[str] = None
+        self._cache: OrderedDict = OrderedDict()
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def set_versions(self, versions: List[MinecraftVersion]):
+        """Replaces the in-memory versions and clears the resolved cache"""
+
+        with self._lock:
+            self._versions = {v.version for v in versions}
+            self._sorted_versions = sorted(self._versions)
+            self._release_times = {v.version: v.release_time for v in versions}
+            self._latest_release = next(
+                (
+                    v.version
+                    for v in versions
+                    if v.type == VersionType.RELEASE and v.is_latest
+                ),
+                None,
+            )
+            self._cache.clear()
+            self._loaded_at = time.monotonic()
+            self.stats.reloads += 1
 
-    # check if raw version matches
-    mc_version = (
-        db.query(MinecraftVersion)
-        .filter(
-            MinecraftVersion.version == raw_version,
+    def load(self, db: Session):
+        """Loads the version table in a single query"""
+
+        with _handle_db_errors():
+            self.set_versions(db.query(MinecraftVersion).all())
+
+    def invalidate(self):
+        """Makes the next lookup reload the version table"""
+
+        with self._lock:
+            self._loaded_at = None
+
+    def _is_stale(self) -> bool:
+        return self._loaded_at is None or (
+            time.monotonic() - self._loaded_at > self.ttl
         )
-        .one_or_none()
-    )
 
-    if mc_version is not None:
-        return raw_version
+    def resolve(self, db: Session, raw_version: str) -> Optional[str]:
+        """Resolves a raw ping version to a known minecraft version"""
 
-    processed_version = ""
+        if self._is_stale():
+            self.load(db)
 
-    # non-proxy version filtering
-    # normally "[xxx] [version]"
-    processed_components = raw_version.rsplit(" ", 1)
+        with self._lock:
+            if raw_version in self._cache:
+                self._cache.move_to_end(raw_version)
+                self.stats.hits += 1
+                return self._cache[raw_version]
 
-    if len(processed_components) > 1:
-        processed_version = processed_components[1]
+            self.stats.misses += 1
 
-    # check if processed version matches
-    mc_version = (
-        db.query(MinecraftVersion)
-        .filter(
-            MinecraftVersion.version == processed_version,
-        )
-        .one_or_none()
-    )
+            version = self._resolve(raw_version)
 
-    if mc_version is not None:
-        return processed_version
+            self._cache[raw_version] = version
 
-    logging.info("Starting proxy filtering")
-    logging.info(f"Raw version: {raw_version}")
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
 
-    # proxy version filtering
-    # normally "[xxx] [version_1[-,]version_2[-,]version_n]"
+            return version
 
-    # lets remove whitespace first
-    processed_version = raw_version.replace(" ", "")
+    def _get_latest_with_prefix(self, prefix: str) -> Optional[str]:
+        start = bisect.bisect_left(self._sorted_versions, prefix)
 
-    logging.info(f"Processed version - no WS: {processed_version}")
+        latest = None
 
-    # lets replace any "-" or "," with "#"
-    processed_version = processed_version.replace("-", "#")
-    processed_version = processed_version.replace(",", "#")
+        for version in self._sorted_versions[start:]:
+            if not version.startswith(prefix):
+                break
 
-    logging.info(f"Processed version #: {processed_version}")
+            if latest is None or self._release_times[version] > (
+                self._release_times[latest]
+            ):
+                latest = version
 
-    processed_components = processed_version.rsplit("#", 1)
+        return latest
 
-    if len(processed_components) > 1:
-        processed_version = processed_components[1]
+    def _resolve(self, raw_version: str) -> Optional[str]:
+        # check if raw version matches
+        if raw_version in self._versions:
+            return raw_version
 
-    logging.info(f"Processed version: {processed_version}")
+        processed_version = ""
 
-    # Example: "1.20.x"
-    if "x" in processed_version:
-        # "1.20.%"
-        version_like = f"{processed_version.split('x')[0]}%"
+        # non-proxy version filtering
+        # normally "[xxx] [version]"
+        processed_components = raw_version.rsplit(" ", 1)
 
-        mc_version = (
-            db.query(MinecraftVersion)
-            .filter(
-                MinecraftVersion.version.like(version_like),
-            )
-            .order_by(MinecraftVersion.release_time.desc())
-            .limit(1)
-            .one_or_none()
-        )
+        if len(processed_components) > 1:
+            processed_version = processed_components[1]
 
-        if mc_version is not None:
-            return mc_version.version
+        # check if processed version matches
+        if processed_version in self._versions:
+            return processed_version
 
-    else:
-        mc_version = (
-            db.query(MinecraftVersion)
-            .filter(
-                MinecraftVersion.version == processed_version,
-            )
-            .one_or_none()
-        )
+        # proxy version filtering
+        # normally "[xxx] [version_1[-,]version_2[-,]version_n]"
+
+        # lets remove whitespace first
+        processed_version = raw_version.replace(" ", "")
+
+        # lets replace any "-" or "," with "#"
+        processed_version = processed_version.replace("-", "#")
+        processed_version = processed_version.replace(",", "#")
+
+        processed_components = processed_version.rsplit("#", 1)
+
+        if len(processed_components) > 1:
+            processed_version = processed_components[1]
 
-        if mc_version is not None:
+        # Example: "1.20.x"
+        if "x" in processed_version:
+            # "1.20."
+            version = self._get_latest_with_prefix(processed_version.split("x")[0])
+
+            if version is not None:
+                return version
+
+        elif processed_version in self._versions:
             return processed_version
 
-    # no match - default to latest release version
-    latest_version = (
-        db.query(MinecraftVersion)
-        .filter(
-            MinecraftVersion.type == VersionType.RELEASE,
-            MinecraftVersion.is_latest == True,
-        )
-        .one_or_none()
-    )
+        # no match - default to latest release version
+        return self._latest_release
+
 
-    if latest_version is not None:
-        return latest_version.version
+version_resolver = VersionResolver()
+
+
+def process_version_from_ping(db: Session, raw_version: str) -> str:
+    """Processes the raw version from the ping endpoint"""
 
-    return None
+    return version_resolver.resolve(db=db, raw_version=raw_version)
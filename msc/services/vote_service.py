@@ -3,15 +3,40 @@ import logging
 from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from uuid import UUID
-
-from aiovotifier import VotifierClient
-from sqlalchemy import and_, func
+from typing import Dict, Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import (
+    DateTime,
+    Integer,
+    Text,
+    and_,
+    case,
+    exists,
+    func,
+    literal,
+    select,
+    true,
+)
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
-from msc.constants import SERVER_LIST_SERVICE_NAME
+from msc.constants import VOTE_COOLDOWN_HOURS
+from msc.database import get_db
 from msc.errors import BadRequest, NotFound, TooManyRequests, Unauthorized
-from msc.models import Server, ServerHistory, Vote
+from msc.models import (
+    Server,
+    ServerHistory,
+    ServerLeaderboard,
+    ServerVoteStats,
+    Vote,
+    VoteCooldown,
+    VotifierDelivery,
+)
+from msc.models.vote_cooldown import VoteCooldownKind
+from msc.models.votifier_delivery import VotifierDeliveryStatus
+from msc.services.votifier_service import send_vote, votifier_outbox_worker
+from msc.utils.time_utils import get_month_range, in_range
 
 logger = logging.getLogger(__name__)
 
@@ -33,69 +58,290 @@ def _handle_db_errors():
         raise e
 
 
+def _claim_vote_cooldown(
+    target,
+    kind: VoteCooldownKind,
+    value: str,
+    now: datetime,
+    is_free,
+    name: str,
+):
+    """Builds the upsert claiming a voter's cooldown for the server being voted
+    for. An unexpired cooldown is left as it is and nothing is returned, so only
+    one of two concurrent votes can claim it"""
+
+    insert_stmt = insert(VoteCooldown).from_select(
+        ["server_id", "kind", "value", "expires_at"],
+        select(
+            target.c.id,
+            literal(kind, VoteCooldown.kind.type),
+            literal(value, Text),
+            literal(now + timedelta(hours=VOTE_COOLDOWN_HOURS), DateTime),
+        ).where(is_free),
+    )
+
+    return (
+        insert_stmt.on_conflict_do_update(
+            index_elements=[
+                VoteCooldown.server_id,
+                VoteCooldown.kind,
+                VoteCooldown.value,
+            ],
+            set_={"expires_at": insert_stmt.excluded.expires_at},
+            where=VoteCooldown.expires_at <= now,
+        )
+        .returning(VoteCooldown.kind, VoteCooldown.expires_at)
+        .cte(name)
+    )
+
+
 def add_vote(
     db: Session,
     server_id: UUID,
     client_ip: UUID,
     minecraft_username: str,
 ):
-    """Adds a vote record to a server"""
+    """Adds a vote record to a server
 
-    server = (
-        db.query(Server)
+    The vote is added by a single statement which claims the voter's IP address
+    and Minecraft username cooldowns for the server and inserts the vote only if
+    both were claimed. The same statement counts the vote in the server's vote
+    counters and leaderboard entry, and queues votes for servers using votifier
+    for the votifier outbox worker"""
+
+    vote = Vote(
+        server_id=server_id,
+        client_ip_address=client_ip,
+        minecraft_username=minecraft_username,
+    )
+    vote.id = uuid4()
+
+    now = vote.created_at
+
+    target = (
+        select(Server.id, Server.use_votifier)
         .filter(
             Server.id == server_id,
             Server.flagged_for_deletion == False,
         )
-        .one_or_none()
+        .cte("target")
     )
 
-    if not server:
-        raise NotFound("Server not found")
+    def _is_cooling_down(kind: VoteCooldownKind, value: str):
+        return exists().where(
+            VoteCooldown.server_id == server_id,
+            VoteCooldown.kind == kind,
+            VoteCooldown.value == value,
+            VoteCooldown.expires_at > now,
+        )
 
-    # TODO: Test this works
-    if _has_username_voted_in_last_24_hours(
-        db=db,
-        server_id=server_id,
-        minecraft_username=minecraft_username,
-    ):
-        raise TooManyRequests(
-            "That Minecraft user has already voted for this server in the last 24 hours"
+    username_cooling_down = _is_cooling_down(
+        VoteCooldownKind.MINECRAFT_USERNAME,
+        minecraft_username,
+    )
+    ip_cooling_down = _is_cooling_down(VoteCooldownKind.IP_ADDRESS, client_ip)
+
+    # neither cooldown is claimed if either is already running, the claims only
+    # race with votes made at the same time
+    is_free = and_(~username_cooling_down, ~ip_cooling_down)
+
+    username_claim = _claim_vote_cooldown(
+        target=target,
+        kind=VoteCooldownKind.MINECRAFT_USERNAME,
+        value=minecraft_username,
+        now=now,
+        is_free=is_free,
+        name="username_claim",
+    )
+    ip_claim = _claim_vote_cooldown(
+        target=target,
+        kind=VoteCooldownKind.IP_ADDRESS,
+        value=client_ip,
+        now=now,
+        is_free=is_free,
+        name="ip_claim",
+    )
+
+    inserted = (
+        insert(Vote)
+        .from_select(
+            [
+                "id",
+                "server_id",
+                "client_ip_address",
+                "minecraft_username",
+                "created_at",
+            ],
+            select(
+                literal(vote.id, Vote.id.type),
+                target.c.id,
+                literal(client_ip, Text),
+                literal(minecraft_username, Text),
+                literal(now, DateTime),
+            ).where(
+                exists(select(username_claim.c.kind)),
+                exists(select(ip_claim.c.kind)),
+            ),
         )
+        .returning(Vote.id)
+        .cte("inserted")
+    )
 
-    if _has_ip_voted_in_last_24_hours(
-        db=db,
-        server_id=server_id,
-        client_ip=client_ip,
-    ):
-        raise TooManyRequests(
-            "You have already voted for this server in the last 24 hours"
+    # the vote is sent to the server's votifier by the outbox worker once the
+    # vote commits
+    queued = (
+        insert(VotifierDelivery)
+        .from_select(
+            [
+                "id",
+                "vote_id",
+                "server_id",
+                "minecraft_username",
+                "client_ip_address",
+                "status",
+                "attempts",
+                "next_attempt_at",
+                "created_at",
+            ],
+            select(
+                literal(uuid4(), VotifierDelivery.id.type),
+                inserted.c.id,
+                target.c.id,
+                literal(minecraft_username, Text),
+                literal(client_ip, Text),
+                literal(VotifierDeliveryStatus.PENDING, VotifierDelivery.status.type),
+                literal(0, Integer),
+                literal(now, DateTime),
+                literal(now, DateTime),
+            )
+            .select_from(inserted.join(target, true()))
+            .where(target.c.use_votifier == True),
         )
+        .cte("queued")
+    )
 
-    vote = Vote(
-        server_id=server_id,
-        client_ip_address=client_ip,
-        minecraft_username=minecraft_username,
+    month_start, _ = get_month_range(now)
+
+    counted = insert(ServerVoteStats).from_select(
+        [
+            "server_id",
+            "total_votes",
+            "votes_this_month",
+            "month_start",
+            "updated_at",
+        ],
+        select(
+            target.c.id,
+            literal(1, Integer),
+            literal(1, Integer),
+            literal(month_start, DateTime),
+            literal(now, DateTime),
+        ).select_from(inserted.join(target, true())),
     )
 
-    db.add(vote)
+    # the first vote of a month rolls the counter over, a vote dated in an
+    # earlier month than the counter's only counts towards the total
+    counted = counted.on_conflict_do_update(
+        index_elements=[ServerVoteStats.server_id],
+        set_={
+            "total_votes": ServerVoteStats.total_votes + 1,
+            "votes_this_month": case(
+                (counted.excluded.month_start > ServerVoteStats.month_start, 1),
+                (
+                    counted.excluded.month_start == ServerVoteStats.month_start,
+                    ServerVoteStats.votes_this_month + 1,
+                ),
+                else_=ServerVoteStats.votes_this_month,
+            ),
+            "month_start": func.greatest(
+                ServerVoteStats.month_start,
+                counted.excluded.month_start,
+            ),
+            "updated_at": counted.excluded.updated_at,
+        },
+    )
+    counted = counted.returning(
+        ServerVoteStats.server_id,
+        ServerVoteStats.month_start,
+        ServerVoteStats.votes_this_month,
+    ).cte("counted")
+
+    # the leaderboard entry follows the counter, votes for a server wait on its
+    # counter so the entries are written in the same order
+    ranked = insert(ServerLeaderboard).from_select(
+        ["server_id", "month_start", "votes_this_month", "updated_at"],
+        select(
+            counted.c.server_id,
+            counted.c.month_start,
+            counted.c.votes_this_month,
+            literal(now, DateTime),
+        ),
+    )
+    ranked = ranked.on_conflict_do_update(
+        index_elements=[ServerLeaderboard.server_id],
+        set_={
+            "month_start": ranked.excluded.month_start,
+            "votes_this_month": ranked.excluded.votes_this_month,
+            "updated_at": ranked.excluded.updated_at,
+        },
+    ).cte("ranked")
 
     with _handle_db_errors():
-        db.commit()
+        (
+            use_votifier,
+            username_was_cooling_down,
+            ip_was_cooling_down,
+            username_claimed,
+            ip_claimed,
+            is_inserted,
+        ) = db.execute(
+            select(
+                select(target.c.use_votifier).scalar_subquery(),
+                username_cooling_down,
+                ip_cooling_down,
+                exists(select(username_claim.c.kind)),
+                exists(select(ip_claim.c.kind)),
+                exists(select(inserted.c.id)),
+            ).add_cte(queued, ranked)
+        ).one()
+
+    if use_votifier is None:
+        raise NotFound("Server not found")
 
-    # TODO: Test this works
-    if server.use_votifier:
-        try:
-            asyncio.run(
-                _send_vote(
-                    server=server,
-                    minecraft_username=minecraft_username,
-                    client_ip=client_ip,
-                )
+    if not is_inserted:
+        # a concurrent vote beat this one to one of the cooldowns, the other
+        # cooldown is released as no vote was made
+        for kind, value, claimed in (
+            (VoteCooldownKind.MINECRAFT_USERNAME, minecraft_username, username_claimed),
+            (VoteCooldownKind.IP_ADDRESS, client_ip, ip_claimed),
+        ):
+            if claimed:
+                db.query(VoteCooldown).filter(
+                    VoteCooldown.server_id == server_id,
+                    VoteCooldown.kind == kind,
+                    VoteCooldown.value == value,
+                ).delete()
+
+        with _handle_db_errors():
+            db.commit()
+
+        # TODO: Test this works
+        if username_was_cooling_down or (
+            not ip_was_cooling_down and not username_claimed
+        ):
+            raise TooManyRequests(
+                "That Minecraft user has already voted for this server in the last 24 hours"
             )
-        except Exception as e:
-            logger.error("Unhandled error sending vote: ", e)
-            pass
+
+        raise TooManyRequests(
+            "You have already voted for this server in the last 24 hours"
+        )
+
+    with _handle_db_errors():
+        db.commit()
+
+    if use_votifier:
+        votifier_outbox_worker.notify()
 
     return vote
 
@@ -118,24 +364,6 @@ def _has_ip_voted_in_last_24_hours(
     return user_votes_24_hours > 0
 
 
-def _has_username_voted_in_last_24_hours(
-    db: Session,
-    server_id: UUID,
-    minecraft_username: str,
-):
-    """Checks if the requesting client has voted for the server in the last 24 hours"""
-
-    user_votes_24_hours = (
-        db.query(Vote)
-        .filter(Vote.server_id == server_id)
-        .filter(Vote.minecraft_username == minecraft_username)
-        .filter(Vote.created_at > datetime.utcnow() - timedelta(hours=24))
-        .count()
-    )
-
-    return user_votes_24_hours > 0
-
-
 def check_vote_info(
     db: Session,
     server_id: UUID,
@@ -157,25 +385,44 @@ def check_vote_info(
         )
 
     last_vote = (
-        db.query(Vote)
+        db.query(Vote.created_at)
         .filter(Vote.server_id == server_id)
         .filter(Vote.client_ip_address == client_ip)
         .order_by(Vote.created_at.desc())
-        .first()
+        .limit(1)
+        .scalar()
     )
 
     time_left_ms = int(
-        (last_vote.created_at + timedelta(hours=24) - datetime.utcnow()).total_seconds()
-        * 1000
+        (last_vote + timedelta(hours=24) - datetime.utcnow()).total_seconds() * 1000
     )
 
     return CheckVoteInfo(
         has_voted=True,
-        last_vote=last_vote.created_at,
+        last_vote=last_vote,
         time_left_ms=time_left_ms,
     )
 
 
+def get_vote_stats_columns(now: Optional[datetime] = None):
+    """Gets the total votes and votes this month columns of a query outer joined
+    to the server vote counters. A counter of an earlier month counts as no votes
+    this month, until it's rolled over"""
+
+    month_start, _ = get_month_range(now or datetime.utcnow())
+
+    total_votes = func.coalesce(ServerVoteStats.total_votes, 0)
+    votes_this_month = case(
+        (
+            ServerVoteStats.month_start == month_start,
+            ServerVoteStats.votes_this_month,
+        ),
+        else_=0,
+    )
+
+    return total_votes, votes_this_month
+
+
 def get_total_votes(
     db: Session,
     server: Server,
@@ -183,14 +430,14 @@ def get_total_votes(
     """Gets the total number of votes for a server"""
 
     total_votes = (
-        db.query(Vote)
+        db.query(ServerVoteStats.total_votes)
         .filter(
-            Vote.server_id == server.id,
+            ServerVoteStats.server_id == server.id,
         )
-        .count()
+        .scalar()
     )
 
-    return total_votes
+    return total_votes or 0
 
 
 def get_votes_this_month(
@@ -199,24 +446,187 @@ def get_votes_this_month(
 ):
     """Gets the total number of votes for a server this month"""
 
-    # Get the current month and year
+    # Get the current month
     now = datetime.utcnow()
-    month = now.month
-    year = now.year
+    month_start, _ = get_month_range(now)
 
     votes_this_month = (
-        db.query(Vote)
+        db.query(ServerVoteStats.votes_this_month)
         .filter(
-            Vote.server_id == server.id,
-            and_(
-                func.extract("month", Vote.created_at) == month,
-                func.extract("year", Vote.created_at) == year,
-            ),
+            ServerVoteStats.server_id == server.id,
+            ServerVoteStats.month_start == month_start,
         )
-        .count()
+        .scalar()
+    )
+
+    return votes_this_month or 0
+
+
+@dataclass
+class VoteCounts:
+    total_votes: int
+    votes_this_month: int
+
+
+def get_vote_counts(
+    db: Session,
+    now: Optional[datetime] = None,
+) -> Dict[UUID, VoteCounts]:
+    """Gets the total votes and votes this month of every server with vote
+    counters"""
+
+    total_votes, votes_this_month = get_vote_stats_columns(now=now)
+
+    with _handle_db_errors():
+        rows = db.query(
+            ServerVoteStats.server_id,
+            total_votes,
+            votes_this_month,
+        ).all()
+
+    return {
+        server_id: VoteCounts(
+            total_votes=total_votes,
+            votes_this_month=votes_this_month,
+        )
+        for server_id, total_votes, votes_this_month in rows
+    }
+
+
+def get_raw_vote_counts(
+    db: Session,
+    now: Optional[datetime] = None,
+    server_id: Optional[UUID] = None,
+) -> Dict[UUID, VoteCounts]:
+    """Counts the total votes and votes this month of every server with votes, or
+    of a single server, from the vote table in a single grouped query"""
+
+    # Get the current month
+    now = now or datetime.utcnow()
+
+    # only the server id and created at columns are read, so the counts can be
+    # taken from the vote index alone
+    query = db.query(
+        Vote.server_id,
+        func.count(),
+        func.count().filter(in_range(Vote.created_at, *get_month_range(now))),
     )
 
-    return votes_this_month
+    if server_id is not None:
+        query = query.filter(Vote.server_id == server_id)
+
+    with _handle_db_errors():
+        rows = query.group_by(Vote.server_id).all()
+
+    return {
+        server_id: VoteCounts(
+            total_votes=total_votes,
+            votes_this_month=votes_this_month,
+        )
+        for server_id, total_votes, votes_this_month in rows
+    }
+
+
+def reconcile_server_vote_stats(db: Session, now: Optional[datetime] = None) -> int:
+    """Rolls the vote counters of earlier months over, then verifies every
+    server's vote counters against the vote table and corrects any which drifted
+
+    :returns: The number of servers whose vote counters were corrected"""
+
+    now = now or datetime.utcnow()
+    month_start, _ = get_month_range(now)
+    no_votes = VoteCounts(total_votes=0, votes_this_month=0)
+
+    with _handle_db_errors():
+        db.query(ServerVoteStats).filter(
+            ServerVoteStats.month_start < month_start,
+        ).update(
+            {
+                ServerVoteStats.votes_this_month: 0,
+                ServerVoteStats.month_start: month_start,
+                ServerVoteStats.updated_at: now,
+            },
+            synchronize_session=False,
+        )
+
+        db.commit()
+
+    raw_counts = get_raw_vote_counts(db=db, now=now)
+    counts = get_vote_counts(db=db, now=now)
+
+    drifted = [
+        server_id
+        for server_id in raw_counts.keys() | counts.keys()
+        if raw_counts.get(server_id, no_votes) != counts.get(server_id, no_votes)
+    ]
+
+    for server_id in drifted:
+        with _handle_db_errors():
+            # votes for the server wait on the lock until the recount commits, a
+            # vote made between the counts above only causes a needless recount
+            db.query(ServerVoteStats.server_id).filter(
+                ServerVoteStats.server_id == server_id,
+            ).with_for_update().one_or_none()
+
+            server_counts = get_raw_vote_counts(
+                db=db,
+                now=now,
+                server_id=server_id,
+            ).get(server_id, no_votes)
+
+            insert_stmt = insert(ServerVoteStats).from_select(
+                [
+                    "server_id",
+                    "total_votes",
+                    "votes_this_month",
+                    "month_start",
+                    "updated_at",
+                ],
+                select(
+                    Server.id,
+                    literal(server_counts.total_votes, Integer),
+                    literal(server_counts.votes_this_month, Integer),
+                    literal(month_start, DateTime),
+                    literal(now, DateTime),
+                ).where(Server.id == server_id),
+            )
+
+            db.execute(
+                insert_stmt.on_conflict_do_update(
+                    index_elements=[ServerVoteStats.server_id],
+                    set_={
+                        "total_votes": insert_stmt.excluded.total_votes,
+                        "votes_this_month": insert_stmt.excluded.votes_this_month,
+                        "month_start": insert_stmt.excluded.month_start,
+                        "updated_at": insert_stmt.excluded.updated_at,
+                    },
+                )
+            )
+
+            db.commit()
+
+        logger.warning(
+            f"Corrected the vote counters of server {server_id} from "
+            f"{counts.get(server_id, no_votes)} to {server_counts}"
+        )
+
+    return len(drifted)
+
+
+def reconcile_server_vote_stats_task():
+    """Rolls the vote counters over and corrects any which drifted"""
+
+    # create a new db session for this job
+    db: Session = next(get_db())
+
+    try:
+        corrected = reconcile_server_vote_stats(db=db)
+
+        logger.info(f"Corrected the vote counters of {corrected} servers")
+    except Exception as e:
+        logger.error(f"Error reconciling vote counters: {e}")
+    finally:
+        db.close()
 
 
 # TODO: Test this
@@ -226,20 +636,21 @@ def get_new_votes(
 ):
     """Gets any new votes since the last datapoint created"""
 
-    # Get the last data point
-    last_data_point = (
-        db.query(ServerHistory)
+    # Get the time of the last data point
+    last_data_point_at = (
+        db.query(ServerHistory.created_at)
         .filter(
             ServerHistory.server_id == server.id,
         )
         .order_by(
             ServerHistory.created_at.desc(),
         )
-        .first()
+        .limit(1)
+        .scalar()
     )
 
     # if no data points exist we should return all votes
-    if not last_data_point:
+    if not last_data_point_at:
         return (
             db.query(Vote)
             .filter(
@@ -253,7 +664,7 @@ def get_new_votes(
         db.query(Vote)
         .filter(
             Vote.server_id == server.id,
-            Vote.created_at > last_data_point.created_at,
+            Vote.created_at > last_data_point_at,
         )
         .count()
     )
@@ -261,6 +672,43 @@ def get_new_votes(
     return new_votes
 
 
+def prune_vote_cooldowns(db: Session, now: Optional[datetime] = None) -> int:
+    """Deletes expired vote cooldowns
+
+    :returns: The number of cooldowns deleted"""
+
+    now = now or datetime.utcnow()
+
+    with _handle_db_errors():
+        deleted = (
+            db.query(VoteCooldown)
+            .filter(
+                VoteCooldown.expires_at <= now,
+            )
+            .delete(synchronize_session=False)
+        )
+
+        db.commit()
+
+    return deleted
+
+
+def prune_vote_cooldowns_task():
+    """Deletes expired vote cooldowns"""
+
+    # create a new db session for this job
+    db: Session = next(get_db())
+
+    try:
+        pruned = prune_vote_cooldowns(db=db)
+
+        logger.info(f"Pruned {pruned} vote cooldowns")
+    except Exception as e:
+        logger.error(f"Error pruning vote cooldowns: {e}")
+    finally:
+        db.close()
+
+
 def test_votifier(
     db: Session,
     user_id: UUID,
@@ -290,10 +738,13 @@ def test_votifier(
 
     try:
         asyncio.run(
-            _send_vote(
-                server,
-                minecraft_username,
-                client_ip,
+            send_vote(
+                server_id=server.id,
+                host=server.votifier_ip_address,
+                port=server.votifier_port,
+                key=server.votifier_key,
+                minecraft_username=minecraft_username,
+                client_ip=client_ip,
             )
         )
     except Exception as e:
@@ -301,25 +752,3 @@ def test_votifier(
         raise e
 
     return "success"
-
-
-async def _send_vote(
-    server: Server,
-    minecraft_username: str,
-    client_ip: str,
-):
-    """Sends a vote to the votifier server"""
-
-    client = VotifierClient(
-        host=server.votifier_ip_address,
-        port=server.votifier_port,
-        service_name=SERVER_LIST_SERVICE_NAME,
-        secret=server.votifier_key,
-    )
-
-    response = await client.vote(
-        username=minecraft_username,
-        user_address=client_ip,
-    )
-
-    return response
@@ -0,0 +1,508 @@
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from aiovotifier import VotifierClient
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.orm import Session
+
+from msc.constants import (
+    SERVER_LIST_SERVICE_NAME,
+    VOTIFIER_BASE_BACKOFF,
+    VOTIFIER_BATCH_TIMEOUT,
+    VOTIFIER_CLAIM_LEASE,
+    VOTIFIER_CLIENT_CACHE_SIZE,
+    VOTIFIER_CONCURRENCY,
+    VOTIFIER_DELIVERY_RETENTION_DAYS,
+    VOTIFIER_HOST_CONCURRENCY,
+    VOTIFIER_LAG_BUCKETS_MS,
+    VOTIFIER_MAX_ATTEMPTS,
+    VOTIFIER_MAX_BACKOFF,
+    VOTIFIER_OUTBOX_BATCH_SIZE,
+    VOTIFIER_OUTBOX_TICK,
+    VOTIFIER_TIMEOUT,
+)
+from msc.database import get_db
+from msc.models import Server, VotifierDelivery
+from msc.models.votifier_delivery import VotifierDeliveryStatus
+from msc.services.poll_metrics_service import Histogram
+
+logger = logging.getLogger(__name__)
+
+# caps the backoff exponent, the backoff is clamped to the maximum long before this
+MAX_BACKOFF_EXPONENT = 32
+
+
+@contextmanager
+def _handle_db_errors():
+    """Handles database errors"""
+    try:
+        yield
+    except Exception as e:
+        # TODO: Raise a custom exception here
+        raise e
+
+
+@lru_cache(maxsize=VOTIFIER_CLIENT_CACHE_SIZE)
+def get_votifier_client(
+    server_id: UUID,
+    host: str,
+    port: int,
+    key: str,
+) -> VotifierClient:
+    """Gets the votifier client of a server, the client parses the server's public
+    key once when it is created so it is cached until the votifier settings
+    change"""
+
+    return VotifierClient(
+        host=host,
+        port=port,
+        service_name=SERVER_LIST_SERVICE_NAME,
+        secret=key,
+    )
+
+
+async def send_vote(
+    server_id: UUID,
+    host: str,
+    port: int,
+    key: str,
+    minecraft_username: str,
+    client_ip: str,
+):
+    """Sends a vote to a votifier server
+
+    :raises Exception: If the vote is not accepted in time"""
+
+    client = get_votifier_client(
+        server_id=server_id,
+        host=host,
+        port=port,
+        key=key,
+    )
+
+    return await asyncio.wait_for(
+        client.vote(
+            username=minecraft_username,
+            user_address=client_ip,
+        ),
+        timeout=VOTIFIER_TIMEOUT,
+    )
+
+
+@dataclass
+class VotifierDeliveryTarget:
+    """A claimed delivery and the votifier settings of its server"""
+
+    id: UUID
+    server_id: UUID
+    minecraft_username: str
+    client_ip_address: str
+    created_at: datetime
+    attempts: int
+    use_votifier: bool
+    host: Optional[str]
+    port: Optional[int]
+    key: Optional[str]
+
+
+def get_delivery_backoff(attempts: int) -> int:
+    """Works out how many seconds a failed delivery waits before it is retried,
+    doubling for every attempt"""
+
+    exponent = min(max(attempts - 1, 0), MAX_BACKOFF_EXPONENT)
+
+    return min(VOTIFIER_BASE_BACKOFF * 2**exponent, VOTIFIER_MAX_BACKOFF)
+
+
+def _is_exhausted(target: VotifierDeliveryTarget) -> bool:
+    """Whether a failed delivery is given up on rather than retried"""
+
+    return target.attempts >= VOTIFIER_MAX_ATTEMPTS or not target.use_votifier
+
+
+def claim_votifier_deliveries(
+    db: Session,
+    limit: int = VOTIFIER_OUTBOX_BATCH_SIZE,
+    now: Optional[datetime] = None,
+) -> List[VotifierDeliveryTarget]:
+    """Claims the pending deliveries which are due, oldest first. Claimed
+    deliveries are hidden from other workers for the claim lease, so they are
+    retried if the worker dies before saving their results"""
+
+    now = now or datetime.utcnow()
+
+    with _handle_db_errors():
+        rows = (
+            db.query(
+                VotifierDelivery,
+                Server.use_votifier,
+                Server.votifier_ip_address,
+                Server.votifier_port,
+                Server.votifier_key,
+            )
+            .join(Server, Server.id == VotifierDelivery.server_id)
+            .filter(
+                VotifierDelivery.status == VotifierDeliveryStatus.PENDING,
+                VotifierDelivery.next_attempt_at <= now,
+            )
+            .order_by(VotifierDelivery.next_attempt_at)
+            .limit(limit)
+            .with_for_update(of=VotifierDelivery, skip_locked=True)
+            .all()
+        )
+
+        targets = []
+
+        for delivery, use_votifier, host, port, key in rows:
+            delivery.attempts += 1
+            delivery.next_attempt_at = now + timedelta(seconds=VOTIFIER_CLAIM_LEASE)
+
+            targets.append(
+                VotifierDeliveryTarget(
+                    id=delivery.id,
+                    server_id=delivery.server_id,
+                    minecraft_username=delivery.minecraft_username,
+                    client_ip_address=delivery.client_ip_address,
+                    created_at=delivery.created_at,
+                    attempts=delivery.attempts,
+                    use_votifier=use_votifier,
+                    host=host,
+                    port=port,
+                    key=key,
+                )
+            )
+
+        db.commit()
+
+    return targets
+
+
+def save_delivery_results(
+    db: Session,
+    results: List[Tuple[VotifierDeliveryTarget, Optional[str]]],
+    now: Optional[datetime] = None,
+):
+    """Saves the results of claimed deliveries, failed deliveries are retried with
+    backoff until they run out of attempts
+
+    :param results: Each delivery and the error it failed with, None if it was
+        delivered"""
+
+    if not results:
+        return
+
+    now = now or datetime.utcnow()
+    rows = []
+
+    for target, error in results:
+        if error is None:
+            status = VotifierDeliveryStatus.DELIVERED
+            next_attempt_at = now
+        elif _is_exhausted(target):
+            status = VotifierDeliveryStatus.FAILED
+            next_attempt_at = now
+        else:
+            status = VotifierDeliveryStatus.PENDING
+            next_attempt_at = now + timedelta(
+                seconds=get_delivery_backoff(target.attempts)
+            )
+
+        rows.append(
+            {
+                "_id": target.id,
+                "status": status,
+                "next_attempt_at": next_attempt_at,
+                "last_error": error,
+                "delivered_at": now if error is None else None,
+            }
+        )
+
+    delivery_table = VotifierDelivery.__table__
+
+    with _handle_db_errors():
+        db.execute(
+            update(delivery_table).where(
+                delivery_table.c.id == bindparam("_id"),
+            ),
+            rows,
+        )
+
+        db.commit()
+
+
+@dataclass
+class VotifierOutboxStats:
+    pending: int
+    failed: int
+    oldest_pending_at: Optional[datetime]
+    metrics: dict
+
+    def get_lag(self, now: datetime) -> float:
+        """The seconds the oldest pending delivery has been waiting"""
+
+        if self.oldest_pending_at is None:
+            return 0.0
+
+        return (now - self.oldest_pending_at).total_seconds()
+
+
+def get_votifier_outbox_stats(db: Session) -> VotifierOutboxStats:
+    """Gets the size and lag of the outbox, along with the delivery metrics of
+    this process's worker"""
+
+    with _handle_db_errors():
+        counts = dict(
+            db.query(VotifierDelivery.status, func.count())
+            .filter(
+                VotifierDelivery.status != VotifierDeliveryStatus.DELIVERED,
+            )
+            .group_by(VotifierDelivery.status)
+            .all()
+        )
+
+        oldest_pending_at = (
+            db.query(func.min(VotifierDelivery.created_at))
+            .filter(
+                VotifierDelivery.status == VotifierDeliveryStatus.PENDING,
+            )
+            .scalar()
+        )
+
+    return VotifierOutboxStats(
+        pending=counts.get(VotifierDeliveryStatus.PENDING, 0),
+        failed=counts.get(VotifierDeliveryStatus.FAILED, 0),
+        oldest_pending_at=oldest_pending_at,
+        metrics=votifier_outbox_worker.metrics.summary(),
+    )
+
+
+def prune_votifier_deliveries(db: Session, now: Optional[datetime] = None) -> int:
+    """Deletes delivered and failed deliveries past their retention period
+
+    :returns: The number of deliveries deleted"""
+
+    now = now or datetime.utcnow()
+
+    with _handle_db_errors():
+        deleted = (
+            db.query(VotifierDelivery)
+            .filter(
+                VotifierDelivery.status != VotifierDeliveryStatus.PENDING,
+                VotifierDelivery.created_at
+                < now - timedelta(days=VOTIFIER_DELIVERY_RETENTION_DAYS),
+            )
+            .delete(synchronize_session=False)
+        )
+
+        db.commit()
+
+    return deleted
+
+
+def prune_votifier_deliveries_task():
+    """Deletes old delivered and failed deliveries"""
+
+    # create a new db session for this job
+    db: Session = next(get_db())
+
+    try:
+        pruned = prune_votifier_deliveries(db=db)
+
+        logger.info(f"Pruned {pruned} votifier deliveries")
+    except Exception as e:
+        logger.error(f"Error pruning votifier deliveries: {e}")
+    finally:
+        db.close()
+
+
+class VotifierMetrics:
+    """Delivery counters and a histogram of the time from a vote to its delivery,
+    safe to read while the worker records them"""
+
+    def __init__(self):
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+        self.lag = Histogram(bounds=VOTIFIER_LAG_BUCKETS_MS)
+
+        self._lock = threading.Lock()
+
+    def record_results(
+        self,
+        results: List[Tuple[VotifierDeliveryTarget, Optional[str]]],
+        now: datetime,
+    ):
+        with self._lock:
+            for target, error in results:
+                if error is None:
+                    self.delivered += 1
+                    self.lag.observe(
+                        (now - target.created_at).total_seconds() * 1000,
+                    )
+                elif _is_exhausted(target):
+                    self.failed += 1
+                else:
+                    self.retried += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "delivered": self.delivered,
+                "retried": self.retried,
+                "failed": self.failed,
+                "lag": {
+                    "count": self.lag.count,
+                    "mean_ms": round(self.lag.mean, 2),
+                    "p50_ms": self.lag.percentile(50),
+                    "p95_ms": self.lag.percentile(95),
+                    "p99_ms": self.lag.percentile(99),
+                    "max_ms": round(self.lag.max, 2),
+                },
+            }
+
+
+class VotifierOutboxWorker:
+    """Drains the votifier outbox from a long-lived event loop in a background
+    thread
+
+    Deliveries are claimed in batches and sent concurrently, with a limit on the
+    deliveries in flight to each votifier host. The worker checks the outbox
+    every tick, or as soon as it is notified of a new vote"""
+
+    def __init__(
+        self,
+        batch_size: int = VOTIFIER_OUTBOX_BATCH_SIZE,
+        tick: float = VOTIFIER_OUTBOX_TICK,
+        concurrency: int = VOTIFIER_CONCURRENCY,
+        host_concurrency: int = VOTIFIER_HOST_CONCURRENCY,
+        batch_timeout: float = VOTIFIER_BATCH_TIMEOUT,
+    ):
+        """
+        :param batch_size: The maximum number of deliveries claimed at once
+        :param tick: The time in seconds an idle worker waits before checking the
+            outbox again
+        :param concurrency: The maximum number of deliveries in flight
+        :param host_concurrency: The maximum number of deliveries in flight to a
+            single votifier host
+        :param batch_timeout: The time in seconds a batch can take, deliveries
+            still in flight are cancelled and retried later
+        """
+        self.batch_size = batch_size
+        self.tick = tick
+        self.concurrency = concurrency
+        self.host_concurrency = host_concurrency
+        self.batch_timeout = batch_timeout
+        self.metrics = VotifierMetrics()
+
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+
+            self._thread = threading.Thread(
+                target=self._run,
+                name="votifier-outbox",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def notify(self):
+        """Wakes the worker to deliver a new vote, never blocks"""
+
+        self._wake.set()
+
+    def _run(self):
+        asyncio.run(self._loop())
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        db: Session = next(get_db())
+
+        try:
+            while True:
+                try:
+                    claimed = await self.drain(db=db)
+                except Exception as e:
+                    logger.error(f"Error draining the votifier outbox: {e}")
+                    db.rollback()
+                    claimed = 0
+
+                # a full batch means more deliveries may be due
+                if claimed < self.batch_size:
+                    await loop.run_in_executor(None, self._wake.wait, self.tick)
+                    self._wake.clear()
+        finally:
+            db.close()
+
+    async def drain(self, db: Session) -> int:
+        """Claims a batch of due deliveries, sends them and saves their results
+
+        :returns: The number of deliveries claimed"""
+
+        targets = claim_votifier_deliveries(db=db, limit=self.batch_size)
+
+        if not targets:
+            return 0
+
+        concurrency = asyncio.Semaphore(self.concurrency)
+        host_semaphores: Dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.host_concurrency)
+        )
+
+        async def _deliver(target: VotifierDeliveryTarget) -> Optional[str]:
+            if not target.use_votifier or not target.host or not target.port:
+                return "Votifier is not enabled for this server"
+
+            async with host_semaphores[target.host.lower()], concurrency:
+                try:
+                    await send_vote(
+                        server_id=target.server_id,
+                        host=target.host,
+                        port=target.port,
+                        key=target.key,
+                        minecraft_username=target.minecraft_username,
+                        client_ip=target.client_ip_address,
+                    )
+                except Exception as e:
+                    return f"{type(e).__name__}: {e}"
+
+            return None
+
+        tasks = [asyncio.ensure_future(_deliver(target)) for target in targets]
+
+        _, pending = await asyncio.wait(tasks, timeout=self.batch_timeout)
+
+        for task in pending:
+            task.cancel()
+
+        results = [
+            (
+                target,
+                "Timed out waiting for the votifier host"
+                if task in pending
+                else task.result(),
+            )
+            for target, task in zip(targets, tasks)
+        ]
+
+        now = datetime.utcnow()
+
+        save_delivery_results(db=db, results=results, now=now)
+        self.metrics.record_results(results=results, now=now)
+
+        return len(targets)
+
+
+votifier_outbox_worker = VotifierOutboxWorker()
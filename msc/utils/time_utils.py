@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+from typing import Tuple
+
+from sqlalchemy import and_
+
+
+def get_month_start(value: datetime, months: int = 0) -> datetime:
+    """Gets the start of the month a number of months after the month of a time"""
+
+    month = value.year * 12 + value.month - 1 + months
+
+    return datetime(month // 12, month % 12 + 1, 1)
+
+
+def get_month_range(value: datetime) -> Tuple[datetime, datetime]:
+    """Gets the start and end of the month of a time, for half open created_at
+    ranges which the monthly partitions can be pruned by"""
+
+    return get_month_start(value), get_month_start(value, months=1)
+
+
+def get_day_range(value: datetime) -> Tuple[datetime, datetime]:
+    """Gets the start and end of the day of a time"""
+
+    day = datetime(value.year, value.month, value.day)
+
+    return day, day + timedelta(days=1)
+
+
+def in_range(column, start: datetime, end: datetime):
+    """Builds the half open range predicate start <= column < end
+
+    Comparing the column itself, rather than parts extracted from it, lets the
+    indexes on the column and the partition bounds be used"""
+
+    return and_(column >= start, column < end)
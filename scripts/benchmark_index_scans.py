@@ -0,0 +1,308 @@
+"""
+Benchmarks the per-server vote and history lookups on a seeded dataset
+
+Servers are added to the configured database under a benchmark user, with votes
+and hourly history data points reaching back over the last months, then the
+tables are vacuumed so their visibility maps are current. Each lookup is run
+through its service function and the statements it executes are explained,
+reporting how each table was scanned, the heap fetches and the mean latency.
+A lookup answered from an index alone shows an Index Only Scan with no heap
+fetches. The benchmark user is deleted afterwards, along with its servers and
+their votes and data points
+"""
+
+import argparse
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, List
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+CLIENT_IP = "10.1.0.1"
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    scans: str
+    heap_fetches: int
+    shared_buffers: int
+    mean_ms: float
+
+
+@dataclass
+class BenchmarkCase:
+    name: str
+    run: Callable
+
+
+def _get_cases(server) -> List[BenchmarkCase]:
+    from msc.services import poll_writer_service, vote_service
+
+    return [
+        BenchmarkCase(
+            name="vote_service.get_raw_vote_counts",
+            run=lambda db: vote_service.get_raw_vote_counts(
+                db=db,
+                server_id=server.id,
+            ),
+        ),
+        BenchmarkCase(
+            name="vote_service.get_new_votes",
+            run=lambda db: vote_service.get_new_votes(db=db, server=server),
+        ),
+        BenchmarkCase(
+            name="vote_service.check_vote_info",
+            run=lambda db: vote_service.check_vote_info(
+                db=db,
+                server_id=server.id,
+                client_ip=CLIENT_IP,
+            ),
+        ),
+        BenchmarkCase(
+            name="poll_writer_service._get_last_data_points",
+            run=lambda db: poll_writer_service._get_last_data_points(
+                db=db,
+                server_ids=[server.id],
+            ),
+        ),
+    ]
+
+
+def _seed(db, user_id, servers: int, votes: int, vote_days: int, hours: int):
+    """Adds the benchmark servers, their votes and their data points"""
+
+    from sqlalchemy import text
+
+    from msc.models import Server
+
+    db.add_all(
+        [
+            Server(
+                user_id=user_id,
+                name=f"Index Scan Benchmark Server {i}",
+                description="Index scan benchmark server",
+                country_code="GB",
+            )
+            for i in range(servers)
+        ]
+    )
+    db.flush()
+
+    db.execute(
+        text(
+            """
+            INSERT INTO vote (
+                id,
+                server_id,
+                client_ip_address,
+                minecraft_username,
+                created_at
+            )
+            SELECT
+                gen_random_uuid(),
+                server.id,
+                '10.1.' || (i % 1000 / 256) || '.' || (i % 256),
+                'player' || (i % 1000),
+                (now() at time zone 'utc') - random() * :days * interval '1 day'
+            FROM server, generate_series(1, :votes) AS i
+            WHERE server.user_id = :user_id
+            """
+        ),
+        {"user_id": user_id, "days": vote_days, "votes": votes},
+    )
+
+    db.execute(
+        text(
+            """
+            INSERT INTO server_history (
+                id,
+                server_id,
+                is_online,
+                players,
+                rank,
+                uptime,
+                new_votes,
+                votes_this_month,
+                total_votes,
+                created_at
+            )
+            SELECT
+                gen_random_uuid(),
+                server.id,
+                random() < 0.9,
+                floor(random() * 100),
+                1,
+                100,
+                0,
+                0,
+                0,
+                (now() at time zone 'utc') - i * interval '1 hour'
+            FROM server, generate_series(0, :hours - 1) AS i
+            WHERE server.user_id = :user_id
+            """
+        ),
+        {"user_id": user_id, "hours": hours},
+    )
+
+    db.commit()
+
+
+def _benchmark(connection, db, case: BenchmarkCase, repeat: int) -> BenchmarkResult:
+    from tests.utils.query_plan_utils import capture_statements, explain
+
+    with capture_statements(connection) as statements:
+        case.run(db)
+
+    started_at = time.perf_counter()
+
+    for _ in range(repeat):
+        case.run(db)
+
+    mean_ms = (time.perf_counter() - started_at) * 1000 / repeat
+
+    scans = []
+    heap_fetches = 0
+    shared_buffers = 0
+
+    for statement, parameters in statements:
+        query_plan = explain(connection, statement, parameters)
+
+        for table, node in query_plan.get_scans():
+            scans.append(f"{table}: {node['Node Type']}")
+            heap_fetches += node.get("Heap Fetches", 0)
+
+        shared_buffers += query_plan.shared_buffers
+
+    # the lookups only read, nothing is left open between cases
+    db.rollback()
+
+    return BenchmarkResult(
+        name=case.name,
+        scans=", ".join(scans),
+        heap_fetches=heap_fetches,
+        shared_buffers=shared_buffers,
+        mean_ms=mean_ms,
+    )
+
+
+def run_benchmark(
+    servers: int,
+    votes: int,
+    vote_days: int,
+    hours: int,
+    repeat: int,
+) -> List[BenchmarkResult]:
+    """Seeds the dataset, vacuums it and benchmarks each lookup"""
+
+    from sqlalchemy.orm import sessionmaker
+
+    from msc.database import engine
+    from msc.models import Server, User
+
+    connection = engine.connect()
+    db = sessionmaker(bind=connection, autocommit=False, autoflush=False)()
+
+    user = User(
+        id=uuid4(),
+        username="index-scan-benchmark",
+        email="index-scan-benchmark@localhost",
+    )
+    db.add(user)
+    db.commit()
+
+    try:
+        _seed(
+            db=db,
+            user_id=user.id,
+            servers=servers,
+            votes=votes,
+            vote_days=vote_days,
+            hours=hours,
+        )
+
+        # index only scans skip the heap for pages the visibility map marks as
+        # all visible, which vacuum sets
+        with engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as vacuum_connection:
+            vacuum_connection.exec_driver_sql("VACUUM ANALYZE vote, server_history")
+
+        server = db.query(Server).filter(Server.user_id == user.id).first()
+
+        return [
+            _benchmark(connection=connection, db=db, case=case, repeat=repeat)
+            for case in _get_cases(server)
+        ]
+    finally:
+        # servers and their votes and data points are removed along with the user
+        db.rollback()
+        db.query(User).filter(User.id == user.id).delete()
+        db.commit()
+        db.close()
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the per-server vote and history lookups",
+    )
+    parser.add_argument(
+        "--servers",
+        type=int,
+        default=1000,
+        help="The number of servers seeded",
+    )
+    parser.add_argument(
+        "--votes",
+        type=int,
+        default=100,
+        help="The number of votes seeded per server",
+    )
+    parser.add_argument(
+        "--vote-days",
+        type=int,
+        default=60,
+        help="The number of days the votes are spread over",
+    )
+    parser.add_argument(
+        "--hours",
+        type=int,
+        default=7 * 24,
+        help="The number of hourly data points seeded per server",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=100,
+        help="The number of times each lookup is run for its mean latency",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    results = run_benchmark(
+        servers=args.servers,
+        votes=args.votes,
+        vote_days=args.vote_days,
+        hours=args.hours,
+        repeat=args.repeat,
+    )
+
+    columns = list(asdict(results[0]).keys())
+
+    print(" | ".join(columns))
+
+    for result in results:
+        print(
+            " | ".join(
+                f"{value:.2f}" if isinstance(value, float) else str(value)
+                for value in asdict(result).values()
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
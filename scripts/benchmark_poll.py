@@ -0,0 +1,249 @@
+"""
+Benchmarks poll cycles against a local fake server farm
+
+Each size runs in a fresh process, with the farm in a process of its own, so the
+peak RSS is the poller's alone. The servers are added to the configured database
+under a benchmark user which is deleted afterwards, icons are decoded but never
+uploaded
+"""
+
+import argparse
+import base64
+import logging
+import multiprocessing
+import resource
+import time
+from dataclasses import asdict, dataclass
+from uuid import uuid4
+
+from scripts.fake_server_farm import (
+    FakeServerFarmConfig,
+    get_fake_servers,
+    get_farm_config,
+    get_farm_config_parser,
+    raise_open_file_limit,
+    run_farm,
+)
+
+logger = logging.getLogger(__name__)
+
+FARM_START_TIMEOUT = 600
+SERVER_INSERT_BATCH_SIZE = 1000
+
+
+@dataclass
+class BenchmarkResult:
+    servers: int
+    probes_completed: int
+    probes_timed_out: int
+    servers_online: int
+    probes_per_second: float
+    cycle_seconds: float
+    db_statements: int
+    peak_rss_mb: float
+    peak_child_rss_mb: float
+
+
+def _discard_icon(icon_base64: str, server_id, s3=None):
+    """Stands in for the S3 upload, only decoding the icon"""
+
+    base64.b64decode(icon_base64.split("base64,")[1].encode() + b"==")
+
+
+def _add_servers(db, user_id, farm_config: FakeServerFarmConfig) -> set:
+    from msc.models import Server
+
+    server_ids = set()
+    batch = []
+
+    for fake_server in get_fake_servers(farm_config):
+        server = Server(
+            user_id=user_id,
+            name=f"Fake Server {fake_server.index}",
+            description="Poll benchmark server",
+            country_code="GB",
+        )
+
+        if fake_server.is_bedrock:
+            server.bedrock_ip_address = fake_server.host
+            server.bedrock_port = str(fake_server.port)
+        else:
+            server.java_ip_address = fake_server.host
+            server.java_port = fake_server.port
+
+        batch.append(server)
+
+        if len(batch) == SERVER_INSERT_BATCH_SIZE:
+            db.add_all(batch)
+            db.commit()
+            server_ids.update(server.id for server in batch)
+            batch = []
+
+    db.add_all(batch)
+    db.commit()
+    server_ids.update(server.id for server in batch)
+
+    return server_ids
+
+
+def _benchmark(farm_config: FakeServerFarmConfig, keep_servers: bool, result_queue):
+    """Polls the farm's servers once through the poll pipeline"""
+
+    from sqlalchemy import event
+
+    from msc.database import engine, get_db
+    from msc.models import User
+    from msc.services import icon_upload_service
+    from msc.services.ping_service import _get_poll_targets, _run_poll_cycle
+
+    logging.basicConfig(level=logging.INFO)
+    raise_open_file_limit()
+
+    icon_upload_service._upload_server_icon = _discard_icon
+
+    db = next(get_db())
+
+    user = User(
+        id=uuid4(),
+        username="poll-benchmark",
+        email="poll-benchmark@localhost",
+    )
+    db.add(user)
+    db.commit()
+
+    statements = 0
+
+    def _count_statement(*args):
+        nonlocal statements
+        statements += 1
+
+    try:
+        server_ids = _add_servers(db=db, user_id=user.id, farm_config=farm_config)
+
+        event.listen(engine, "before_cursor_execute", _count_statement)
+        started_at = time.perf_counter()
+
+        targets = [
+            target
+            for target in _get_poll_targets(db=db)
+            if target.server_id in server_ids
+        ]
+
+        stats = _run_poll_cycle(targets=targets)
+
+        cycle_seconds = time.perf_counter() - started_at
+        event.remove(engine, "before_cursor_execute", _count_statement)
+
+        # kilobytes on linux
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+        result_queue.put(
+            BenchmarkResult(
+                servers=len(targets),
+                probes_completed=stats.probes_completed,
+                probes_timed_out=stats.probes_timed_out,
+                servers_online=stats.metrics["outcomes"]["ok"],
+                probes_per_second=stats.probes_per_second,
+                cycle_seconds=cycle_seconds,
+                db_statements=statements,
+                peak_rss_mb=peak_rss / 1024,
+                peak_child_rss_mb=peak_child_rss / 1024,
+            )
+        )
+    finally:
+        if not keep_servers:
+            # servers and their history are removed along with the user
+            db.query(User).filter(User.id == user.id).delete()
+            db.commit()
+
+        db.close()
+
+
+def run_benchmark(
+    farm_config: FakeServerFarmConfig,
+    keep_servers: bool = False,
+) -> BenchmarkResult:
+    """Starts a farm and benchmarks a poll cycle against it"""
+
+    context = multiprocessing.get_context("spawn")
+
+    ready = context.Event()
+    stop = context.Event()
+
+    farm = context.Process(
+        target=run_farm,
+        args=(farm_config, ready, stop),
+        name="fake-server-farm",
+    )
+    farm.start()
+
+    try:
+        if not ready.wait(timeout=FARM_START_TIMEOUT):
+            raise RuntimeError("Fake server farm did not start")
+
+        result_queue = context.Queue()
+
+        # not a pool, as multiprocess polling needs a process which can have
+        # children of its own
+        benchmark = context.Process(
+            target=_benchmark,
+            args=(farm_config, keep_servers, result_queue),
+            name="poll-benchmark",
+        )
+        benchmark.start()
+        benchmark.join()
+
+        if benchmark.exitcode != 0:
+            raise RuntimeError(f"Benchmark failed with exit code {benchmark.exitcode}")
+
+        return result_queue.get()
+    finally:
+        stop.set()
+        farm.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks poll cycles against a local fake server farm",
+        parents=[get_farm_config_parser()],
+    )
+    parser.add_argument(
+        "--servers",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 50000],
+        help="The farm sizes to benchmark",
+    )
+    parser.add_argument(
+        "--keep-servers",
+        action="store_true",
+        help="Leaves the benchmark servers in the database",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    results = [
+        run_benchmark(
+            farm_config=get_farm_config(args, servers=servers),
+            keep_servers=args.keep_servers,
+        )
+        for servers in args.servers
+    ]
+
+    columns = list(asdict(results[0]).keys())
+
+    print(" | ".join(columns))
+
+    for result in results:
+        print(
+            " | ".join(
+                f"{value:.2f}" if isinstance(value, float) else str(value)
+                for value in asdict(result).values()
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Benchmarks vote latency under concurrent load
+
+Votes are made through vote_service.add_vote from a pool of threads, each with
+a session of its own. A share of the voters vote twice at the same time with a
+different Minecraft username, which the IP address cooldown must reject, any
+accepted twice are reported. The servers are added to the configured database
+under a benchmark user which is deleted afterwards, along with their votes.
+
+The script only uses add_vote, so it can be run against older commits to compare
+the latency before and after a change
+"""
+
+import argparse
+import logging
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import List, Tuple
+from uuid import UUID, uuid4
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BenchmarkResult:
+    concurrency: int
+    attempts: int
+    accepted: int
+    rejected: int
+    duplicates_accepted: int
+    votes_per_second: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+def _get_attempts(
+    server_ids: List[UUID],
+    run: int,
+    voters: int,
+    duplicate_ratio: float,
+) -> List[Tuple[UUID, str, str]]:
+    """Gets the votes to attempt, the duplicates are placed right after the vote
+    they duplicate so both are made at the same time"""
+
+    attempts = []
+    duplicate_every = int(1 / duplicate_ratio) if duplicate_ratio else 0
+
+    for i in range(voters):
+        server_id = server_ids[i % len(server_ids)]
+        client_ip = f"10.{run}.{i // 256 % 256}.{i % 256}"
+
+        attempts.append((server_id, client_ip, f"bench-{run}-{i}"))
+
+        if duplicate_every and i % duplicate_every == 0:
+            attempts.append((server_id, client_ip, f"bench-{run}-{i}-duplicate"))
+
+    return attempts
+
+
+def _benchmark(
+    session_factory,
+    server_ids: List[UUID],
+    run: int,
+    concurrency: int,
+    voters: int,
+    duplicate_ratio: float,
+) -> BenchmarkResult:
+    from sqlalchemy import func
+
+    from msc.errors import TooManyRequests
+    from msc.models import Vote
+    from msc.services import vote_service
+
+    attempts = _get_attempts(
+        server_ids=server_ids,
+        run=run,
+        voters=voters,
+        duplicate_ratio=duplicate_ratio,
+    )
+
+    def _vote(attempt: Tuple[UUID, str, str]) -> Tuple[bool, float]:
+        server_id, client_ip, minecraft_username = attempt
+        db = session_factory()
+        started_at = time.perf_counter()
+
+        try:
+            vote_service.add_vote(
+                db=db,
+                server_id=server_id,
+                client_ip=client_ip,
+                minecraft_username=minecraft_username,
+            )
+            accepted = True
+        except TooManyRequests:
+            accepted = False
+        finally:
+            db.close()
+
+        return accepted, (time.perf_counter() - started_at) * 1000
+
+    started_at = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(_vote, attempts))
+
+    elapsed = time.perf_counter() - started_at
+
+    db = session_factory()
+
+    try:
+        duplicates_accepted = (
+            db.query(Vote.server_id, Vote.client_ip_address)
+            .filter(
+                Vote.server_id.in_(server_ids),
+                Vote.client_ip_address.like(f"10.{run}.%"),
+            )
+            .group_by(Vote.server_id, Vote.client_ip_address)
+            .having(func.count() > 1)
+            .count()
+        )
+    finally:
+        db.close()
+
+    latencies = sorted(latency for _, latency in results)
+    quantiles = statistics.quantiles(latencies, n=100)
+    accepted = sum(1 for is_accepted, _ in results if is_accepted)
+
+    return BenchmarkResult(
+        concurrency=concurrency,
+        attempts=len(results),
+        accepted=accepted,
+        rejected=len(results) - accepted,
+        duplicates_accepted=duplicates_accepted,
+        votes_per_second=len(results) / elapsed,
+        p50_ms=quantiles[49],
+        p95_ms=quantiles[94],
+        p99_ms=quantiles[98],
+    )
+
+
+def run_benchmark(
+    concurrency_levels: List[int],
+    servers: int,
+    voters: int,
+    duplicate_ratio: float,
+) -> List[BenchmarkResult]:
+    """Adds the benchmark servers and benchmarks votes at each concurrency"""
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from msc.database import get_db, get_url
+    from msc.models import Server, User
+
+    engine = create_engine(
+        get_url(),
+        connect_args={"options": "-c timezone=utc"},
+        pool_size=max(concurrency_levels),
+    )
+    session_factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    db = next(get_db())
+
+    user = User(
+        id=uuid4(),
+        username="vote-benchmark",
+        email="vote-benchmark@localhost",
+    )
+    db.add(user)
+    db.commit()
+
+    try:
+        benchmark_servers = [
+            Server(
+                user_id=user.id,
+                name=f"Vote Benchmark Server {i}",
+                description="Vote benchmark server",
+                country_code="GB",
+            )
+            for i in range(servers)
+        ]
+        db.add_all(benchmark_servers)
+        db.commit()
+
+        server_ids = [server.id for server in benchmark_servers]
+
+        return [
+            _benchmark(
+                session_factory=session_factory,
+                server_ids=server_ids,
+                run=run,
+                concurrency=concurrency,
+                voters=voters,
+                duplicate_ratio=duplicate_ratio,
+            )
+            for run, concurrency in enumerate(concurrency_levels)
+        ]
+    finally:
+        # servers and their votes are removed along with the user
+        db.query(User).filter(User.id == user.id).delete()
+        db.commit()
+        db.close()
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks vote latency under concurrent load",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 16, 64],
+        help="The number of votes made at the same time",
+    )
+    parser.add_argument(
+        "--servers",
+        type=int,
+        default=10,
+        help="The number of servers voted for",
+    )
+    parser.add_argument(
+        "--voters",
+        type=int,
+        default=5000,
+        help="The number of voters at each concurrency",
+    )
+    parser.add_argument(
+        "--duplicate-ratio",
+        type=float,
+        default=0.1,
+        help="The share of voters who vote twice at the same time",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    results = run_benchmark(
+        concurrency_levels=args.concurrency,
+        servers=args.servers,
+        voters=args.voters,
+        duplicate_ratio=args.duplicate_ratio,
+    )
+
+    columns = list(asdict(results[0]).keys())
+
+    print(" | ".join(columns))
+
+    for result in results:
+        print(
+            " | ".join(
+                f"{value:.2f}" if isinstance(value, float) else str(value)
+                for value in asdict(result).values()
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
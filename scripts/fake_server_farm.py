@@ -0,0 +1,513 @@
+"""
+Serves thousands of fake minecraft servers on localhost so polling can be
+measured without touching real servers
+
+Java servers answer Server List Ping status and GameSpy4 query on the same port
+number over TCP and UDP, bedrock servers answer RakNet unconnected pings over UDP
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import random
+import resource
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# servers are spread over loopback addresses so port numbers stay clear of the
+# ephemeral range used by the poller's own connections
+FARM_HOST_PREFIX = "127.0.1."
+FARM_BASE_PORT = 10000
+FARM_PORTS_PER_HOST = 20000
+
+JAVA_PROTOCOL_VERSION = 763
+BEDROCK_PROTOCOL_VERSION = 589
+
+RAKNET_UNCONNECTED_PING = 0x01
+RAKNET_UNCONNECTED_PONG = 0x1C
+RAKNET_MAGIC = bytes.fromhex("00ffff00fefefefefdfdfdfd12345678")
+
+QUERY_MAGIC = bytes.fromhex("fefd")
+QUERY_TYPE_HANDSHAKE = 0x09
+QUERY_TYPE_STAT = 0x00
+
+
+@dataclass
+class FakeServerFarmConfig:
+    servers: int = 1000
+    # the delay before each reply is latency_ms plus or minus up to jitter_ms
+    latency_ms: float = 20.0
+    jitter_ms: float = 10.0
+    # the chance a request is never answered
+    drop_rate: float = 0.0
+    # the share of servers which are not listening at all
+    offline_rate: float = 0.0
+    # the chance a java server has a new favicon each time its status is served
+    favicon_churn: float = 0.0
+    # the share of servers which are bedrock only
+    bedrock_ratio: float = 0.1
+    java_versions: Tuple[str, ...] = (
+        "1.20.1",
+        "Paper 1.20.4",
+        "1.19.4",
+        "BungeeCord 1.8.x-1.20.x",
+        "Velocity 3.2.0",
+        "§cMaintenance",
+    )
+    bedrock_versions: Tuple[str, ...] = ("1.20.0", "1.20.40", "1.19.83")
+    seed: int = 0
+
+
+@dataclass
+class FakeServer:
+    index: int
+    is_bedrock: bool
+    host: str
+    port: int
+    version: str
+    max_players: int
+    is_online: bool
+    favicon: Optional[str] = None
+
+
+@dataclass
+class FakeServerFarmStats:
+    status_served: int = 0
+    queries_served: int = 0
+    pings_served: int = 0
+    dropped: int = 0
+    favicons_changed: int = 0
+
+
+def get_fake_servers(farm_config: FakeServerFarmConfig) -> List[FakeServer]:
+    """Gets the servers a farm serves, the same config always gives the same
+    servers so they can be known outside the farm's process"""
+
+    rng = random.Random(farm_config.seed)
+    servers = []
+
+    for i in range(farm_config.servers):
+        is_bedrock = rng.random() < farm_config.bedrock_ratio
+        versions = (
+            farm_config.bedrock_versions if is_bedrock else farm_config.java_versions
+        )
+
+        servers.append(
+            FakeServer(
+                index=i,
+                is_bedrock=is_bedrock,
+                host=f"{FARM_HOST_PREFIX}{i // FARM_PORTS_PER_HOST + 1}",
+                port=FARM_BASE_PORT + i % FARM_PORTS_PER_HOST,
+                version=rng.choice(versions),
+                max_players=rng.choice((20, 50, 100, 500, 1000)),
+                is_online=rng.random() >= farm_config.offline_rate,
+            )
+        )
+
+    return servers
+
+
+def raise_open_file_limit():
+    """Raises this process's open file limit as far as it is allowed to go"""
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    return hard
+
+
+def _make_favicon(rng: random.Random) -> str:
+    """Makes a 1x1 png of a random colour as a data uri"""
+
+    def _chunk(kind: bytes, data: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(data))
+            + kind
+            + data
+            + struct.pack(">I", zlib.crc32(kind + data))
+        )
+
+    pixel = bytes([0]) + bytes(rng.randrange(256) for _ in range(3))
+    png = (
+        b"\x89PNG\r\n\x1a\n"
+        + _chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0))
+        + _chunk(b"IDAT", zlib.compress(pixel))
+        + _chunk(b"IEND", b"")
+    )
+
+    return "data:image/png;base64," + base64.b64encode(png).decode()
+
+
+def _write_varint(value: int) -> bytes:
+    data = bytearray()
+
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+
+        if value:
+            data.append(byte | 0x80)
+        else:
+            data.append(byte)
+            return bytes(data)
+
+
+def _read_varint(data: bytes, offset: int = 0) -> Tuple[int, int]:
+    value = 0
+
+    for i in range(5):
+        byte = data[offset + i]
+        value |= (byte & 0x7F) << (7 * i)
+
+        if not byte & 0x80:
+            return value, offset + i + 1
+
+    raise ValueError("VarInt is too big")
+
+
+async def _read_stream_varint(reader: asyncio.StreamReader) -> int:
+    value = 0
+
+    for i in range(5):
+        byte = (await reader.readexactly(1))[0]
+        value |= (byte & 0x7F) << (7 * i)
+
+        if not byte & 0x80:
+            return value
+
+    raise ValueError("VarInt is too big")
+
+
+def _frame(packet: bytes) -> bytes:
+    return _write_varint(len(packet)) + packet
+
+
+class _FarmUdpProtocol(asyncio.DatagramProtocol):
+    def __init__(self, farm: "FakeServerFarm", server: FakeServer):
+        self.farm = farm
+        self.server = server
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr: tuple):
+        reply = self.farm._get_udp_reply(self.server, data)
+
+        if reply is None:
+            return
+
+        asyncio.get_running_loop().call_later(
+            self.farm._get_delay(),
+            self.transport.sendto,
+            reply,
+            addr,
+        )
+
+
+class FakeServerFarm:
+    """Runs every server of a farm on the current event loop"""
+
+    def __init__(self, farm_config: FakeServerFarmConfig):
+        self.config = farm_config
+        self.servers = get_fake_servers(farm_config)
+        self.stats = FakeServerFarmStats()
+
+        self._rng = random.Random(farm_config.seed)
+        self._tcp_servers: List[asyncio.AbstractServer] = []
+        self._udp_transports: List[asyncio.DatagramTransport] = []
+        self._challenges: Dict[Tuple[str, int], int] = {}
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        failed = 0
+
+        for server in self.servers:
+            if not server.is_online:
+                continue
+
+            if not server.is_bedrock:
+                server.favicon = _make_favicon(self._rng)
+
+            try:
+                if not server.is_bedrock:
+                    self._tcp_servers.append(
+                        await asyncio.start_server(
+                            lambda r, w, s=server: self._handle_java(s, r, w),
+                            host=server.host,
+                            port=server.port,
+                            reuse_address=True,
+                            backlog=128,
+                        )
+                    )
+
+                transport, _ = await loop.create_datagram_endpoint(
+                    lambda s=server: _FarmUdpProtocol(self, s),
+                    local_addr=(server.host, server.port),
+                )
+                self._udp_transports.append(transport)
+            except OSError as e:
+                # the server is left offline, the poller sees it as unreachable
+                failed += 1
+                server.is_online = False
+
+                if failed == 1:
+                    logger.warning(f"Could not listen on {server.host}: {e}")
+
+        logger.info(
+            f"Fake server farm serving "
+            f"{sum(server.is_online for server in self.servers)}"
+            f"/{len(self.servers)} servers ({failed} could not listen)"
+        )
+
+    async def close(self):
+        for tcp_server in self._tcp_servers:
+            tcp_server.close()
+
+        for transport in self._udp_transports:
+            transport.close()
+
+        await asyncio.gather(
+            *(tcp_server.wait_closed() for tcp_server in self._tcp_servers),
+            return_exceptions=True,
+        )
+
+    async def __aenter__(self) -> "FakeServerFarm":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def _get_delay(self) -> float:
+        delay = self.config.latency_ms + self._rng.uniform(
+            -self.config.jitter_ms, self.config.jitter_ms
+        )
+
+        return max(delay, 0) / 1000
+
+    def _is_dropped(self) -> bool:
+        if self._rng.random() < self.config.drop_rate:
+            self.stats.dropped += 1
+            return True
+
+        return False
+
+    def _get_java_status(self, server: FakeServer) -> bytes:
+        if self._rng.random() < self.config.favicon_churn:
+            server.favicon = _make_favicon(self._rng)
+            self.stats.favicons_changed += 1
+
+        status = {
+            "version": {"name": server.version, "protocol": JAVA_PROTOCOL_VERSION},
+            "players": {
+                "max": server.max_players,
+                "online": self._rng.randint(0, server.max_players),
+                "sample": [],
+            },
+            "description": {"text": f"Fake Server {server.index}"},
+            "favicon": server.favicon,
+        }
+
+        data = json.dumps(status).encode()
+
+        return _frame(_write_varint(0) + _write_varint(len(data)) + data)
+
+    async def _handle_java(
+        self,
+        server: FakeServer,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ):
+        """Answers the handshake, status request and ping of a server list ping"""
+
+        try:
+            if self._is_dropped():
+                # hold the connection open without answering until the client
+                # gives up
+                await reader.read()
+                return
+
+            # the handshake needs no reply
+            await reader.readexactly(await _read_stream_varint(reader))
+
+            while True:
+                packet = await reader.readexactly(await _read_stream_varint(reader))
+                packet_id, offset = _read_varint(packet)
+
+                await asyncio.sleep(self._get_delay())
+
+                if packet_id == 0:
+                    self.stats.status_served += 1
+                    writer.write(self._get_java_status(server))
+                elif packet_id == 1:
+                    writer.write(_frame(_write_varint(1) + packet[offset:]))
+                    await writer.drain()
+                    return
+
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _get_udp_reply(self, server: FakeServer, data: bytes) -> Optional[bytes]:
+        if not data or self._is_dropped():
+            return None
+
+        if data[0] == RAKNET_UNCONNECTED_PING and server.is_bedrock:
+            return self._get_bedrock_pong(server, data)
+
+        if data[:2] == QUERY_MAGIC and not server.is_bedrock and len(data) >= 7:
+            return self._get_query_reply(server, data)
+
+        return None
+
+    def _get_bedrock_pong(self, server: FakeServer, data: bytes) -> bytes:
+        self.stats.pings_served += 1
+
+        motd = (
+            f"MCPE;Fake Server {server.index};{BEDROCK_PROTOCOL_VERSION};"
+            f"{server.version};{self._rng.randint(0, server.max_players)};"
+            f"{server.max_players};{server.index};Fake World;Survival;1;"
+            f"{server.port};{server.port};"
+        ).encode()
+
+        return (
+            bytes([RAKNET_UNCONNECTED_PONG])
+            # the ping time is echoed back
+            + data[1:9]
+            + struct.pack(">Q", server.index)
+            + RAKNET_MAGIC
+            + struct.pack(">H", len(motd))
+            + motd
+        )
+
+    def _get_query_reply(self, server: FakeServer, data: bytes) -> bytes:
+        session_id = data[3:7]
+
+        if data[2] == QUERY_TYPE_HANDSHAKE:
+            challenge = self._rng.randrange(2**31)
+            self._challenges[(server.host, server.port)] = challenge
+
+            return bytes([QUERY_TYPE_HANDSHAKE]) + session_id + b"%d\x00" % challenge
+
+        self.stats.queries_served += 1
+
+        values = {
+            "hostname": f"Fake Server {server.index}",
+            "gametype": "SMP",
+            "game_id": "MINECRAFT",
+            "version": server.version,
+            "plugins": "",
+            "map": "world",
+            "numplayers": str(self._rng.randint(0, server.max_players)),
+            "maxplayers": str(server.max_players),
+            "hostport": str(server.port),
+            "hostip": server.host,
+        }
+
+        return (
+            bytes([QUERY_TYPE_STAT])
+            + session_id
+            + b"splitnum\x00\x80\x00"
+            + b"".join(
+                key.encode() + b"\x00" + value.encode() + b"\x00"
+                for key, value in values.items()
+            )
+            + b"\x00\x01player_\x00\x00\x00"
+        )
+
+
+def run_farm(farm_config: FakeServerFarmConfig, ready=None, stop=None):
+    """Runs a farm until it is stopped
+
+    :param ready: An event set once every server is listening
+    :param stop: An event which stops the farm when set, runs forever if not
+        provided"""
+
+    open_file_limit = raise_open_file_limit()
+
+    # a java server listens on a tcp and a udp socket
+    if open_file_limit < farm_config.servers * 2:
+        logger.warning(
+            f"Open file limit {open_file_limit} is too low to serve every server, "
+            f"the rest are left offline"
+        )
+
+    async def _run():
+        async with FakeServerFarm(farm_config) as farm:
+            if ready is not None:
+                ready.set()
+
+            while stop is None or not stop.is_set():
+                await asyncio.sleep(0.5)
+
+            logger.info(f"Fake server farm stopping {farm.stats}")
+
+    asyncio.run(_run())
+
+
+def get_farm_config_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(add_help=False)
+    defaults = FakeServerFarmConfig()
+
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--drop-rate", type=float, default=defaults.drop_rate)
+    parser.add_argument("--offline-rate", type=float, default=defaults.offline_rate)
+    parser.add_argument("--favicon-churn", type=float, default=defaults.favicon_churn)
+    parser.add_argument("--bedrock-ratio", type=float, default=defaults.bedrock_ratio)
+    parser.add_argument("--java-versions", nargs="+", default=defaults.java_versions)
+    parser.add_argument(
+        "--bedrock-versions", nargs="+", default=defaults.bedrock_versions
+    )
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+    return parser
+
+
+def get_farm_config(args: argparse.Namespace, servers: int) -> FakeServerFarmConfig:
+    return FakeServerFarmConfig(
+        servers=servers,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        drop_rate=args.drop_rate,
+        offline_rate=args.offline_rate,
+        favicon_churn=args.favicon_churn,
+        bedrock_ratio=args.bedrock_ratio,
+        java_versions=tuple(args.java_versions),
+        bedrock_versions=tuple(args.bedrock_versions),
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serves fake minecraft servers on localhost",
+        parents=[get_farm_config_parser()],
+    )
+    parser.add_argument("--servers", type=int, default=1000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    farm_config = get_farm_config(args, servers=args.servers)
+
+    for server in get_fake_servers(farm_config)[:5]:
+        edition = "bedrock" if server.is_bedrock else "java"
+        logger.info(f"e.g. {edition} server at {server.host}:{server.port}")
+
+    run_farm(farm_config)
+
+
+if __name__ == "__main__":
+    main()
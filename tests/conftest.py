@@ -138,3 +138,4 @@ def disable_development_mode():
 @pytest.fixture(autouse=True)
 def disable_scheduled_jobs(mocker):
     mocker.patch("msc.app.scheduler.start", return_value=None)
+    mocker.patch("msc.app.votifier_outbox_worker.start", return_value=None)
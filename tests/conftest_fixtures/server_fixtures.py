@@ -5,7 +5,7 @@ import freezegun
 import pytest
 
 from msc.models import Server, ServerHistory, User
-from msc.services import server_service, user_service, vote_service
+from msc.services import history_service, server_service, user_service, vote_service
 
 
 @pytest.fixture
@@ -35,6 +35,19 @@ def server_colcraft(session, user_jack: User):
     return server
 
 
+@pytest.fixture
+def server_colcraft_votifier(session, server_colcraft: Server):
+    """Returns colcraft with votifier enabled"""
+
+    server_colcraft.use_votifier = True
+    server_colcraft.votifier_ip_address = "127.0.0.1"
+    server_colcraft.votifier_port = 8192
+    server_colcraft.votifier_key = "votifier-token"
+    session.commit()
+
+    return server_colcraft
+
+
 @pytest.fixture
 def server_colcraft_2(session, user_jack: User):
     """Returns a server with default values"""
@@ -255,3 +268,6 @@ def server_colcraft_history(
 
                 session.add(data_point)
                 session.commit()
+
+    history_service.rebuild_history_rollups(db=session, server_id=server_colcraft.id)
+    session.commit()
@@ -7,3 +7,11 @@ def mock_poll_server(mocker):
         "msc.services.ping_service.poll_server",
         return_value=None,
     )
+
+
+@pytest.fixture(autouse=True)
+def mock_pre_resolve(mocker):
+    mocker.patch(
+        "msc.services.resolver_service.pre_resolve",
+        return_value=None,
+    )
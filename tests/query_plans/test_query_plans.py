@@ -0,0 +1,427 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, FrozenSet
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session, sessionmaker
+
+from msc.constants import PARTITIONED_TABLES, BidPaymentStatus
+from msc.models import AuctionBid, Server, Sponsor, User
+from msc.services import (
+    auction_service,
+    history_service,
+    leaderboard_service,
+    ping_service,
+    server_service,
+    vote_service,
+)
+from msc.services.partition_service import create_partition
+from msc.utils.time_utils import get_month_start
+from tests.utils.query_plan_utils import capture_statements, explain
+
+USER_COUNT = 100
+SERVER_COUNT = 1000
+VOTES_PER_SERVER = 100
+VOTE_DAYS = 60
+HISTORY_HOURS = 7 * 24
+AUCTION_COUNT = 36
+
+# the tables which grow with the number of servers, a sequential scan of any of
+# these is a regression unless the query reads the whole table by design
+WATCHED_TABLES = frozenset(
+    [
+        "server",
+        "vote",
+        "server_history",
+        "server_history_hourly",
+        "server_history_daily",
+    ]
+)
+
+# shared buffers allowed per statement, with headroom over the seeded dataset
+POINT_BUDGET = 200
+RANGE_BUDGET = 500
+RANKING_BUDGET = 5000
+
+
+@dataclass
+class QueryPlanCase:
+    name: str
+    run: Callable[[Session, dict], object]
+    buffer_budget: int
+    # the watched tables the queries read in full by design
+    seq_scans: FrozenSet[str] = field(default_factory=frozenset)
+
+
+@pytest.fixture(scope="module")
+def dataset(connection):
+    """Seeds a large synthetic dataset once for the module, rolled back afterwards"""
+
+    transaction = connection.begin()
+    db = sessionmaker(bind=connection, autoflush=False, autocommit=False)()
+
+    now = datetime.utcnow()
+
+    # votes reach back a few months, so they must not land in the default
+    # partitions
+    for months in range(-3, 1):
+        for table in PARTITIONED_TABLES:
+            create_partition(
+                db=db,
+                table=table,
+                month=get_month_start(now, months=months),
+            )
+
+    users = [
+        User(
+            id=uuid4(),
+            username=f"query-plan-{i}",
+            email=f"query-plan-{i}@localhost",
+        )
+        for i in range(USER_COUNT)
+    ]
+    db.add_all(users)
+    db.flush()
+
+    servers = []
+
+    for i in range(SERVER_COUNT):
+        server = Server(
+            user_id=users[i % USER_COUNT].id,
+            name=f"Query Plan Server {i}",
+            description="Query plan server",
+            country_code="GB",
+            java_ip_address=f"10.0.{i // 256}.{i % 256}",
+            java_port=25565,
+        )
+        # a few servers waiting to be deleted, which the listings skip
+        server.flagged_for_deletion = i % 50 == 0
+        servers.append(server)
+
+    db.add_all(servers)
+    db.flush()
+
+    db.execute(
+        text(
+            """
+            INSERT INTO vote (
+                id,
+                server_id,
+                client_ip_address,
+                minecraft_username,
+                created_at
+            )
+            SELECT
+                gen_random_uuid(),
+                server.id,
+                '10.1.' || (i % 1000 / 256) || '.' || (i % 256),
+                'player' || (i % 1000),
+                :now - random() * :days * interval '1 day'
+            FROM server, generate_series(1, :votes) AS i
+            WHERE server.description = 'Query plan server'
+            """
+        ),
+        {"now": now, "days": VOTE_DAYS, "votes": VOTES_PER_SERVER},
+    )
+
+    db.execute(
+        text(
+            """
+            INSERT INTO server_history (
+                id,
+                server_id,
+                is_online,
+                players,
+                rank,
+                uptime,
+                new_votes,
+                votes_this_month,
+                total_votes,
+                created_at
+            )
+            SELECT
+                gen_random_uuid(),
+                server.id,
+                random() < 0.9,
+                floor(random() * 100),
+                1,
+                100,
+                0,
+                0,
+                0,
+                :now - i * interval '1 hour'
+            FROM server, generate_series(0, :hours - 1) AS i
+            WHERE server.description = 'Query plan server'
+            """
+        ),
+        {"now": now, "hours": HISTORY_HOURS},
+    )
+
+    history_service.rebuild_history_rollups(db=db)
+
+    # the votes were inserted directly, so they are counted by the reconciliation
+    vote_service.reconcile_server_vote_stats(db=db)
+    leaderboard_service.rebuild_leaderboard(db=db)
+
+    for slot in range(1, 4):
+        db.add(
+            Sponsor(
+                user_id=servers[slot].user_id,
+                server_id=servers[slot].id,
+                slot=slot,
+                year=now.year,
+                month=now.month,
+            )
+        )
+
+    next_month = get_month_start(now, months=1)
+
+    auction_service.create_auction(
+        db=db,
+        sponsored_year=next_month.year,
+        sponsored_month=next_month.month,
+        is_current_auction=True,
+    )
+
+    for months in range(1, AUCTION_COUNT + 1):
+        month = get_month_start(now, months=-months)
+
+        auction = auction_service.create_auction(
+            db=db,
+            sponsored_year=month.year,
+            sponsored_month=month.month,
+        )
+
+        for i, server in enumerate(servers[1:4]):
+            bid = AuctionBid(
+                auction_id=auction.id,
+                user_id=server.user_id,
+                server_id=server.id,
+                server_name=server.name,
+                amount=100 + i,
+            )
+            bid.payment_status = BidPaymentStatus.PAID
+            db.add(bid)
+
+    db.commit()
+
+    db.execute(
+        text(
+            """
+            ANALYZE server, vote, server_vote_stats, server_leaderboard,
+                server_history, server_history_hourly, server_history_daily,
+                sponsor, auction, auction_bid
+            """
+        )
+    )
+
+    yield {
+        "server_id": servers[1].id,
+        "user_id": users[1].id,
+        "client_ip": "10.1.0.1",
+        "minecraft_username": "player1",
+    }
+
+    db.close()
+    transaction.rollback()
+
+
+@pytest.fixture
+def plan_session(connection, dataset):
+    """A session whose writes are rolled back after each test, leaving the
+    dataset as seeded"""
+
+    savepoint = connection.begin_nested()
+    db = sessionmaker(bind=connection, autoflush=False, autocommit=False)()
+
+    yield db
+
+    db.close()
+
+    if savepoint.is_active:
+        savepoint.rollback()
+
+
+def _get_server(db: Session, dataset: dict) -> Server:
+    return db.query(Server).filter(Server.id == dataset["server_id"]).one()
+
+
+CASES = [
+    QueryPlanCase(
+        name="server_service.get_servers",
+        run=lambda db, d: server_service.get_servers(db=db),
+        buffer_budget=RANKING_BUDGET,
+        seq_scans=frozenset(["server"]),
+    ),
+    QueryPlanCase(
+        name="server_service.get_sponsored_servers",
+        run=lambda db, d: server_service.get_sponsored_servers(db=db),
+        buffer_budget=RANKING_BUDGET,
+        seq_scans=frozenset(["server"]),
+    ),
+    QueryPlanCase(
+        name="server_service.get_server",
+        run=lambda db, d: server_service.get_server(db=db, server_id=d["server_id"]),
+        buffer_budget=RANKING_BUDGET,
+        seq_scans=frozenset(["server"]),
+    ),
+    QueryPlanCase(
+        name="server_service.get_my_servers",
+        run=lambda db, d: server_service.get_my_servers(db=db, user_id=d["user_id"]),
+        buffer_budget=RANKING_BUDGET,
+        seq_scans=frozenset(["server"]),
+    ),
+    QueryPlanCase(
+        name="server_service.get_server_ranks",
+        run=lambda db, d: server_service.get_server_ranks(db=db),
+        buffer_budget=RANKING_BUDGET,
+        seq_scans=frozenset(["server"]),
+    ),
+    QueryPlanCase(
+        name="server_service.get_computed_server_ranks",
+        run=lambda db, d: server_service.get_computed_server_ranks(db=db),
+        buffer_budget=RANKING_BUDGET,
+        seq_scans=frozenset(["server"]),
+    ),
+    QueryPlanCase(
+        name="leaderboard_service.get_server_rank",
+        run=lambda db, d: leaderboard_service.get_server_rank(
+            db=db,
+            server=_get_server(db, d),
+        ),
+        buffer_budget=RANKING_BUDGET,
+    ),
+    QueryPlanCase(
+        name="leaderboard_service.get_leaderboard",
+        run=lambda db, d: leaderboard_service.get_leaderboard(db=db, limit=10),
+        buffer_budget=POINT_BUDGET,
+    ),
+    QueryPlanCase(
+        name="server_service.get_server_history.hour",
+        run=lambda db, d: server_service.get_server_history(
+            db=db,
+            server_id=d["server_id"],
+            time_interval="hour",
+        ),
+        buffer_budget=RANGE_BUDGET,
+    ),
+    QueryPlanCase(
+        name="server_service.get_server_history.day",
+        run=lambda db, d: server_service.get_server_history(
+            db=db,
+            server_id=d["server_id"],
+            time_interval="day",
+        ),
+        buffer_budget=RANGE_BUDGET,
+    ),
+    QueryPlanCase(
+        name="vote_service._has_ip_voted_in_last_24_hours",
+        run=lambda db, d: vote_service._has_ip_voted_in_last_24_hours(
+            db=db,
+            server_id=d["server_id"],
+            client_ip=d["client_ip"],
+        ),
+        buffer_budget=POINT_BUDGET,
+    ),
+    QueryPlanCase(
+        name="vote_service.add_vote",
+        run=lambda db, d: vote_service.add_vote(
+            db=db,
+            server_id=d["server_id"],
+            client_ip="10.2.0.1",
+            minecraft_username="query-plan-voter",
+        ),
+        buffer_budget=POINT_BUDGET,
+    ),
+    QueryPlanCase(
+        name="vote_service.check_vote_info",
+        run=lambda db, d: vote_service.check_vote_info(
+            db=db,
+            server_id=d["server_id"],
+            client_ip=d["client_ip"],
+        ),
+        buffer_budget=POINT_BUDGET,
+    ),
+    QueryPlanCase(
+        name="vote_service.get_total_votes",
+        run=lambda db, d: vote_service.get_total_votes(
+            db=db,
+            server=_get_server(db, d),
+        ),
+        buffer_budget=RANGE_BUDGET,
+    ),
+    QueryPlanCase(
+        name="vote_service.get_votes_this_month",
+        run=lambda db, d: vote_service.get_votes_this_month(
+            db=db,
+            server=_get_server(db, d),
+        ),
+        buffer_budget=RANGE_BUDGET,
+    ),
+    QueryPlanCase(
+        name="vote_service.get_new_votes",
+        run=lambda db, d: vote_service.get_new_votes(
+            db=db,
+            server=_get_server(db, d),
+        ),
+        buffer_budget=RANGE_BUDGET,
+    ),
+    QueryPlanCase(
+        name="vote_service.get_vote_counts",
+        run=lambda db, d: vote_service.get_vote_counts(db=db),
+        buffer_budget=RANKING_BUDGET,
+    ),
+    QueryPlanCase(
+        name="ping_service._get_poll_targets",
+        run=lambda db, d: ping_service._get_poll_targets(db=db, due_only=True),
+        buffer_budget=RANGE_BUDGET,
+        # every server is due in the dataset
+        seq_scans=frozenset(["server"]),
+    ),
+    QueryPlanCase(
+        name="ping_service._create_server_history_data_point",
+        run=lambda db, d: ping_service._create_server_history_data_point(
+            db=db,
+            server=_get_server(db, d),
+            is_online=True,
+            players=10,
+            commit=False,
+        ),
+        buffer_budget=RANKING_BUDGET,
+        seq_scans=frozenset(["server"]),
+    ),
+    QueryPlanCase(
+        name="auction_service.get_current_auction",
+        run=lambda db, d: auction_service.get_current_auction(db=db),
+        buffer_budget=POINT_BUDGET,
+    ),
+    QueryPlanCase(
+        name="auction_service.get_historical_auctions",
+        run=lambda db, d: auction_service.get_historical_auctions(db=db),
+        buffer_budget=POINT_BUDGET,
+    ),
+]
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case.name for case in CASES])
+def test_query_plan(connection, plan_session, dataset, case: QueryPlanCase):
+    """Tests the queries a service function runs avoid sequential scans of the
+    large tables and stay within their buffer budget"""
+
+    with capture_statements(connection) as statements:
+        case.run(plan_session, dataset)
+
+    assert statements
+
+    for statement, parameters in statements:
+        query_plan = explain(connection, statement, parameters)
+
+        seq_scans = (query_plan.get_seq_scans() & WATCHED_TABLES) - case.seq_scans
+
+        assert not seq_scans, f"Sequential scan of {seq_scans} in:\n{statement}"
+        assert query_plan.shared_buffers <= case.buffer_budget, (
+            f"{query_plan.shared_buffers} shared buffers over the budget of "
+            f"{case.buffer_budget} in:\n{statement}"
+        )
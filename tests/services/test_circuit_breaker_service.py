@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+from msc.config import config
+from msc.constants import BREAKER_BASE_BACKOFF, BREAKER_FAILURE_THRESHOLD
+from msc.models import PollBreaker, Server
+from msc.models.poll_breaker import BreakerState
+from msc.services.circuit_breaker_service import (
+    get_breaker_backoff,
+    get_breaker_update,
+    get_endpoint,
+)
+from msc.services.ping_service import PollResult, _get_poll_targets
+from msc.services.poll_writer_service import write_poll_results
+
+
+def test_get_breaker_update_opens_after_threshold():
+    """Tests a breaker only opens after the failure threshold"""
+
+    polled_at = datetime.utcnow()
+    breaker = None
+
+    for _ in range(BREAKER_FAILURE_THRESHOLD - 1):
+        update = get_breaker_update(breaker, is_online=False, polled_at=polled_at)
+        assert update.state == BreakerState.CLOSED
+        breaker = PollBreaker(
+            endpoint="java:example.com:",
+            consecutive_failures=update.consecutive_failures,
+        )
+
+    update = get_breaker_update(breaker, is_online=False, polled_at=polled_at)
+
+    assert update.state == BreakerState.OPEN
+    assert update.opened_at == polled_at
+    assert update.next_check_at == polled_at + timedelta(seconds=BREAKER_BASE_BACKOFF)
+
+    # answering closes the breaker
+    assert get_breaker_update(breaker, is_online=True, polled_at=polled_at) is None
+
+
+def test_get_breaker_backoff():
+    """Tests the half-open check backs off up to the maximum poll interval"""
+
+    assert get_breaker_backoff(BREAKER_FAILURE_THRESHOLD) == BREAKER_BASE_BACKOFF
+    assert (
+        get_breaker_backoff(BREAKER_FAILURE_THRESHOLD + 1) == BREAKER_BASE_BACKOFF * 2
+    )
+    assert get_breaker_backoff(1000) == config.poll_max_interval
+
+
+def test_breaker_skips_dead_endpoint(
+    session,
+    server_colcraft: Server,
+):
+    """Tests a failing endpoint's breaker opens, its server is skipped until the
+    half-open check and the breaker is removed once it answers"""
+
+    now = datetime.utcnow()
+    endpoint = get_endpoint(server_colcraft)
+
+    for i in range(BREAKER_FAILURE_THRESHOLD):
+        write_poll_results(
+            db=session,
+            results=[
+                PollResult(
+                    server_id=server_colcraft.id,
+                    polled_at=now + timedelta(minutes=i),
+                )
+            ],
+        )
+
+    breaker = session.query(PollBreaker).filter_by(endpoint=endpoint).one()
+
+    assert breaker.state == BreakerState.OPEN
+    assert breaker.consecutive_failures == BREAKER_FAILURE_THRESHOLD
+    assert server_colcraft.id not in [
+        target.server_id for target in _get_poll_targets(db=session)
+    ]
+
+    # the half-open check is due
+    breaker.next_check_at = now - timedelta(seconds=1)
+    session.commit()
+
+    targets = [
+        target
+        for target in _get_poll_targets(db=session)
+        if target.server_id == server_colcraft.id
+    ]
+
+    assert len(targets) == 1
+    assert targets[0].half_open is True
+
+    write_poll_results(
+        db=session,
+        results=[
+            PollResult(
+                server_id=server_colcraft.id,
+                is_online=True,
+                players=1,
+                max_players=10,
+                polled_at=now + timedelta(hours=1),
+            )
+        ],
+    )
+
+    assert session.query(PollBreaker).filter_by(endpoint=endpoint).count() == 0
@@ -0,0 +1,366 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from msc.models import Server, ServerHistory, ServerHistoryDaily, ServerHistoryHourly
+from msc.services import server_service
+from msc.services.history_service import (
+    add_history_rollups,
+    compact_server_history,
+    get_bucket_start,
+    get_compaction_cutoff,
+    get_hourly_rollup_cutoff,
+    prune_history_rollups,
+    rebuild_history_rollups,
+    seal_history_rollups,
+)
+from msc.services.partition_service import create_partition, get_partitions
+from msc.utils.time_utils import get_month_start
+
+
+def _add_data_point(
+    session,
+    server: Server,
+    created_at: datetime,
+    is_online: bool = True,
+    players: int = 0,
+    rank: int = 1,
+    new_votes: int = 0,
+    total_votes: int = 0,
+):
+    data_point = ServerHistory(
+        server_id=server.id,
+        is_online=is_online,
+        players=players,
+        rank=rank,
+        uptime=100,
+        new_votes=new_votes,
+        votes_this_month=total_votes,
+        total_votes=total_votes,
+    )
+    data_point.created_at = created_at
+    session.add(data_point)
+
+
+def test_compact_server_history(
+    session,
+    server_colcraft: Server,
+    server_hypixel: Server,
+):
+    """Tests raw data points older than the retention period are removed and
+    their days are still served from the daily rollups"""
+
+    cutoff = get_compaction_cutoff()
+    old_day = cutoff - timedelta(days=3)
+
+    for hour in range(4):
+        _add_data_point(
+            session,
+            server_colcraft,
+            created_at=old_day + timedelta(hours=hour),
+        )
+
+    add_history_rollups(
+        db=session,
+        data_points=[
+            {
+                "server_id": server_colcraft.id,
+                "is_online": True,
+                "players": 10,
+                "rank": 1,
+                "uptime": 100,
+                "new_votes": 0,
+                "votes_this_month": 0,
+                "total_votes": 0,
+                "created_at": old_day,
+            }
+        ],
+    )
+
+    _add_data_point(session, server_colcraft, created_at=old_day - timedelta(days=1))
+    _add_data_point(session, server_hypixel, created_at=old_day)
+
+    # within the retention period
+    _add_data_point(session, server_colcraft, created_at=cutoff + timedelta(hours=1))
+    session.commit()
+
+    stats = compact_server_history(db=session, batch_size=1)
+
+    # one batch per server per day
+    assert stats.batches == 3
+    assert stats.rows_compacted == 6
+
+    assert (
+        session.query(ServerHistory).filter(ServerHistory.created_at < cutoff).count()
+        == 0
+    )
+    assert (
+        session.query(ServerHistory)
+        .filter(ServerHistory.server_id == server_colcraft.id)
+        .count()
+        == 1
+    )
+
+    daily = _get_rollup(session, ServerHistoryDaily, server_colcraft, old_day)
+    assert daily.data_points == 1
+    assert daily.max_players == 10
+
+    # nothing is left to compact
+    assert compact_server_history(db=session).batches == 0
+
+
+def test_compact_server_history_max_batches(
+    session,
+    server_colcraft: Server,
+):
+    """Tests a run can stop early and the next run carries on"""
+
+    cutoff = get_compaction_cutoff()
+
+    for days in range(1, 4):
+        _add_data_point(
+            session,
+            server_colcraft,
+            created_at=cutoff - timedelta(days=days),
+        )
+    session.commit()
+
+    assert compact_server_history(db=session, max_batches=2).batches == 2
+    assert compact_server_history(db=session).batches == 1
+    assert (
+        session.query(ServerHistory).filter(ServerHistory.created_at < cutoff).count()
+        == 0
+    )
+
+
+def test_get_compaction_cutoff():
+    """Tests the cutoff is the start of the month the retention period ends in"""
+
+    assert get_compaction_cutoff(datetime(2024, 3, 20, 8)) == datetime(2024, 2, 1)
+    assert get_compaction_cutoff(datetime(2024, 3, 31, 8)) == datetime(2024, 3, 1)
+
+
+def test_compact_server_history_drops_expired_partitions(
+    session,
+    server_colcraft: Server,
+):
+    """Tests monthly partitions before the cutoff are dropped instead of deleted
+    from"""
+
+    month = get_month_start(get_compaction_cutoff(), months=-2)
+
+    _add_data_point(session, server_colcraft, created_at=month)
+    _add_data_point(session, server_colcraft, created_at=month + timedelta(hours=1))
+    _add_data_point(session, server_colcraft, created_at=month + timedelta(days=1))
+    session.commit()
+
+    create_partition(db=session, table="server_history", month=month)
+
+    stats = compact_server_history(db=session)
+
+    assert stats.partitions_dropped == 1
+    assert stats.rows_compacted == 3
+
+    assert month not in [
+        partition.start
+        for partition in get_partitions(db=session, table="server_history")
+    ]
+
+
+def _get_rollup(session, rollup, server: Server, bucket: datetime):
+    return (
+        session.query(rollup)
+        .filter(
+            rollup.server_id == server.id,
+            rollup.bucket == bucket,
+        )
+        .one()
+    )
+
+
+def test_add_history_rollups(
+    session,
+    server_colcraft: Server,
+):
+    """Tests data points are added onto their hour and day buckets"""
+
+    day = get_bucket_start(datetime.utcnow(), "day") - timedelta(days=1)
+
+    data_points = [
+        {
+            "server_id": server_colcraft.id,
+            "is_online": players > 0,
+            "players": players,
+            "rank": rank,
+            "uptime": 90,
+            "new_votes": 1,
+            "votes_this_month": 5 + i,
+            "total_votes": 10 + i,
+            "created_at": day + timedelta(minutes=40 * i),
+        }
+        for i, (players, rank) in enumerate([(10, 3), (0, 4), (30, 2)])
+    ]
+
+    add_history_rollups(db=session, data_points=data_points[:2])
+    add_history_rollups(db=session, data_points=data_points[2:])
+    session.commit()
+
+    first_hour = _get_rollup(session, ServerHistoryHourly, server_colcraft, day)
+    assert first_hour.data_points == 2
+    assert first_hour.online_count == 1
+    assert first_hour.players_sum == 10
+    assert first_hour.min_players == 0
+    assert first_hour.max_players == 10
+    assert first_hour.best_rank == 3
+
+    daily = _get_rollup(session, ServerHistoryDaily, server_colcraft, day)
+    assert daily.data_points == 3
+    assert daily.online_count == 2
+    assert daily.players_sum == 40
+    assert daily.max_players == 30
+    assert daily.best_rank == 2
+    assert daily.uptime_sum == 270
+    assert daily.new_votes == 3
+    assert daily.votes_this_month == 7
+    assert daily.total_votes == 12
+    assert daily.p50_players is None
+
+
+def test_seal_history_rollups(
+    session,
+    server_colcraft: Server,
+):
+    """Tests closed buckets get their percentiles from the raw data points and the
+    current bucket is left open"""
+
+    now = datetime.utcnow()
+    last_hour = get_bucket_start(now, "hour") - timedelta(hours=1)
+
+    for minutes, players in enumerate([10, 20, 30, 40]):
+        _add_data_point(
+            session,
+            server_colcraft,
+            created_at=last_hour + timedelta(minutes=minutes),
+            players=players,
+        )
+    _add_data_point(session, server_colcraft, created_at=now, players=50)
+    session.commit()
+
+    rebuild_history_rollups(db=session, server_id=server_colcraft.id)
+    session.query(ServerHistoryHourly).update(
+        {"p50_players": None, "p95_players": None}
+    )
+    session.commit()
+
+    seal_history_rollups(
+        db=session,
+        now=get_bucket_start(now, "hour") + timedelta(hours=1),
+    )
+
+    sealed = _get_rollup(session, ServerHistoryHourly, server_colcraft, last_hour)
+    assert sealed.p50_players == 25
+    assert sealed.p95_players == 38.5
+
+    current = _get_rollup(
+        session,
+        ServerHistoryHourly,
+        server_colcraft,
+        get_bucket_start(now, "hour"),
+    )
+    assert current.p50_players is None
+
+    # sealing is only done once
+    assert seal_history_rollups(db=session) == 0
+
+
+def test_rebuild_history_rollups(
+    session,
+    server_colcraft: Server,
+    server_colcraft_history,
+):
+    """Tests the rollups rebuilt from the raw data points match the ones added as
+    the data points were written"""
+
+    rollups = session.query(ServerHistoryHourly).count()
+    session.query(ServerHistoryHourly).delete()
+
+    rebuild_history_rollups(db=session, server_id=server_colcraft.id)
+    session.commit()
+
+    assert session.query(ServerHistoryHourly).count() == rollups
+    assert (
+        session.query(func.sum(ServerHistoryHourly.data_points))
+        .filter(ServerHistoryHourly.server_id == server_colcraft.id)
+        .scalar()
+        == session.query(ServerHistory)
+        .filter(ServerHistory.server_id == server_colcraft.id)
+        .count()
+    )
+
+
+def test_prune_history_rollups(
+    session,
+    server_colcraft: Server,
+):
+    """Tests hourly rollups past their retention are deleted and daily rollups
+    are kept"""
+
+    old_day = get_hourly_rollup_cutoff() - timedelta(days=1)
+
+    add_history_rollups(
+        db=session,
+        data_points=[
+            {
+                "server_id": server_colcraft.id,
+                "is_online": True,
+                "players": 1,
+                "rank": 1,
+                "uptime": 100,
+                "new_votes": 0,
+                "votes_this_month": 0,
+                "total_votes": 0,
+                "created_at": old_day,
+            }
+        ],
+    )
+    session.commit()
+
+    assert prune_history_rollups(db=session) == 1
+    assert session.query(ServerHistoryHourly).count() == 0
+    assert session.query(ServerHistoryDaily).count() == 1
+
+
+def test_get_server_history_reads_rollups(
+    session,
+    server_colcraft: Server,
+    server_colcraft_history,
+):
+    """Tests closed buckets come from the rollups and the current bucket from the
+    raw data points"""
+
+    now = datetime.utcnow()
+
+    _add_data_point(session, server_colcraft, created_at=now, players=99)
+    session.commit()
+
+    history = server_service.get_server_history(
+        db=session,
+        server_id=server_colcraft.id,
+        time_interval="hour",
+    )
+
+    # the fixture's 4 days of 23 hours and the current hour
+    assert len(history) == 4 * 23 + 1
+    assert history[-1].date == get_bucket_start(now, "hour")
+    assert history[-1].players == 99
+    assert history[-1].p50_players == 99
+    assert all(a.date < b.date for a, b in zip(history, history[1:]))
+
+    daily_history = server_service.get_server_history(
+        db=session,
+        server_id=server_colcraft.id,
+        time_interval="day",
+    )
+
+    assert sum(1 for h in daily_history if h.date < get_bucket_start(now, "day")) > 0
+    assert daily_history[-1].date == get_bucket_start(now, "day")
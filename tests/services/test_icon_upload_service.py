@@ -0,0 +1,71 @@
+import threading
+from uuid import uuid4
+
+from msc.services.icon_upload_service import IconUploadQueue
+
+
+def test_icon_upload_queue_deduplicates_per_server(mocker):
+    """Tests only the latest icon queued for a server is uploaded"""
+
+    mocker.patch("msc.services.icon_upload_service.boto3.client")
+
+    release = threading.Event()
+    uploads = []
+
+    def _mock_upload(icon_base64, server_id, s3=None):
+        release.wait(timeout=5)
+        uploads.append((server_id, icon_base64))
+
+    mocker.patch(
+        "msc.services.icon_upload_service._upload_server_icon",
+        side_effect=_mock_upload,
+    )
+
+    upload_queue = IconUploadQueue(workers=1)
+
+    blocking_server_id = uuid4()
+    server_id = uuid4()
+
+    # the worker is kept busy so the next server's icons queue up behind it
+    upload_queue.enqueue(blocking_server_id, "a", "icon-a")
+
+    for i in range(5):
+        upload_queue.enqueue(server_id, f"checksum-{i}", f"icon-{i}")
+
+    assert upload_queue.depth == 2
+
+    release.set()
+    upload_queue.join()
+
+    assert uploads == [(blocking_server_id, "icon-a"), (server_id, "icon-4")]
+    assert upload_queue.depth == 0
+    assert upload_queue.stats.enqueued == 6
+    assert upload_queue.stats.deduplicated == 4
+    assert upload_queue.stats.uploaded == 2
+
+
+def test_icon_upload_queue_retries_with_backoff(mocker):
+    """Tests failed uploads are retried and given up on after the retries"""
+
+    mocker.patch("msc.services.icon_upload_service.boto3.client")
+    sleep = mocker.patch("msc.services.icon_upload_service.time.sleep")
+    upload = mocker.patch(
+        "msc.services.icon_upload_service._upload_server_icon",
+        side_effect=[Exception("slow down"), None, Exception("down")]
+        + [Exception("down")] * 3,
+    )
+
+    upload_queue = IconUploadQueue(workers=1, retries=3, backoff=1)
+
+    upload_queue.enqueue(uuid4(), "a", "icon-a")
+    upload_queue.join()
+
+    assert upload_queue.stats.uploaded == 1
+    assert upload_queue.stats.retried == 1
+
+    upload_queue.enqueue(uuid4(), "b", "icon-b")
+    upload_queue.join()
+
+    assert upload_queue.stats.failed == 1
+    assert upload.call_count == 6
+    assert [call.args[0] for call in sleep.call_args_list] == [1, 1, 2, 4]
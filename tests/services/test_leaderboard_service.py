@@ -0,0 +1,146 @@
+from datetime import datetime
+
+from msc.models import Server, ServerLeaderboard, Sponsor
+from msc.services import leaderboard_service, server_service, vote_service
+
+
+def _add_votes(session, server: Server, votes: int):
+    for i in range(votes):
+        vote_service.add_vote(
+            db=session,
+            server_id=server.id,
+            client_ip=f"127.0.1.{i}",
+            minecraft_username=f"leaderboard{i}",
+        )
+
+
+def test_leaderboard_ranks_match_computed_ranks(
+    session,
+    server_colcraft: Server,
+    server_colcraft_2: Server,
+    server_hypixel: Server,
+):
+    """Tests the leaderboard ranks sponsored servers first, shares ranks between
+    servers with as many votes and matches the rank window function"""
+
+    _add_votes(session, server_colcraft, 2)
+    _add_votes(session, server_hypixel, 2)
+
+    now = datetime.utcnow()
+    session.add(
+        Sponsor(
+            user_id=server_colcraft_2.user_id,
+            server_id=server_colcraft_2.id,
+            slot=1,
+            year=now.year,
+            month=now.month,
+        )
+    )
+    session.commit()
+
+    leaderboard = leaderboard_service.get_leaderboard(db=session)
+
+    assert leaderboard[0] == (server_colcraft_2.id, 1)
+    assert dict(leaderboard) == {
+        server_colcraft_2.id: 1,
+        server_colcraft.id: 2,
+        server_hypixel.id: 2,
+    }
+
+    for server in (server_colcraft, server_colcraft_2, server_hypixel):
+        assert leaderboard_service.get_server_rank(
+            db=session,
+            server=server,
+        ) == server_service.get_computed_server_rank(db=session, server=server)
+
+    assert leaderboard_service.verify_leaderboard(db=session) == []
+
+
+def test_get_leaderboard_limit(
+    session,
+    server_colcraft: Server,
+    server_hypixel: Server,
+):
+    """Tests the top servers are limited"""
+
+    _add_votes(session, server_colcraft, 2)
+    _add_votes(session, server_hypixel, 1)
+
+    assert leaderboard_service.get_leaderboard(db=session, limit=1) == [
+        (server_colcraft.id, 1),
+    ]
+
+
+def test_deleted_server_leaves_leaderboard(
+    session,
+    server_colcraft: Server,
+    server_hypixel: Server,
+):
+    """Tests a server flagged for deletion is removed from the leaderboard and the
+    servers behind it move up"""
+
+    _add_votes(session, server_colcraft, 2)
+    _add_votes(session, server_hypixel, 1)
+
+    server_service.delete_server(
+        db=session,
+        user_id=server_colcraft.user_id,
+        server_id=server_colcraft.id,
+    )
+
+    assert session.get(ServerLeaderboard, server_colcraft.id) is None
+    assert leaderboard_service.get_server_rank(db=session, server=server_hypixel) == 1
+    assert leaderboard_service.verify_leaderboard(db=session) == []
+
+
+def test_reconcile_leaderboard(
+    session,
+    server_colcraft: Server,
+    server_hypixel: Server,
+):
+    """Tests a leaderboard which differs from the computed ranks is rebuilt"""
+
+    _add_votes(session, server_colcraft, 1)
+    _add_votes(session, server_hypixel, 2)
+
+    session.query(ServerLeaderboard).filter(
+        ServerLeaderboard.server_id == server_hypixel.id,
+    ).delete()
+    session.commit()
+
+    assert leaderboard_service.reconcile_leaderboard(db=session) == 2
+    assert leaderboard_service.get_leaderboard(db=session) == [
+        (server_hypixel.id, 1),
+        (server_colcraft.id, 2),
+    ]
+    assert leaderboard_service.reconcile_leaderboard(db=session) == 0
+
+
+def test_get_ranks(
+    session,
+    server_colcraft: Server,
+    server_colcraft_2: Server,
+    server_hypixel: Server,
+):
+    """Tests the ranks of a page of servers match their single rank lookups"""
+
+    _add_votes(session, server_colcraft, 1)
+    _add_votes(session, server_hypixel, 2)
+
+    server_service.delete_server(
+        db=session,
+        user_id=server_colcraft_2.user_id,
+        server_id=server_colcraft_2.id,
+    )
+
+    servers = [server_colcraft, server_colcraft_2, server_hypixel]
+
+    assert leaderboard_service.get_ranks(db=session, servers=servers) == {
+        server.id: leaderboard_service.get_server_rank(db=session, server=server)
+        for server in servers
+    }
+    assert leaderboard_service.get_ranks(db=session, servers=servers) == {
+        server_colcraft.id: 2,
+        server_colcraft_2.id: None,
+        server_hypixel.id: 1,
+    }
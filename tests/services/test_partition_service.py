@@ -0,0 +1,116 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from msc.models import Server, Vote
+from msc.services.partition_service import (
+    Partition,
+    create_future_partitions,
+    create_partition,
+    drop_partition,
+    get_partitions,
+)
+
+
+def test_create_future_partitions(session):
+    """Tests partitions are created for the current month and the months ahead,
+    once"""
+
+    now = datetime(2100, 11, 15)
+
+    created = create_future_partitions(db=session, months=2, now=now)
+
+    assert sorted(created) == [
+        "server_history_2100_11",
+        "server_history_2100_12",
+        "server_history_2101_01",
+        "vote_2100_11",
+        "vote_2100_12",
+        "vote_2101_01",
+    ]
+    assert create_future_partitions(db=session, months=2, now=now) == []
+
+    partitions = get_partitions(db=session, table="vote")
+
+    assert partitions[-1].is_default
+    assert (
+        Partition(
+            name="vote_2100_12",
+            start=datetime(2100, 12, 1),
+            end=datetime(2101, 1, 1),
+        )
+        in partitions
+    )
+
+
+def test_create_partition_moves_default_rows(
+    session,
+    server_colcraft: Server,
+):
+    """Tests rows which landed in the default partition are moved into the
+    partition created for their month"""
+
+    vote = Vote(
+        server_id=server_colcraft.id,
+        client_ip_address="127.0.0.1",
+        minecraft_username="test",
+    )
+    vote.created_at = datetime(2099, 6, 10)
+    session.add(vote)
+    session.commit()
+
+    assert create_partition(db=session, table="vote", month=datetime(2099, 6, 20))
+
+    assert (
+        session.execute(
+            text("SELECT COUNT(*) FROM vote_2099_06 WHERE id = :id"),
+            {"id": vote.id},
+        ).scalar()
+        == 1
+    )
+    assert (
+        session.execute(
+            text("SELECT COUNT(*) FROM vote_default WHERE id = :id"),
+            {"id": vote.id},
+        ).scalar()
+        == 0
+    )
+    assert session.query(Vote).filter(Vote.id == vote.id).count() == 1
+
+
+def test_drop_partition(session):
+    """Tests a monthly partition can be dropped but the default partition cannot"""
+
+    create_partition(db=session, table="server_history", month=datetime(2099, 3, 1))
+
+    partitions = get_partitions(db=session, table="server_history")
+    partition = next(p for p in partitions if p.name == "server_history_2099_03")
+
+    drop_partition(db=session, partition=partition)
+
+    assert partition not in get_partitions(db=session, table="server_history")
+
+    with pytest.raises(ValueError):
+        drop_partition(db=session, partition=partitions[-1])
+
+
+def test_partition_table():
+    """Tests a partition's table is taken from its name"""
+
+    assert Partition(name="server_history_default").table == "server_history"
+    assert (
+        Partition(
+            name="server_history_2099_03",
+            start=datetime(2099, 3, 1),
+            end=datetime(2099, 4, 1),
+        ).table
+        == "server_history"
+    )
+
+
+def test_get_partitions_unknown_table(session):
+    """Tests only the partitioned tables can be managed"""
+
+    with pytest.raises(ValueError):
+        get_partitions(db=session, table="server")
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+
+from msc.models import PollCycle
+from msc.models.poll_cycle import PollCycleKind
+from msc.services.ping_service import PollCycleStats
+from msc.services.poll_cycle_service import (
+    get_poll_cycles,
+    record_poll_cycle,
+    record_skipped_run,
+    record_uptime_cycle,
+)
+
+
+def _stats() -> PollCycleStats:
+    return PollCycleStats(
+        servers=10,
+        probes_started=10,
+        probes_completed=9,
+        probes_timed_out=1,
+        duration_seconds=12.5,
+        metrics={
+            "outcomes": {
+                "ok": 7,
+                "timeout": 2,
+                "dns": 1,
+                "refused": 0,
+                "protocol_error": 0,
+            },
+            "probe": {"p50_ms": 50, "p95_ms": 250, "p99_ms": 1000},
+            "write": {"total_ms": 84.5},
+        },
+    )
+
+
+def test_record_poll_cycle(session):
+    """Tests a poll cycle is recorded from its stats along with any runs skipped
+    since the last cycle"""
+
+    record_skipped_run(PollCycleKind.POLL)
+    record_skipped_run(PollCycleKind.POLL)
+
+    started_at = datetime.utcnow() - timedelta(seconds=13)
+
+    cycle = record_poll_cycle(
+        db=session,
+        started_at=started_at,
+        stats=_stats(),
+        worker_id="worker-a",
+    )
+
+    assert cycle.kind == PollCycleKind.POLL
+    assert cycle.worker_id == "worker-a"
+    assert cycle.started_at == started_at
+    assert cycle.finished_at > started_at
+    assert cycle.servers_attempted == 10
+    assert cycle.servers_online == 7
+    assert cycle.servers_failed == 3
+    assert cycle.probe_p50_ms == 50
+    assert cycle.probe_p95_ms == 250
+    assert cycle.probe_p99_ms == 1000
+    assert cycle.write_ms == 84.5
+    assert cycle.skipped_overlaps == 2
+
+    # the skipped runs are only counted once
+    cycle = record_poll_cycle(
+        db=session,
+        started_at=datetime.utcnow(),
+        stats=_stats(),
+        worker_id="worker-a",
+    )
+
+    assert cycle.skipped_overlaps == 0
+
+
+def test_record_poll_cycle_drops_expired_cycles(session):
+    session.add(
+        PollCycle(
+            kind=PollCycleKind.POLL,
+            worker_id="worker-a",
+            started_at=datetime.utcnow() - timedelta(days=365),
+            finished_at=datetime.utcnow() - timedelta(days=365),
+        )
+    )
+    session.commit()
+
+    record_poll_cycle(
+        db=session,
+        started_at=datetime.utcnow(),
+        stats=_stats(),
+        worker_id="worker-a",
+    )
+
+    assert session.query(PollCycle).count() == 1
+
+
+def test_get_poll_cycles(session):
+    """Tests cycles are returned newest first and can be filtered by kind"""
+
+    now = datetime.utcnow()
+
+    record_poll_cycle(
+        db=session,
+        started_at=now - timedelta(minutes=2),
+        stats=_stats(),
+        worker_id="worker-a",
+    )
+    record_uptime_cycle(
+        db=session,
+        started_at=now - timedelta(minutes=1),
+        servers_attempted=10,
+        servers_failed=0,
+        write_ms=320.0,
+        worker_id="worker-a",
+    )
+    record_poll_cycle(
+        db=session,
+        started_at=now,
+        stats=_stats(),
+        worker_id="worker-a",
+    )
+
+    cycles = get_poll_cycles(db=session)
+
+    assert [cycle.started_at for cycle in cycles] == [
+        now,
+        now - timedelta(minutes=1),
+        now - timedelta(minutes=2),
+    ]
+
+    uptime_cycles = get_poll_cycles(db=session, kind=PollCycleKind.UPTIME)
+
+    assert len(uptime_cycles) == 1
+    assert uptime_cycles[0].servers_online is None
+    assert uptime_cycles[0].write_ms == 320.0
+
+    assert len(get_poll_cycles(db=session, since=now - timedelta(seconds=30))) == 1
+    assert len(get_poll_cycles(db=session, limit=2)) == 2
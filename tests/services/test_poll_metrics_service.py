@@ -0,0 +1,80 @@
+import asyncio
+import errno
+import socket
+
+from msc.services.ping_service import PollResult
+from msc.services.poll_metrics_service import (
+    Histogram,
+    PollMetrics,
+    ProbeOutcome,
+    ProbeStage,
+    classify_probe_error,
+)
+
+
+def test_classify_probe_error():
+    assert classify_probe_error(socket.gaierror()) == ProbeOutcome.DNS
+    assert classify_probe_error(TimeoutError()) == ProbeOutcome.TIMEOUT
+    assert classify_probe_error(asyncio.TimeoutError()) == ProbeOutcome.TIMEOUT
+    assert classify_probe_error(ConnectionRefusedError()) == ProbeOutcome.REFUSED
+    assert (
+        classify_probe_error(OSError(errno.EHOSTUNREACH, "No route to host"))
+        == ProbeOutcome.REFUSED
+    )
+    assert (
+        classify_probe_error(IOError("Received invalid status response packet."))
+        == ProbeOutcome.PROTOCOL_ERROR
+    )
+    assert classify_probe_error(ValueError()) == ProbeOutcome.PROTOCOL_ERROR
+
+
+def test_histogram_percentiles():
+    histogram = Histogram(bounds=(10, 100, 1000))
+
+    for value in [1] * 50 + [50] * 45 + [500] * 4 + [5000]:
+        histogram.observe(value)
+
+    assert histogram.count == 100
+    assert histogram.percentile(50) == 10
+    assert histogram.percentile(95) == 100
+    assert histogram.percentile(99) == 1000
+    assert histogram.percentile(100) == 5000
+
+
+def test_poll_metrics_summary():
+    """Tests poll results are aggregated by stage and outcome"""
+
+    metrics = PollMetrics()
+
+    metrics.record_result(
+        PollResult(
+            server_id=None,
+            is_online=True,
+            outcome=ProbeOutcome.OK,
+            lookup_ms=2,
+            status_ms=40,
+            latency_ms=35,
+        )
+    )
+    metrics.record_result(
+        PollResult(
+            server_id=None,
+            outcome=ProbeOutcome.TIMEOUT,
+            lookup_ms=3,
+        )
+    )
+    metrics.observe(ProbeStage.WRITE, 120)
+
+    summary = metrics.summary()
+
+    assert summary["outcomes"]["ok"] == 1
+    assert summary["outcomes"]["timeout"] == 1
+    assert summary["outcomes"]["dns"] == 0
+    assert summary["lookup"]["count"] == 2
+    assert summary["status"]["count"] == 1
+    assert summary["query"]["count"] == 0
+    assert summary["write"]["max_ms"] == 120
+    assert summary["write"]["total_ms"] == 120
+    assert summary["probe"]["count"] == 2
+    assert summary["probe"]["max_ms"] == 42
+    assert summary["server_latency"]["p50_ms"] == 50
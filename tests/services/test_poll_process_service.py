@@ -0,0 +1,41 @@
+from uuid import uuid4
+
+from msc.services.ping_service import PollTarget
+from msc.services.poll_process_service import _reset_pool, poll_servers_multiprocess
+
+
+def test_poll_servers_multiprocess():
+    """Tests every target is polled once across the processes and the results
+    come back through the one callback"""
+
+    # nothing listens on port 1, so every probe is refused straight away
+    targets = [
+        PollTarget(
+            server_id=uuid4(),
+            java_ip_address="127.0.0.1",
+            java_port=1,
+            bedrock_ip_address=None,
+            bedrock_port=None,
+            icon_checksum=None,
+        )
+        for _ in range(6)
+    ]
+
+    results = []
+
+    try:
+        stats = poll_servers_multiprocess(
+            targets=targets,
+            on_result=results.append,
+            processes=2,
+        )
+    finally:
+        _reset_pool()
+
+    assert stats.servers == 6
+    assert stats.probes_completed == 6
+    assert stats.probes_skipped == 0
+    assert sorted(result.server_id for result in results) == sorted(
+        target.server_id for target in targets
+    )
+    assert not any(result.is_online for result in results)
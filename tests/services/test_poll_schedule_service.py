@@ -0,0 +1,177 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from msc.config import config
+from msc.constants import POLL_HOT_RANK, POLL_STABLE_INTERVAL_MULTIPLIER
+from msc.services.poll_schedule_service import (
+    EPOCH,
+    get_next_poll,
+    get_poll_interval,
+    get_poll_slot,
+    get_slot_time,
+)
+
+
+def test_get_poll_interval_hot_and_unstable_servers():
+    """Tests hot listings and unstable servers are polled at the minimum interval"""
+
+    assert (
+        get_poll_interval(
+            is_online=True,
+            consecutive_failures=0,
+            uptime=100,
+            rank=POLL_HOT_RANK,
+        )
+        == config.poll_min_interval
+    )
+    assert (
+        get_poll_interval(
+            is_online=True,
+            consecutive_failures=0,
+            uptime=50,
+            rank=POLL_HOT_RANK + 1,
+        )
+        == config.poll_min_interval
+    )
+
+
+def test_get_poll_interval_stable_server():
+    """Tests stable servers are polled less often"""
+
+    assert get_poll_interval(
+        is_online=True,
+        consecutive_failures=0,
+        uptime=100,
+        rank=POLL_HOT_RANK + 1,
+    ) == min(
+        config.poll_min_interval * POLL_STABLE_INTERVAL_MULTIPLIER,
+        config.poll_max_interval,
+    )
+
+
+def test_get_poll_interval_offline_backoff():
+    """Tests offline servers back off exponentially up to the maximum interval"""
+
+    intervals = [
+        get_poll_interval(
+            is_online=False,
+            consecutive_failures=failures,
+            uptime=0,
+        )
+        for failures in range(1, 100)
+    ]
+
+    assert intervals[0] == config.poll_min_interval
+    assert intervals[1] == min(config.poll_min_interval * 2, config.poll_max_interval)
+    assert intervals == sorted(intervals)
+    assert intervals[-1] == config.poll_max_interval
+
+
+def test_get_next_poll():
+    """Tests the failure count is reset when a server comes back online"""
+
+    polled_at = datetime.utcnow()
+
+    failures, next_poll_at = get_next_poll(
+        is_online=False,
+        consecutive_failures=3,
+        uptime=0,
+        polled_at=polled_at,
+    )
+
+    assert failures == 4
+    assert next_poll_at == polled_at + timedelta(
+        seconds=get_poll_interval(is_online=False, consecutive_failures=4, uptime=0)
+    )
+
+    failures, next_poll_at = get_next_poll(
+        is_online=True,
+        consecutive_failures=4,
+        uptime=50,
+        polled_at=polled_at,
+    )
+
+    assert failures == 0
+    assert next_poll_at == polled_at + timedelta(seconds=config.poll_min_interval)
+
+
+def test_get_poll_slot_is_stable_and_spread():
+    """Tests a server keeps its slot and slots are spread across the interval"""
+
+    server_id = uuid4()
+
+    assert get_poll_slot(server_id) == get_poll_slot(str(server_id))
+
+    slots = [get_poll_slot(uuid4()) for _ in range(10000)]
+    buckets = [0] * 10
+
+    for slot in slots:
+        assert 0 <= slot < 1
+        buckets[int(slot * 10)] += 1
+
+    for bucket in buckets:
+        assert 800 < bucket < 1200
+
+
+def test_get_slot_time():
+    """Tests slot times are the next time after a given time on the server's
+    slot"""
+
+    server_id = uuid4()
+    interval = 900
+    after = datetime.utcnow()
+
+    slot_time = get_slot_time(server_id=server_id, interval=interval, after=after)
+
+    assert after < slot_time <= after + timedelta(seconds=interval)
+
+    offset = (slot_time - EPOCH).total_seconds() % interval
+    assert abs(offset - get_poll_slot(server_id) * interval) < 0.001
+
+    # a time on the slot moves on to the next slot
+    assert get_slot_time(
+        server_id=server_id,
+        interval=interval,
+        after=slot_time,
+    ) == slot_time + timedelta(seconds=interval)
+
+
+def test_get_next_poll_keeps_server_on_its_slot():
+    """Tests a server polled late in its slot is next polled one interval after
+    the slot, and a newly added server is moved onto its slot"""
+
+    server_id = uuid4()
+    interval = config.poll_min_interval
+
+    slot_time = get_slot_time(
+        server_id=server_id,
+        interval=interval,
+        after=datetime.utcnow(),
+    )
+
+    for delay in (0, 5, interval / 3):
+        _, next_poll_at = get_next_poll(
+            is_online=True,
+            consecutive_failures=0,
+            uptime=50,
+            polled_at=slot_time + timedelta(seconds=delay),
+            server_id=server_id,
+        )
+
+        assert next_poll_at == slot_time + timedelta(seconds=interval)
+
+    polled_at = datetime.utcnow()
+
+    _, next_poll_at = get_next_poll(
+        is_online=True,
+        consecutive_failures=0,
+        uptime=50,
+        polled_at=polled_at,
+        server_id=server_id,
+    )
+
+    assert (
+        polled_at + timedelta(seconds=interval / 2)
+        < next_poll_at
+        <= polled_at + timedelta(seconds=interval * 1.5)
+    )
@@ -0,0 +1,68 @@
+from uuid import uuid4
+
+from msc.services.ping_service import PollTarget
+from msc.services.poll_shard_service import HashRing, get_live_worker_ids, get_shard
+
+
+def _target() -> PollTarget:
+    return PollTarget(
+        server_id=uuid4(),
+        java_ip_address="127.0.0.1",
+        java_port=25565,
+        bedrock_ip_address=None,
+        bedrock_port=None,
+        icon_checksum=None,
+    )
+
+
+def test_hash_ring_shards_are_disjoint_and_balanced():
+    """Tests every key has exactly one owner and shards are roughly even"""
+
+    workers = ["worker-a", "worker-b", "worker-c"]
+    ring = HashRing(workers)
+
+    keys = [str(uuid4()) for _ in range(3000)]
+    owners = [ring.get_worker(key) for key in keys]
+
+    assert set(owners) == set(workers)
+
+    for worker in workers:
+        assert 500 < owners.count(worker) < 1500
+
+
+def test_hash_ring_rebalance_only_moves_leaving_workers_keys():
+    """Tests keys only move off a worker that leaves the ring"""
+
+    keys = [str(uuid4()) for _ in range(1000)]
+
+    before = HashRing(["worker-a", "worker-b", "worker-c"])
+    after = HashRing(["worker-a", "worker-b"])
+
+    for key in keys:
+        if before.get_worker(key) != "worker-c":
+            assert after.get_worker(key) == before.get_worker(key)
+
+
+def test_hash_ring_empty():
+    assert HashRing([]).get_worker("key") is None
+
+
+def test_get_shard(session):
+    """Tests live workers split the targets between them"""
+
+    targets = [_target() for _ in range(100)]
+
+    # worker b joins after worker a's first cycle
+    shard_a_alone = get_shard(db=session, targets=targets, worker_id="worker-a")
+    assert len(shard_a_alone) == 100
+
+    shard_b = get_shard(db=session, targets=targets, worker_id="worker-b")
+    shard_a = get_shard(db=session, targets=targets, worker_id="worker-a")
+
+    assert get_live_worker_ids(db=session) == ["worker-a", "worker-b"]
+
+    a_ids = {target.server_id for target in shard_a}
+    b_ids = {target.server_id for target in shard_b}
+
+    assert not a_ids & b_ids
+    assert len(a_ids | b_ids) == 100
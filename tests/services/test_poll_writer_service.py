@@ -0,0 +1,210 @@
+from datetime import datetime, timedelta
+
+from msc.models import Server, ServerHistory
+from msc.services import vote_service
+from msc.services.ping_service import PollResult
+from msc.services.poll_writer_service import (
+    PollResultWriter,
+    take_poll_snapshot,
+    write_poll_results,
+)
+
+
+def test_write_poll_results(
+    session,
+    server_colcraft: Server,
+    server_hypixel: Server,
+):
+    """Tests a batch of poll results is applied to servers and history"""
+
+    server_hypixel.max_players = 50
+    session.commit()
+
+    assert write_poll_results(
+        db=session,
+        results=[
+            PollResult(
+                server_id=server_colcraft.id,
+                is_online=True,
+                players=10,
+                max_players=20,
+                update_icon=True,
+                icon_checksum="checksum",
+            ),
+            PollResult(
+                server_id=server_hypixel.id,
+                is_online=False,
+            ),
+        ],
+    )
+
+    colcraft = session.query(Server).filter(Server.id == server_colcraft.id).one()
+    hypixel = session.query(Server).filter(Server.id == server_hypixel.id).one()
+
+    assert colcraft.is_online is True
+    assert colcraft.players == 10
+    assert colcraft.max_players == 20
+    assert colcraft.icon_checksum == "checksum"
+    assert colcraft.last_pinged_at is not None
+
+    # offline results leave the last known max players alone
+    assert hypixel.is_online is False
+    assert hypixel.players == 0
+    assert hypixel.max_players == 50
+
+    assert session.query(ServerHistory).count() == 2
+
+
+def test_write_poll_results_history_limited_to_one_per_minute(
+    session,
+    server_colcraft: Server,
+):
+    """Tests the writer keeps the 1 data point per 60 seconds limit"""
+
+    now = datetime.utcnow()
+
+    for polled_at in [now, now + timedelta(seconds=59), now + timedelta(seconds=61)]:
+        write_poll_results(
+            db=session,
+            results=[
+                PollResult(
+                    server_id=server_colcraft.id,
+                    is_online=True,
+                    players=1,
+                    max_players=20,
+                    polled_at=polled_at,
+                ),
+            ],
+        )
+
+    assert (
+        session.query(ServerHistory)
+        .filter(ServerHistory.server_id == server_colcraft.id)
+        .count()
+        == 2
+    )
+
+
+def test_poll_result_writer_group_commits(
+    session,
+    many_servers,
+):
+    """Tests the writer thread drains queued results in batches"""
+
+    writer = PollResultWriter(db=session, batch_size=10, flush_interval=5)
+    writer.start()
+
+    for server in many_servers["servers_list"]:
+        writer.submit(
+            PollResult(
+                server_id=server.id,
+                is_online=True,
+                players=1,
+                max_players=10,
+            )
+        )
+
+    writer.close()
+
+    assert writer.results_written == len(many_servers["servers_list"])
+    assert writer.batches_written == 10
+    assert session.query(Server).filter(Server.is_online == True).count() == len(
+        many_servers["servers_list"]
+    )
+
+
+def test_write_poll_results_schedules_next_poll(
+    session,
+    server_colcraft: Server,
+):
+    """Tests offline results back off the server's next poll time"""
+
+    now = datetime.utcnow()
+    next_poll_times = []
+
+    for i in range(3):
+        write_poll_results(
+            db=session,
+            results=[
+                PollResult(
+                    server_id=server_colcraft.id,
+                    is_online=False,
+                    polled_at=now,
+                ),
+            ],
+        )
+
+        server = session.query(Server).filter(Server.id == server_colcraft.id).one()
+        assert server.consecutive_poll_failures == i + 1
+        next_poll_times.append(server.next_poll_at)
+
+    assert next_poll_times == sorted(next_poll_times)
+
+    write_poll_results(
+        db=session,
+        results=[
+            PollResult(
+                server_id=server_colcraft.id,
+                is_online=True,
+                players=1,
+                max_players=20,
+                polled_at=now,
+            ),
+        ],
+    )
+
+    server = session.query(Server).filter(Server.id == server_colcraft.id).one()
+    assert server.consecutive_poll_failures == 0
+
+
+def test_write_poll_results_history_from_snapshot(
+    session,
+    server_colcraft: Server,
+):
+    """Tests history data points take ranks and vote counts from the snapshot"""
+
+    now = datetime.utcnow()
+
+    for i in range(3):
+        vote_service.add_vote(
+            db=session,
+            server_id=server_colcraft.id,
+            client_ip=f"127.0.0.{i}",
+            minecraft_username=f"test{i}",
+        )
+
+    write_poll_results(
+        db=session,
+        results=[PollResult(server_id=server_colcraft.id, polled_at=now)],
+        snapshot=take_poll_snapshot(db=session),
+    )
+
+    vote_service.add_vote(
+        db=session,
+        server_id=server_colcraft.id,
+        client_ip="127.0.0.10",
+        minecraft_username="test10",
+    )
+
+    write_poll_results(
+        db=session,
+        results=[
+            PollResult(
+                server_id=server_colcraft.id,
+                polled_at=now + timedelta(seconds=61),
+            )
+        ],
+        snapshot=take_poll_snapshot(db=session),
+    )
+
+    data_points = (
+        session.query(ServerHistory)
+        .filter(ServerHistory.server_id == server_colcraft.id)
+        .order_by(ServerHistory.created_at)
+        .all()
+    )
+
+    assert [d.rank for d in data_points] == [1, 1]
+    assert [d.total_votes for d in data_points] == [3, 4]
+    assert [d.votes_this_month for d in data_points] == [3, 4]
+    assert [d.new_votes for d in data_points] == [3, 1]
@@ -0,0 +1,132 @@
+from socket import gaierror
+from types import SimpleNamespace
+
+import dns.resolver
+import pytest
+
+from msc.services.resolver_service import ResolverCache, lookup_java_server
+
+
+class _MockAnswers(list):
+    """A list of answers shaped like a dnspython answer"""
+
+    def __init__(self, value, ttl=300):
+        super().__init__([value])
+        self.rrset = SimpleNamespace(ttl=ttl)
+
+
+@pytest.fixture
+def mock_monotonic(mocker):
+    clock = SimpleNamespace(now=1000.0)
+
+    mocker.patch(
+        "msc.services.resolver_service.time.monotonic",
+        side_effect=lambda: clock.now,
+    )
+
+    return clock
+
+
+def test_resolve_ip_is_cached_for_record_ttl(mocker, mock_monotonic):
+    """Tests an A record is cached until its TTL expires"""
+
+    resolve = mocker.patch(
+        "msc.services.resolver_service.dns.resolver.resolve",
+        return_value=_MockAnswers("1.2.3.4", ttl=120),
+    )
+
+    cache = ResolverCache(min_ttl=60, max_ttl=3600)
+
+    assert cache.resolve_ip("play.colcraft.com") == "1.2.3.4"
+    assert cache.resolve_ip("play.colcraft.com") == "1.2.3.4"
+    assert resolve.call_count == 1
+
+    mock_monotonic.now += 121
+
+    assert cache.resolve_ip("play.colcraft.com") == "1.2.3.4"
+    assert resolve.call_count == 2
+
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 2
+
+
+def test_resolve_ip_ttl_is_clamped(mocker, mock_monotonic):
+    """Tests a record TTL below the minimum TTL is raised to it"""
+
+    resolve = mocker.patch(
+        "msc.services.resolver_service.dns.resolver.resolve",
+        return_value=_MockAnswers("1.2.3.4", ttl=5),
+    )
+
+    cache = ResolverCache(min_ttl=60, max_ttl=3600)
+
+    cache.resolve_ip("play.colcraft.com")
+    mock_monotonic.now += 30
+    cache.resolve_ip("play.colcraft.com")
+
+    assert resolve.call_count == 1
+
+
+def test_resolve_ip_negative_cache(mocker, mock_monotonic):
+    """Tests NXDOMAIN is cached for the negative TTL"""
+
+    resolve = mocker.patch(
+        "msc.services.resolver_service.dns.resolver.resolve",
+        side_effect=dns.resolver.NXDOMAIN,
+    )
+
+    cache = ResolverCache(negative_ttl=300)
+
+    for _ in range(3):
+        with pytest.raises(gaierror):
+            cache.resolve_ip("gone.colcraft.com")
+
+    assert resolve.call_count == 1
+    assert cache.stats.negative_hits == 2
+
+    mock_monotonic.now += 301
+
+    with pytest.raises(gaierror):
+        cache.resolve_ip("gone.colcraft.com")
+
+    assert resolve.call_count == 2
+
+
+def test_resolve_ip_skips_ip_addresses(mocker):
+    """Tests ip addresses are never resolved"""
+
+    resolve = mocker.patch("msc.services.resolver_service.dns.resolver.resolve")
+
+    cache = ResolverCache()
+
+    assert cache.resolve_ip("192.168.1.100") == "192.168.1.100"
+    assert resolve.call_count == 0
+
+
+def test_lookup_java_server_uses_srv_record(mocker):
+    """Tests a java address without a port follows its SRV record and keeps the
+    host name for the handshake"""
+
+    srv_answer = SimpleNamespace(target="mc.colcraft.com.", port=25577)
+
+    def _mock_resolve(name, rdtype, lifetime=None):
+        if name == "_minecraft._tcp.colcraft.com":
+            return _MockAnswers(srv_answer)
+        if name == "mc.colcraft.com":
+            return _MockAnswers("1.2.3.4")
+        raise dns.resolver.NXDOMAIN
+
+    mocker.patch(
+        "msc.services.resolver_service.dns.resolver.resolve",
+        side_effect=_mock_resolve,
+    )
+    mocker.patch(
+        "msc.services.resolver_service.resolver_cache",
+        ResolverCache(),
+    )
+
+    server = lookup_java_server("colcraft.com")
+
+    assert server.address.host == "mc.colcraft.com"
+    assert server.address.port == 25577
+    assert server.ip == "1.2.3.4"
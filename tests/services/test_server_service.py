@@ -386,6 +386,9 @@ def _create_multiple_servers_for_pagination(session):
 
     session.commit()
 
+    # the votes were added directly, so they are counted by the reconciliation
+    vote_service.reconcile_server_vote_stats(db=session)
+
 
 def test_get_servers_pagination(session):
     """Tests getting servers with pagination"""
@@ -774,6 +777,13 @@ def test_get_server_rank(
     assert hypixel_rank == servers[1].rank
     assert colcraft_2_rank == servers[2].rank
 
+    # assert every rank is the same from the single ranks query
+    assert server_service.get_server_ranks(db=session) == {
+        server_colcraft.id: colcraft_rank,
+        server_hypixel.id: hypixel_rank,
+        server_colcraft_2.id: colcraft_2_rank,
+    }
+
 
 def test_get_server_history_by_hour(
     session,
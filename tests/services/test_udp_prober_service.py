@@ -0,0 +1,132 @@
+import asyncio
+import struct
+
+import pytest
+
+from msc.services.udp_prober_service import (
+    QUERY_TYPE_HANDSHAKE,
+    RAKNET_MAGIC,
+    RAKNET_UNCONNECTED_PING,
+    RAKNET_UNCONNECTED_PONG,
+    UdpProber,
+)
+
+pytest_plugins = ("pytest_asyncio",)
+
+BEDROCK_MOTD = (
+    "MCPE;Test Server;589;1.20.0;7;20;1234567890;World;Survival;1;19132;19133;"
+)
+
+
+class _FakeUdpServer(asyncio.DatagramProtocol):
+    """Answers RakNet unconnected pings and GameSpy4 queries"""
+
+    def __init__(self, drop_first: int = 0):
+        self.drop_first = drop_first
+        self.received = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        self.received += 1
+
+        if self.received <= self.drop_first:
+            return
+
+        if data[0] == RAKNET_UNCONNECTED_PING:
+            motd = BEDROCK_MOTD.encode()
+            reply = (
+                bytes([RAKNET_UNCONNECTED_PONG])
+                + data[1:9]
+                + bytes(8)
+                + RAKNET_MAGIC
+                + struct.pack(">H", len(motd))
+                + motd
+            )
+        elif data[2] == QUERY_TYPE_HANDSHAKE:
+            reply = bytes([QUERY_TYPE_HANDSHAKE]) + data[3:7] + b"9513307\x00"
+        else:
+            reply = (
+                bytes([0])
+                + data[3:7]
+                + b"splitnum\x00\x80\x00"
+                + b"hostname\x00A Minecraft Server\x00"
+                + b"gametype\x00SMP\x00game_id\x00MINECRAFT\x00"
+                + b"version\x001.20.1\x00plugins\x00\x00map\x00world\x00"
+                + b"numplayers\x002\x00maxplayers\x0020\x00"
+                + b"hostport\x0025565\x00hostip\x00127.0.0.1\x00\x00"
+                + b"\x01player_\x00\x00alice\x00bob\x00\x00"
+            )
+
+        self.transport.sendto(reply, addr)
+
+
+async def _start_fake_server(**kwargs):
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(
+        lambda: _FakeUdpServer(**kwargs),
+        local_addr=("127.0.0.1", 0),
+    )
+    return transport, protocol, transport.get_extra_info("sockname")[1]
+
+
+@pytest.mark.asyncio
+async def test_udp_prober_bedrock_status():
+    """Tests many pings share the prober's sockets and get their own replies"""
+
+    transport, _, port = await _start_fake_server()
+
+    try:
+        async with UdpProber(sockets=2) as prober:
+            statuses = await asyncio.gather(
+                *[prober.bedrock_status("127.0.0.1", port) for _ in range(50)]
+            )
+
+        assert len(statuses) == 50
+        assert all(status.players.online == 7 for status in statuses)
+        assert all(status.players.max == 20 for status in statuses)
+        assert prober.stats.replies_matched == 50
+        assert prober.stats.replies_unmatched == 0
+    finally:
+        transport.close()
+
+
+@pytest.mark.asyncio
+async def test_udp_prober_query():
+    """Tests the query handshake and full stat are matched by session id"""
+
+    transport, _, port = await _start_fake_server()
+
+    try:
+        async with UdpProber(sockets=1) as prober:
+            query = await prober.query("127.0.0.1", port)
+
+        assert query.players.online == 2
+        assert query.players.max == 20
+        assert query.players.names == ["alice", "bob"]
+        assert query.software.version == "1.20.1"
+    finally:
+        transport.close()
+
+
+@pytest.mark.asyncio
+async def test_udp_prober_retries_and_timeout():
+    """Tests lost packets are resent and unanswered probes time out"""
+
+    transport, protocol, port = await _start_fake_server(drop_first=1)
+
+    try:
+        async with UdpProber(sockets=1, timeout=0.2, retries=1, tick=0.05) as prober:
+            status = await prober.bedrock_status("127.0.0.1", port)
+            assert status.players.online == 7
+            assert protocol.received == 2
+
+            protocol.drop_first = 100
+
+            with pytest.raises(TimeoutError):
+                await prober.bedrock_status("127.0.0.1", port)
+
+            assert prober.stats.timeouts == 3
+    finally:
+        transport.close()
@@ -0,0 +1,224 @@
+from datetime import datetime, time, timedelta
+
+from msc.config import config
+from msc.models import Server, ServerUptimeBucket
+from msc.services.ping_service import PollResult
+from msc.services.poll_writer_service import write_poll_results
+from msc.services.uptime_service import (
+    add_uptime_seconds,
+    get_data_point_seconds,
+    rebuild_uptime_buckets,
+    refresh_uptimes,
+)
+
+
+def _get_bucket(session, server_id, day) -> ServerUptimeBucket:
+    return (
+        session.query(ServerUptimeBucket)
+        .filter(
+            ServerUptimeBucket.server_id == server_id,
+            ServerUptimeBucket.day == day,
+        )
+        .one()
+    )
+
+
+def test_get_data_point_seconds():
+    """Tests a data point stands for the time since the previous one, within the
+    poll intervals"""
+
+    now = datetime.utcnow()
+
+    assert get_data_point_seconds(now, None) == config.poll_min_interval
+    assert get_data_point_seconds(now, now - timedelta(seconds=1800)) == 1800
+    assert (
+        get_data_point_seconds(now, now - timedelta(days=3)) == config.poll_max_interval
+    )
+
+
+def test_add_uptime_seconds(
+    session,
+    server_colcraft: Server,
+):
+    """Tests the seconds data points stand for are added onto their day's
+    bucket"""
+
+    now = datetime.utcnow()
+
+    add_uptime_seconds(
+        db=session,
+        data_points=[
+            (server_colcraft.id, True, now, now - timedelta(seconds=600)),
+            (server_colcraft.id, False, now, now - timedelta(seconds=300)),
+            (
+                server_colcraft.id,
+                True,
+                now - timedelta(days=1),
+                now - timedelta(days=1, seconds=900),
+            ),
+        ],
+    )
+    add_uptime_seconds(
+        db=session,
+        data_points=[(server_colcraft.id, True, now, now - timedelta(seconds=100))],
+    )
+    session.commit()
+
+    today = _get_bucket(session, server_colcraft.id, now.date())
+    assert today.online_seconds == 700
+    assert today.total_seconds == 1000
+
+    yesterday = _get_bucket(
+        session, server_colcraft.id, (now - timedelta(days=1)).date()
+    )
+    assert yesterday.online_seconds == 900
+    assert yesterday.total_seconds == 900
+
+
+def test_refresh_uptimes(
+    session,
+    server_colcraft: Server,
+    server_hypixel: Server,
+):
+    """Tests every window's uptime is worked out from the buckets, and servers
+    without any data points have no uptime"""
+
+    now = datetime.utcnow()
+
+    data_points = [
+        # offline for the past day
+        (False, now),
+        # online for the days before
+        *((True, now - timedelta(days=3)) for _ in range(3)),
+        *((True, now - timedelta(days=10)) for _ in range(4)),
+        # outside the window
+        (False, now - timedelta(days=60)),
+    ]
+
+    add_uptime_seconds(
+        db=session,
+        data_points=[
+            (server_colcraft.id, is_online, created_at, created_at - timedelta(hours=1))
+            for is_online, created_at in data_points
+        ],
+    )
+    session.commit()
+
+    assert refresh_uptimes(db=session) >= 2
+
+    server_colcraft = (
+        session.query(Server).filter(Server.id == server_colcraft.id).one()
+    )
+    assert server_colcraft.uptime_24h == 0
+    assert server_colcraft.uptime_7d == 75.0
+    assert server_colcraft.uptime == 87.5
+
+    server_hypixel = session.query(Server).filter(Server.id == server_hypixel.id).one()
+    assert server_hypixel.uptime == 0
+    assert server_hypixel.uptime_24h == 0
+
+    # expired buckets are dropped
+    assert (
+        session.query(ServerUptimeBucket)
+        .filter(ServerUptimeBucket.day < (now - timedelta(days=31)).date())
+        .count()
+        == 0
+    )
+
+
+def test_refresh_uptimes_weights_backed_off_polls(
+    session,
+    server_colcraft: Server,
+):
+    """Tests a server online for 12 hours and offline for 12 hours has 50% uptime
+    though it was polled less often while offline"""
+
+    polled_at = datetime.utcnow() - timedelta(days=2)
+    data_points = []
+
+    # online servers are polled every half an hour, offline servers back off
+    for is_online, interval in [
+        *((True, 1800) for _ in range(24)),
+        *((False, interval) for interval in [900, 1800, 3600, 7200, 14400, 15300]),
+    ]:
+        data_points.append(
+            (
+                server_colcraft.id,
+                is_online,
+                polled_at + timedelta(seconds=interval),
+                polled_at,
+            )
+        )
+        polled_at += timedelta(seconds=interval)
+
+    add_uptime_seconds(db=session, data_points=data_points)
+    session.commit()
+
+    refresh_uptimes(db=session, server_id=server_colcraft.id)
+
+    server_colcraft = (
+        session.query(Server).filter(Server.id == server_colcraft.id).one()
+    )
+    assert server_colcraft.uptime == 50.0
+
+
+def test_rebuild_uptime_buckets(
+    session,
+    server_colcraft: Server,
+    server_colcraft_history,
+):
+    """Tests buckets are recounted from the history, each data point standing
+    for the time since the previous one"""
+
+    add_uptime_seconds(
+        db=session,
+        data_points=[(server_colcraft.id, False, datetime.utcnow(), None)],
+    )
+
+    rebuild_uptime_buckets(db=session, server_id=server_colcraft.id)
+    session.commit()
+
+    buckets = (
+        session.query(ServerUptimeBucket)
+        .filter(ServerUptimeBucket.server_id == server_colcraft.id)
+        .all()
+    )
+
+    # hourly data points with a two hour gap between days, the first standing
+    # for the minimum poll interval
+    total_seconds = config.poll_min_interval + 88 * 3600 + 3 * 7200
+
+    assert sum(bucket.total_seconds for bucket in buckets) == total_seconds
+    # offline at midday each day
+    assert sum(bucket.online_seconds for bucket in buckets) == total_seconds - 4 * 3600
+
+
+def test_write_poll_results_counts_uptime(
+    session,
+    server_colcraft: Server,
+):
+    """Tests written data points are added into the uptime buckets, each for the
+    time since the server's previous data point"""
+
+    midday = datetime.combine(datetime.utcnow().date(), time(12))
+
+    for is_online, polled_at in [
+        (True, midday),
+        (False, midday + timedelta(seconds=1800)),
+    ]:
+        write_poll_results(
+            db=session,
+            results=[
+                PollResult(
+                    server_id=server_colcraft.id,
+                    is_online=is_online,
+                    players=1 if is_online else 0,
+                    max_players=20,
+                    polled_at=polled_at,
+                ),
+            ],
+        )
+
+    bucket = _get_bucket(session, server_colcraft.id, midday.date())
+    assert bucket.online_seconds == config.poll_min_interval
+    assert bucket.total_seconds == config.poll_min_interval + 1800
@@ -3,8 +3,8 @@ from datetime import datetime, timedelta
 import freezegun
 import pytest
 
-from msc.errors import NotFound
-from msc.models import Server, Vote
+from msc.errors import NotFound, TooManyRequests
+from msc.models import Server, ServerVoteStats, Vote, VoteCooldown
 from msc.services import server_service, vote_service
 
 
@@ -73,6 +73,85 @@ def test_one_vote_per_visitor_per_server_24_hours(session, server_colcraft: Serv
     assert session.query(Vote).count() == 2
 
 
+def test_one_vote_per_minecraft_username_per_server_24_hours(
+    session,
+    server_colcraft: Server,
+):
+    """Tests a Minecraft user can only vote once a day from any IP address"""
+
+    vote_service.add_vote(
+        db=session,
+        server_id=server_colcraft.id,
+        client_ip="127.0.0.1",
+        minecraft_username="test",
+    )
+
+    with pytest.raises(TooManyRequests) as e:
+        vote_service.add_vote(
+            db=session,
+            server_id=server_colcraft.id,
+            client_ip="127.0.0.2",
+            minecraft_username="test",
+        )
+
+    assert (
+        str(e.value)
+        == "That Minecraft user has already voted for this server in the last 24 hours"
+    )
+    assert session.query(Vote).count() == 1
+
+
+def test_rejected_vote_claims_no_cooldown(session, server_colcraft: Server):
+    """Tests a vote rejected for its IP address leaves its Minecraft username free
+    to vote"""
+
+    vote_service.add_vote(
+        db=session,
+        server_id=server_colcraft.id,
+        client_ip="127.0.0.1",
+        minecraft_username="test",
+    )
+
+    with pytest.raises(TooManyRequests):
+        vote_service.add_vote(
+            db=session,
+            server_id=server_colcraft.id,
+            client_ip="127.0.0.1",
+            minecraft_username="alan",
+        )
+
+    vote_service.add_vote(
+        db=session,
+        server_id=server_colcraft.id,
+        client_ip="127.0.0.2",
+        minecraft_username="alan",
+    )
+
+    assert session.query(Vote).count() == 2
+    assert session.query(VoteCooldown).count() == 4
+
+
+def test_prune_vote_cooldowns(session, server_colcraft: Server):
+    """Tests only expired vote cooldowns are pruned"""
+
+    vote_service.add_vote(
+        db=session,
+        server_id=server_colcraft.id,
+        client_ip="127.0.0.1",
+        minecraft_username="test",
+    )
+
+    assert vote_service.prune_vote_cooldowns(db=session) == 0
+    assert (
+        vote_service.prune_vote_cooldowns(
+            db=session,
+            now=datetime.utcnow() + timedelta(hours=24),
+        )
+        == 2
+    )
+    assert session.query(VoteCooldown).count() == 0
+
+
 def test_vote_for_server_flagged_for_deletion(session, server_colcraft: Server):
     """Tests adding a vote for a server flagged for deletion"""
 
@@ -95,3 +174,87 @@ def test_vote_for_server_flagged_for_deletion(session, server_colcraft: Server):
             client_ip="1.1.1.1",
             minecraft_username="test",
         )
+
+
+def test_get_vote_counts(
+    session,
+    server_colcraft: Server,
+    votes_colcraft_20_last_month,
+    votes_colcraft_20_this_month,
+):
+    """Tests the total and monthly vote counts kept by the vote counters"""
+
+    vote_counts = vote_service.get_vote_counts(db=session)
+
+    assert list(vote_counts.keys()) == [server_colcraft.id]
+    assert vote_counts[server_colcraft.id].total_votes == 40
+    assert vote_counts[server_colcraft.id].votes_this_month == 20
+
+
+def test_vote_counters_roll_over_at_month_start(session, server_colcraft: Server):
+    """Tests the first vote of a month restarts the votes this month counter"""
+
+    with freezegun.freeze_time(datetime(2099, 5, 31, 23)):
+        vote_service.add_vote(
+            db=session,
+            server_id=server_colcraft.id,
+            client_ip="127.0.0.1",
+            minecraft_username="test",
+        )
+
+    with freezegun.freeze_time(datetime(2099, 6, 1, 23)):
+        vote_service.add_vote(
+            db=session,
+            server_id=server_colcraft.id,
+            client_ip="127.0.0.1",
+            minecraft_username="test",
+        )
+
+        assert vote_service.get_total_votes(db=session, server=server_colcraft) == 2
+        assert (
+            vote_service.get_votes_this_month(db=session, server=server_colcraft) == 1
+        )
+
+
+def test_reconcile_server_vote_stats(
+    session,
+    server_colcraft: Server,
+    votes_colcraft_20_this_month,
+):
+    """Tests the reconciliation corrects vote counters which drifted from the
+    vote table"""
+
+    assert vote_service.reconcile_server_vote_stats(db=session) == 0
+
+    vote = Vote(
+        server_id=server_colcraft.id,
+        client_ip_address="127.0.1.1",
+        minecraft_username="uncounted",
+    )
+    session.add(vote)
+    session.commit()
+
+    assert vote_service.reconcile_server_vote_stats(db=session) == 1
+
+    vote_counts = vote_service.get_vote_counts(db=session)
+
+    assert vote_counts[server_colcraft.id].total_votes == 21
+    assert vote_counts[server_colcraft.id].votes_this_month == 21
+
+
+def test_reconcile_server_vote_stats_rolls_over_months(
+    session,
+    server_colcraft: Server,
+    votes_colcraft_20_this_month,
+):
+    """Tests the reconciliation rolls over the counters of earlier months"""
+
+    next_month = datetime.utcnow() + timedelta(days=32)
+
+    assert vote_service.reconcile_server_vote_stats(db=session, now=next_month) == 0
+
+    stats = session.get(ServerVoteStats, server_colcraft.id)
+
+    assert stats.total_votes == 20
+    assert stats.votes_this_month == 0
+    assert stats.month_start == datetime(next_month.year, next_month.month, 1)
@@ -0,0 +1,195 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from msc.constants import VOTIFIER_CLAIM_LEASE, VOTIFIER_MAX_ATTEMPTS
+from msc.models import Server, VotifierDelivery
+from msc.models.votifier_delivery import VotifierDeliveryStatus
+from msc.services import vote_service, votifier_service
+from msc.services.votifier_service import (
+    VotifierOutboxWorker,
+    claim_votifier_deliveries,
+    get_delivery_backoff,
+    get_votifier_client,
+    prune_votifier_deliveries,
+    save_delivery_results,
+)
+
+
+def _add_votes(session, server: Server, count: int = 1):
+    return [
+        vote_service.add_vote(
+            db=session,
+            server_id=server.id,
+            client_ip=f"127.0.0.{i}",
+            minecraft_username=f"test{i}",
+        )
+        for i in range(count)
+    ]
+
+
+def test_add_vote_queues_votifier_delivery(
+    session,
+    server_colcraft_votifier: Server,
+    mocker,
+):
+    """Tests a vote for a server using votifier is queued for delivery and the
+    worker is notified"""
+
+    notify = mocker.patch.object(votifier_service.votifier_outbox_worker, "notify")
+
+    (vote,) = _add_votes(session, server_colcraft_votifier)
+
+    delivery = session.query(VotifierDelivery).one()
+
+    assert delivery.vote_id == vote.id
+    assert delivery.server_id == server_colcraft_votifier.id
+    assert delivery.minecraft_username == "test0"
+    assert delivery.client_ip_address == "127.0.0.0"
+    assert delivery.status == VotifierDeliveryStatus.PENDING
+    assert delivery.attempts == 0
+    notify.assert_called_once()
+
+
+def test_add_vote_without_votifier(session, server_colcraft: Server):
+    """Tests no delivery is queued for a server not using votifier"""
+
+    _add_votes(session, server_colcraft)
+
+    assert session.query(VotifierDelivery).count() == 0
+
+
+def test_claim_votifier_deliveries(session, server_colcraft_votifier: Server):
+    """Tests claimed deliveries are hidden until their claim lease runs out"""
+
+    _add_votes(session, server_colcraft_votifier)
+
+    now = datetime.utcnow()
+
+    (target,) = claim_votifier_deliveries(db=session, now=now)
+
+    assert target.attempts == 1
+    assert target.host == "127.0.0.1"
+    assert target.port == 8192
+    assert target.key == "votifier-token"
+    assert claim_votifier_deliveries(db=session, now=now) == []
+
+    after_lease = now + timedelta(seconds=VOTIFIER_CLAIM_LEASE + 1)
+
+    (target,) = claim_votifier_deliveries(db=session, now=after_lease)
+
+    assert target.attempts == 2
+
+
+def test_save_delivery_results(session, server_colcraft_votifier: Server):
+    """Tests failed deliveries are retried with backoff until they run out of
+    attempts"""
+
+    _add_votes(session, server_colcraft_votifier, count=2)
+
+    now = datetime.utcnow()
+    delivered, failed = claim_votifier_deliveries(db=session, now=now)
+
+    save_delivery_results(
+        db=session,
+        results=[(delivered, None), (failed, "ConnectionRefusedError: ")],
+        now=now,
+    )
+
+    delivered_row = session.get(VotifierDelivery, delivered.id)
+    failed_row = session.get(VotifierDelivery, failed.id)
+
+    assert delivered_row.status == VotifierDeliveryStatus.DELIVERED
+    assert delivered_row.delivered_at == now
+    assert failed_row.status == VotifierDeliveryStatus.PENDING
+    assert failed_row.next_attempt_at == now + timedelta(
+        seconds=get_delivery_backoff(1)
+    )
+    assert failed_row.last_error == "ConnectionRefusedError: "
+
+    failed.attempts = VOTIFIER_MAX_ATTEMPTS
+
+    save_delivery_results(
+        db=session,
+        results=[(failed, "ConnectionRefusedError: ")],
+        now=now,
+    )
+
+    session.refresh(failed_row)
+
+    assert failed_row.status == VotifierDeliveryStatus.FAILED
+
+
+def test_get_delivery_backoff():
+    """Tests the backoff doubles for every attempt up to the maximum"""
+
+    assert get_delivery_backoff(1) == 30
+    assert get_delivery_backoff(2) == 60
+    assert get_delivery_backoff(3) == 120
+    assert get_delivery_backoff(100) == 3600
+
+
+def test_get_votifier_client():
+    """Tests clients are reused until a server's votifier settings change"""
+
+    server_id = "2bd7a1f4-58c4-4d4e-9a6a-0f3b9e1d2c77"
+
+    client = get_votifier_client(server_id, "127.0.0.1", 8192, "token")
+
+    assert get_votifier_client(server_id, "127.0.0.1", 8192, "token") is client
+    assert get_votifier_client(server_id, "127.0.0.1", 8192, "other") is not client
+
+
+@pytest.mark.asyncio
+async def test_votifier_outbox_worker_drain(
+    session,
+    server_colcraft_votifier: Server,
+    mocker,
+):
+    """Tests a batch is delivered concurrently within the limit per host"""
+
+    _add_votes(session, server_colcraft_votifier, count=6)
+
+    in_flight = 0
+    max_in_flight = 0
+
+    async def _send_vote(**kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+
+        await asyncio.sleep(0.01)
+
+        in_flight -= 1
+
+    mocker.patch("msc.services.votifier_service.send_vote", new=_send_vote)
+
+    worker = VotifierOutboxWorker(host_concurrency=2)
+
+    assert await worker.drain(db=session) == 6
+    assert await worker.drain(db=session) == 0
+
+    assert max_in_flight == 2
+    assert worker.metrics.delivered == 6
+    assert worker.metrics.lag.count == 6
+    assert (
+        session.query(VotifierDelivery)
+        .filter(VotifierDelivery.status == VotifierDeliveryStatus.DELIVERED)
+        .count()
+        == 6
+    )
+
+
+def test_prune_votifier_deliveries(session, server_colcraft_votifier: Server):
+    """Tests only finished deliveries past their retention are pruned"""
+
+    _add_votes(session, server_colcraft_votifier, count=2)
+
+    now = datetime.utcnow()
+    delivered, _ = claim_votifier_deliveries(db=session, now=now)
+    save_delivery_results(db=session, results=[(delivered, None)], now=now)
+
+    assert prune_votifier_deliveries(db=session) == 0
+    assert prune_votifier_deliveries(db=session, now=now + timedelta(days=8)) == 1
+    assert session.query(VotifierDelivery).count() == 1
@@ -1,4 +1,7 @@
+import asyncio
+from datetime import datetime, timedelta
 from socket import gaierror
+from uuid import uuid4
 
 import pytest
 from mcstatus.querier import QueryResponse
@@ -14,14 +17,18 @@ from mcstatus.status_response import (
 
 from msc.models import Server, User
 from msc.services import server_service
+from msc.services.icon_upload_service import _upload_server_icon
 from msc.services.ping_service import (
+    PollResult,
+    PollTarget,
+    _get_poll_targets,
     _poll_servers_aynsc_batch,
-    _upload_server_icon,
     poll_bedrock_server,
     poll_bedrock_server_async,
     poll_java_server,
     poll_java_server_async,
 )
+from msc.services.poll_writer_service import PollResultWriter
 
 pytest_plugins = ("pytest_asyncio",)
 
@@ -86,7 +93,7 @@ def test_poll_java_server_no_query(
 
     # mock java server status and query
     mocker.patch(
-        "msc.services.ping_service.JavaServer.status",
+        "msc.services.resolver_service.ResolvedJavaServer.status",
         return_value=mocked_status_response,
     )
 
@@ -165,12 +172,12 @@ def test_poll_java_server_with_query(
 
     # mock java server status and query
     mocker.patch(
-        "msc.services.ping_service.JavaServer.status",
+        "msc.services.resolver_service.ResolvedJavaServer.status",
         side_effect=TimeoutError,
     )
 
     mocker.patch(
-        "msc.services.ping_service.JavaServer.query",
+        "msc.services.resolver_service.ResolvedJavaServer.query",
         return_value=mocked_query_response,
     )
 
@@ -239,7 +246,7 @@ def test_poll_bedrock_server(session, user_jack: User, mocker):
 
     # mock bedrock server status
     mocker.patch(
-        "msc.services.ping_service.BedrockServer.status",
+        "msc.services.resolver_service.BedrockServer.status",
         return_value=mocked_bedrock_status_response,
     )
 
@@ -287,12 +294,12 @@ def test_poll_java_server_go_offline(session, user_jack: User, mocker):
 
     # mock java server status and query with TimeoutError
     mocker.patch(
-        "msc.services.ping_service.JavaServer.status",
+        "msc.services.resolver_service.ResolvedJavaServer.status",
         side_effect=TimeoutError,
     )
 
     mocker.patch(
-        "msc.services.ping_service.JavaServer.query",
+        "msc.services.resolver_service.ResolvedJavaServer.query",
         side_effect=TimeoutError,
     )
 
@@ -338,7 +345,7 @@ def test_bedrock_server_go_offline(session, user_jack: User, mocker):
 
     # mock bedrock server status with TimeoutError
     mocker.patch(
-        "msc.services.ping_service.BedrockServer.status",
+        "msc.services.resolver_service.BedrockServer.status",
         side_effect=TimeoutError,
     )
 
@@ -382,12 +389,12 @@ def test_poll_java_server_invalid_ip(session, user_jack: User, mocker):
 
     # mock java server status and query with gaierror
     mocker.patch(
-        "msc.services.ping_service.JavaServer.status",
+        "msc.services.resolver_service.ResolvedJavaServer.status",
         side_effect=gaierror,
     )
 
     mocker.patch(
-        "msc.services.ping_service.JavaServer.query",
+        "msc.services.resolver_service.ResolvedJavaServer.query",
         side_effect=gaierror,
     )
 
@@ -426,7 +433,7 @@ def test_poll_bedrock_server_invalid_ip(session, user_jack: User, mocker):
 
     # mock bedrock server status with gaierror
     mocker.patch(
-        "msc.services.ping_service.BedrockServer.status",
+        "msc.services.resolver_service.BedrockServer.status",
         side_effect=gaierror,
     )
 
@@ -495,15 +502,26 @@ async def test_poll_servers_async(
 
     # mock java server status and query
     mocker.patch(
-        "msc.services.ping_service.JavaServer.async_status",
+        "msc.services.resolver_service.ResolvedJavaServer.async_status",
         return_value=mocked_status_response,
     )
 
-    await _poll_servers_aynsc_batch(
-        db=session,
-        servers=many_servers["servers_list"],
+    writer = PollResultWriter(db=session)
+    writer.start()
+
+    stats = await _poll_servers_aynsc_batch(
+        targets=[PollTarget.from_server(s) for s in many_servers["servers_list"]],
+        on_result=writer.submit,
     )
 
+    writer.close()
+
+    assert writer.results_written == len(many_servers["servers_list"])
+    assert stats.servers == len(many_servers["servers_list"])
+    assert stats.probes_completed == len(many_servers["servers_list"])
+    assert stats.probes_timed_out == 0
+    assert stats.probes_skipped == 0
+
     # get the servers again
     servers = session.query(Server).all()
 
@@ -515,6 +533,95 @@ async def test_poll_servers_async(
         assert server.icon_checksum is not None
 
 
+def test_get_poll_targets_due_only(
+    session,
+    server_colcraft: Server,
+    server_hypixel: Server,
+):
+    """Tests only servers whose next poll time has passed are due"""
+
+    server_colcraft.next_poll_at = datetime.utcnow() - timedelta(minutes=1)
+    server_hypixel.next_poll_at = datetime.utcnow() + timedelta(minutes=15)
+    session.commit()
+
+    targets = _get_poll_targets(db=session, due_only=True)
+
+    assert [target.server_id for target in targets] == [server_colcraft.id]
+    assert len(_get_poll_targets(db=session)) == 2
+
+
+@pytest.mark.asyncio
+async def test_poll_servers_async_slow_probe_does_not_block_window(mocker):
+    """Test a slow probe only occupies its own slot in the sliding window"""
+
+    slow_server = PollTarget(server_id=uuid4())
+    fast_servers = [PollTarget(server_id=uuid4()) for _ in range(10)]
+    polled = []
+
+    async def _mock_poll_server_async(target, udp_prober=None):
+        if target is slow_server:
+            await asyncio.sleep(0.5)
+        else:
+            await asyncio.sleep(0.01)
+
+        polled.append(target)
+
+        return PollResult(server_id=target.server_id, is_online=True)
+
+    mocker.patch(
+        "msc.services.ping_service.poll_server_async",
+        side_effect=_mock_poll_server_async,
+    )
+
+    results = []
+
+    stats = await _poll_servers_aynsc_batch(
+        targets=[slow_server, *fast_servers],
+        on_result=results.append,
+        concurrency=2,
+        probe_timeout=1,
+        cycle_timeout=5,
+    )
+
+    # all fast servers finish on the second slot before the slow server does
+    assert polled[-1] is slow_server
+    assert len(results) == 11
+    assert stats.probes_completed == 11
+    assert stats.duration_seconds < 0.5 + 0.01 * 10
+    assert stats.probes_per_second > 0
+
+
+@pytest.mark.asyncio
+async def test_poll_servers_async_deadlines(mocker):
+    """Test the per probe and per cycle deadlines"""
+
+    targets = [PollTarget(server_id=uuid4()) for _ in range(4)]
+
+    async def _mock_poll_server_async(target, udp_prober=None):
+        await asyncio.sleep(10)
+
+    mocker.patch(
+        "msc.services.ping_service.poll_server_async",
+        side_effect=_mock_poll_server_async,
+    )
+
+    results = []
+
+    stats = await _poll_servers_aynsc_batch(
+        targets=targets,
+        on_result=results.append,
+        concurrency=2,
+        probe_timeout=0.1,
+        cycle_timeout=0.15,
+    )
+
+    # the first two probes time out, the next two are abandoned by the cycle deadline
+    assert [r.is_online for r in results] == [False, False]
+    assert stats.probes_timed_out == 2
+    assert stats.probes_completed == 0
+    assert stats.probes_skipped == 2
+
+
 # def test_poll_bedrock_servers_async(many_servers):
 #     """Test poll servers async function"""
 #     pass
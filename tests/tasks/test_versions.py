@@ -1,6 +1,9 @@
+from datetime import datetime
+
 from msc.jobs.tasks import _get_minecraft_versions, set_all_minecraft_versions
 from msc.models import MinecraftVersion
-from msc.services.version_service import process_version_from_ping
+from msc.models.minecraft_version import VersionType
+from msc.services.version_service import VersionResolver, process_version_from_ping
 
 
 def test_get_minecraft_versions():
@@ -51,3 +54,65 @@ def test_process_version_from_ping(session):
         )
 
     print(1)
+
+
+def _version(version: str, release_time: datetime, is_latest: bool = False):
+    return MinecraftVersion(
+        version=version,
+        is_latest=is_latest,
+        type=VersionType.RELEASE,
+        release_time=release_time,
+    )
+
+
+def test_version_resolver():
+    """Tests the in-memory resolver matches the database lookups"""
+
+    resolver = VersionResolver(cache_size=2)
+    resolver.set_versions(
+        [
+            _version("1.19.4", datetime(2023, 3, 14)),
+            _version("1.20", datetime(2023, 6, 7)),
+            _version("1.20.1", datetime(2023, 6, 12)),
+            _version("1.20.2", datetime(2023, 9, 21), is_latest=True),
+            _version("1.2.5", datetime(2012, 3, 30)),
+        ]
+    )
+
+    assert resolver.resolve(db=None, raw_version="1.19.4") == "1.19.4"
+    assert resolver.resolve(db=None, raw_version="Paper 1.20.1") == "1.20.1"
+    assert resolver.resolve(db=None, raw_version="Velocity 1.7.2-1.20.1") == "1.20.1"
+    assert resolver.resolve(db=None, raw_version="BungeeCord 1.8.x-1.20.x") == "1.20.2"
+    assert resolver.resolve(db=None, raw_version="Escanor") == "1.20.2"
+
+    # cached lookups are answered without resolving again
+    assert resolver.resolve(db=None, raw_version="Escanor") == "1.20.2"
+    assert resolver.stats.hits == 1
+    assert resolver.stats.misses == 5
+
+    # the cache is bounded, the least recently used version is evicted
+    assert len(resolver._cache) == 2
+    assert "1.19.4" not in resolver._cache
+
+
+def test_version_resolver_reloads(session):
+    """Tests the resolver reloads the version table after it is invalidated"""
+
+    resolver = VersionResolver()
+
+    session.query(MinecraftVersion).delete()
+    session.add(_version("1.20.1", datetime(2023, 6, 12), is_latest=True))
+    session.commit()
+
+    assert resolver.resolve(db=session, raw_version="Paper 1.20.2") == "1.20.1"
+
+    session.add(_version("1.20.2", datetime(2023, 9, 21)))
+    session.commit()
+
+    # still answered from the cache until the resolver is invalidated
+    assert resolver.resolve(db=session, raw_version="Paper 1.20.2") == "1.20.1"
+
+    resolver.invalidate()
+
+    assert resolver.resolve(db=session, raw_version="Paper 1.20.2") == "1.20.2"
+    assert resolver.stats.reloads == 2
@@ -0,0 +1,105 @@
+"""
+Captures the statements a block of code runs and explains them, so tests can
+assert the hot queries keep using their indexes as the data grows.
+"""
+
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, List, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+
+# monthly partitions are named after their table, scans of them count as scans of
+# the partitioned table
+PARTITION_NAME = re.compile(r"^(.+)_(\d{4}_\d{2}|default)$")
+
+EXPLAIN_PREFIX = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) "
+
+
+@dataclass
+class QueryPlan:
+    statement: str
+    plan: dict
+
+    def get_nodes(self) -> List[dict]:
+        """Gets every node of the plan, including the plans of subqueries"""
+
+        nodes = []
+        pending = [self.plan]
+
+        while pending:
+            node = pending.pop()
+            nodes.append(node)
+            pending.extend(node.get("Plans", []))
+
+        return nodes
+
+    def get_scans(self) -> List[Tuple[str, dict]]:
+        """Gets every scan of a table and the table it reads"""
+
+        scans = []
+
+        for node in self.get_nodes():
+            if "Relation Name" not in node:
+                continue
+
+            table = node["Relation Name"]
+            match = PARTITION_NAME.match(table)
+
+            scans.append((match.group(1) if match else table, node))
+
+        return scans
+
+    def get_seq_scans(self) -> Set[str]:
+        """Gets the tables read by a sequential scan"""
+
+        return {
+            table for table, node in self.get_scans() if node["Node Type"] == "Seq Scan"
+        }
+
+    @property
+    def shared_buffers(self) -> int:
+        """The shared buffers hit or read while executing the statement, the top
+        node includes every node below it"""
+
+        return self.plan["Shared Hit Blocks"] + self.plan["Shared Read Blocks"]
+
+
+@contextmanager
+def capture_statements(connection: Connection) -> Iterator[List[Tuple[str, dict]]]:
+    """Captures the SELECT statements executed on a connection and their
+    parameters"""
+
+    statements = []
+
+    def before_cursor_execute(
+        conn,
+        cursor,
+        statement,
+        parameters,
+        context,
+        executemany,
+    ):
+        if executemany:
+            return
+
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(connection, "before_cursor_execute", before_cursor_execute)
+
+    try:
+        yield statements
+    finally:
+        event.remove(connection, "before_cursor_execute", before_cursor_execute)
+
+
+def explain(connection: Connection, statement: str, parameters) -> QueryPlan:
+    """Executes a statement under EXPLAIN ANALYZE and returns its plan"""
+
+    result = connection.exec_driver_sql(EXPLAIN_PREFIX + statement, parameters)
+
+    # the driver decodes the json, one plan is returned per statement
+    return QueryPlan(statement=statement, plan=result.scalar()[0]["Plan"])
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, Table
+from sqlalchemy.dialects import postgresql
+
+from msc.utils.time_utils import (
+    get_day_range,
+    get_month_range,
+    get_month_start,
+    in_range,
+)
+
+
+def test_get_month_start():
+    """Tests months are counted across year boundaries"""
+
+    now = datetime(2024, 11, 15, 12, 30)
+
+    assert get_month_start(now) == datetime(2024, 11, 1)
+    assert get_month_start(now, months=2) == datetime(2025, 1, 1)
+    assert get_month_start(now, months=-11) == datetime(2023, 12, 1)
+    assert get_month_range(now) == (datetime(2024, 11, 1), datetime(2024, 12, 1))
+
+
+def test_get_day_range():
+    """Tests the day range ends at the start of the next day"""
+
+    assert get_day_range(datetime(2024, 12, 31, 23, 59)) == (
+        datetime(2024, 12, 31),
+        datetime(2025, 1, 1),
+    )
+
+
+def test_in_range():
+    """Tests the range compares the column itself, so its indexes can be used"""
+
+    table = Table("vote", MetaData(), Column("created_at", DateTime))
+
+    predicate = in_range(
+        table.c.created_at,
+        *get_month_range(datetime(2024, 11, 15)),
+    ).compile(dialect=postgresql.dialect())
+
+    assert str(predicate) == (
+        "vote.created_at >= %(created_at_1)s AND vote.created_at < %(created_at_2)s"
+    )
+    assert predicate.params == {
+        "created_at_1": datetime(2024, 11, 1),
+        "created_at_2": datetime(2024, 12, 1),
+    }